@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+数据库查询基准测试 - 对 DoubanBookDB 的每个公共方法和导出器计时，输出JSON便于跟踪性能回归
+
+使用示例:
+  python -m benchmarks.generate_dataset --db bench.db --users 100 --books-per-user 10000
+  python -m benchmarks.bench_database --db bench.db --output bench_db.json
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+from src.database.database import DoubanBookDB
+from src.exporter.html_exporter import HTMLExporter
+from src.exporter.csv_exporter import CSVExporter
+from src.utils.logger import logger
+
+SCRATCH_USER = 'bench_scratch_user'
+
+
+def time_case(func: Callable, repeat: int) -> Dict[str, any]:
+    """重复执行并记录耗时（秒）"""
+    timings = []
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+    except Exception as e:
+        return {'runs': len(timings), 'error': f"{type(e).__name__}: {e}"}
+    return {
+        'runs': len(timings),
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'max': max(timings),
+    }
+
+
+def pick_user(db: DoubanBookDB) -> str:
+    """选择书籍最多的用户作为基准用户"""
+    if db.sharded:
+        conn = sqlite3.connect(db.db_path)
+        row = conn.execute('SELECT user_id FROM shards ORDER BY user_id LIMIT 1').fetchone()
+    else:
+        conn = db._get_connection()
+        row = conn.execute('''
+            SELECT user_id FROM user_books GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1
+        ''').fetchone()
+    conn.close()
+    if not row:
+        raise SystemExit("数据库中没有数据，请先运行 benchmarks.generate_dataset")
+    return row[0]
+
+
+def build_cases(db: DoubanBookDB, user_id: str, out_dir: str) -> List[Tuple[str, str, Callable]]:
+    """构建基准用例：(DoubanBookDB方法名或导出器名, 用例名, 可调用对象)"""
+    books = db.get_books_by_user(user_id)
+    dates = sorted(b[6] for b in books if b[6])
+    start_date = dates[len(dates) // 4] if dates else '2015-01-01'
+    end_date = dates[len(dates) * 3 // 4] if dates else '2020-12-31'
+    rating = next((b[4] for b in books if b[4]), '5星')
+    scratch_rows = [
+        (f"基准书籍{i}", "基准作者", "2020-1", f"https://book.douban.com/subject/bench{i}/",
+         '4星', '基准书评', '2020-01-01', SCRATCH_USER)
+        for i in range(1000)
+    ]
+    html_exporter = HTMLExporter()
+    csv_exporter = CSVExporter()
+
+    return [
+        ('init_database', 'init_database', db.init_database),
+        ('add_book', 'add_book', lambda: db.add_book(*scratch_rows[0])),
+        ('add_books', 'add_books(1000)', lambda: db.add_books(scratch_rows)),
+        ('clear_user_books', 'clear_user_books(1000)',
+         lambda: (db.add_books(scratch_rows), db.clear_user_books(SCRATCH_USER))),
+        ('get_books_by_user', 'get_books_by_user', lambda: db.get_books_by_user(user_id)),
+        ('get_books_by_user', 'get_books_by_user(has_review=True)',
+         lambda: db.get_books_by_user(user_id, has_review=True)),
+        ('get_books_by_user', 'get_books_by_user(has_review=False)',
+         lambda: db.get_books_by_user(user_id, has_review=False)),
+        ('get_books_by_date_range', 'get_books_by_date_range',
+         lambda: db.get_books_by_date_range(user_id, start_date, end_date)),
+        ('get_books_by_rating', 'get_books_by_rating', lambda: db.get_books_by_rating(user_id, rating)),
+        ('get_user_stats', 'get_user_stats', lambda: db.get_user_stats(user_id)),
+        ('get_user_stats', 'get_user_stats(date_range)',
+         lambda: db.get_user_stats(user_id, start_date, end_date)),
+        ('get_global_stats', 'get_global_stats', db.get_global_stats),
+        ('update_user_info', 'update_user_info', lambda: db.update_user_info(SCRATCH_USER)),
+        ('log_crawl_session', 'log_crawl_session',
+         lambda: db.log_crawl_session(SCRATCH_USER, datetime.now(), datetime.now(), 1, 0, 0, 'benchmark')),
+        ('export_to_dict', 'export_to_dict', lambda: db.export_to_dict(user_id)),
+        ('export_to_dict', 'export_to_dict(date_range)',
+         lambda: db.export_to_dict(user_id, start_date, end_date)),
+        ('HTMLExporter', 'HTMLExporter.export_user_books',
+         lambda: _check(html_exporter.export_user_books(db, user_id, os.path.join(out_dir, 'bench.html')))),
+        ('HTMLExporter', 'HTMLExporter.export_books_by_rating',
+         lambda: _check(html_exporter.export_books_by_rating(db, user_id, rating,
+                                                             os.path.join(out_dir, 'bench_rating.html')))),
+        ('CSVExporter', 'CSVExporter.export_user_books',
+         lambda: _check(csv_exporter.export_user_books(db, user_id, os.path.join(out_dir, 'bench.csv')))),
+        ('HTMLExporter', 'HTMLExporter.export_split',
+         lambda: _check(html_exporter.export_split(db, user_id, os.path.join(out_dir, 'split_html')))),
+        ('CSVExporter', 'CSVExporter.export_books_by_rating',
+         lambda: _check(csv_exporter.export_books_by_rating(db, user_id, rating,
+                                                            os.path.join(out_dir, 'bench_rating.csv')))),
+        ('CSVExporter', 'CSVExporter.export_split',
+         lambda: _check(csv_exporter.export_split(db, user_id, os.path.join(out_dir, 'split_csv')))),
+    ]
+
+
+def _check(success: bool) -> None:
+    """导出器以返回值表示失败，转为异常以便记录"""
+    if not success:
+        raise RuntimeError("导出失败，详见日志")
+
+
+def uncovered_methods(cases: List[Tuple[str, str, Callable]]) -> List[str]:
+    """列出没有基准用例的 DoubanBookDB 公共方法"""
+    covered = {method for method, _, _ in cases}
+    public = [name for name, member in inspect.getmembers(DoubanBookDB, inspect.isfunction)
+              if not name.startswith('_')]
+    # archive_user 会移走分片文件，不适合重复计时
+    return sorted(set(public) - covered - {'archive_user'})
+
+
+def git_revision() -> str:
+    """当前代码的 git 版本，便于对比不同提交的结果"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DoubanBookDB 查询与导出基准测试")
+    parser.add_argument('--db', default='bench_douban_books.db', help='基准数据库文件')
+    parser.add_argument('--shard-dir', help='数据库以分片模式存储时的分片目录')
+    parser.add_argument('--user', help='基准用户，默认选择书籍最多的用户')
+    parser.add_argument('--repeat', type=int, default=3, help='每个用例重复次数')
+    parser.add_argument('--output', help='JSON结果输出文件，默认输出到标准输出')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"数据库 {args.db} 不存在，请先运行 benchmarks.generate_dataset")
+
+    db = DoubanBookDB(args.db, shard_dir=args.shard_dir)
+    user_id = args.user or pick_user(db)
+    user_books = db.get_user_stats(user_id)['total_books']
+
+    results = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        cases = build_cases(db, user_id, out_dir)
+        for method, name, func in cases:
+            result = time_case(func, args.repeat)
+            result['name'] = name
+            result['method'] = method
+            results.append(result)
+            if 'error' in result:
+                logger.warning(f"{name}: {result['error']}")
+            else:
+                logger.info(f"{name}: 中位数 {result['median'] * 1000:.2f} ms")
+        db.clear_user_books(SCRATCH_USER)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'db': args.db,
+            'db_size': os.path.getsize(args.db),
+            'sharded': db.sharded,
+            'user_id': user_id,
+            'user_books': user_books,
+            'total_books': db.get_global_stats()['total_books'],
+            'repeat': args.repeat,
+        },
+        'results': results,
+        'uncovered_methods': uncovered_methods(cases),
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        logger.info(f"基准结果已保存到: {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+导出基准测试 - 在不同书籍数量下对各导出器计时，记录耗时、峰值内存和输出大小，输出JSON便于对比不同提交
+
+每个用例在独立的子进程中执行，峰值内存（RSS）只反映该导出器本身。
+
+使用示例:
+  python -m benchmarks.bench_export --output bench_export.json
+  python -m benchmarks.bench_export --sizes 1000,10000 --exporters html,csv --data-dir bench_data
+  python -m benchmarks.bench_export --output new.json --compare old.json
+"""
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import sqlite3
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from benchmarks.bench_database import git_revision
+from benchmarks.generate_dataset import generate_rows, populate
+from src.database.database import DoubanBookDB
+from src.utils.logger import logger
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，不记录峰值内存
+    resource = None
+
+# 基准用户：每个规模的数据库中只有这一个用户
+BENCH_USER = 'bench_user_00000'
+
+# 导出器用例：名称 -> (模块, 导出器类, 构造参数, 输出文件后缀；为空表示输出到目录)
+EXPORT_CASES = {
+    'html': ('src.exporter.html_exporter', 'HTMLExporter', {}, '.html'),
+    'html_compact': ('src.exporter.html_exporter', 'HTMLExporter', {'compact': True, 'search_index': True}, '.html'),
+    'csv': ('src.exporter.csv_exporter', 'CSVExporter', {}, '.csv'),
+    'parquet': ('src.exporter.parquet_exporter', 'ParquetExporter', {}, '.parquet'),
+    'ndjson': ('src.exporter.ndjson_exporter', 'NDJSONExporter', {}, '.ndjson'),
+    'excel': ('src.exporter.excel_exporter', 'ExcelExporter', {}, '.xlsx'),
+    'site': ('src.exporter.site_exporter', 'SiteExporter', {}, ''),
+}
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def peak_rss() -> Optional[int]:
+    """当前进程的峰值常驻内存（字节），不支持的平台返回 None"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return usage if platform.system() == 'Darwin' else usage * 1024
+
+
+def output_size(path: str) -> int:
+    """输出文件大小；输出为目录时统计其中全部文件"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def prepare_database(data_dir: str, size: int, seed: int = 42) -> str:
+    """生成（或复用已生成的）只包含一个用户、size 本书的基准数据库"""
+    db_path = os.path.join(data_dir, f"bench_export_{size}.db")
+    if os.path.exists(db_path):
+        if DoubanBookDB(db_path, readonly=True).get_user_stats(BENCH_USER)['total_books'] == size:
+            return db_path
+        os.remove(db_path)
+    started = time.perf_counter()
+    populate(DoubanBookDB(db_path), generate_rows(users=1, books_per_user=size, seed=seed))
+    logger.info(f"已生成 {size} 本书的基准数据库，耗时 {time.perf_counter() - started:.1f} 秒")
+    return db_path
+
+
+def _run_case(task: Dict) -> Dict:
+    """在子进程中执行一次导出，返回耗时、峰值内存和输出大小"""
+    module_name, class_name, options, _ = EXPORT_CASES[task['exporter']]
+    exporter = getattr(importlib.import_module(module_name), class_name)(**options)
+    db = DoubanBookDB(task['db_path'], readonly=True)
+    baseline = peak_rss()
+    started = time.perf_counter()
+    success = exporter.export_user_books(db, BENCH_USER, task['output'])
+    seconds = time.perf_counter() - started
+    if not success:
+        raise RuntimeError("导出失败，详见日志")
+    peak = peak_rss()
+    return {
+        'seconds': seconds,
+        'peak_rss': peak,
+        'rss_delta': peak - baseline if peak is not None else None,
+        'output_bytes': output_size(task['output']),
+    }
+
+
+def run_case(exporter: str, size: int, db_path: str, out_dir: str, repeat: int = 1) -> Dict:
+    """重复执行一个用例，每次使用新的子进程，汇总耗时并取内存和大小的最大值"""
+    suffix = EXPORT_CASES[exporter][3]
+    result = {'exporter': exporter, 'size': size, 'runs': 0}
+    runs = []
+    try:
+        for _ in range(repeat):
+            task = {'exporter': exporter, 'db_path': db_path,
+                    'output': os.path.join(out_dir, f"{exporter}_{size}{suffix}")}
+            # spawn 启动的子进程不继承父进程的内存，峰值内存只包含本次导出
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                runs.append(executor.submit(_run_case, task).result())
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    if not runs:
+        return result
+    timings = [run['seconds'] for run in runs]
+    rss = [run['peak_rss'] for run in runs if run['peak_rss'] is not None]
+    deltas = [run['rss_delta'] for run in runs if run['rss_delta'] is not None]
+    result.update({
+        'runs': len(runs),
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'max': max(timings),
+        'books_per_second': size / max(min(timings), 1e-9),
+        'peak_rss': max(rss) if rss else None,
+        'rss_delta': max(deltas) if deltas else None,
+        'output_bytes': max(run['output_bytes'] for run in runs),
+    })
+    return result
+
+
+def run_benchmarks(sizes: List[int], exporters: List[str], data_dir: str, repeat: int = 1) -> Dict:
+    """对每个规模、每个导出器执行基准用例，返回完整报告"""
+    unknown = [name for name in exporters if name not in EXPORT_CASES]
+    if unknown:
+        raise ValueError(f"不支持的导出器: {', '.join(unknown)}，可选: {', '.join(EXPORT_CASES)}")
+    os.makedirs(data_dir, exist_ok=True)
+    results = []
+    for size in sizes:
+        db_path = prepare_database(data_dir, size)
+        with tempfile.TemporaryDirectory() as out_dir:
+            for exporter in exporters:
+                result = run_case(exporter, size, db_path, out_dir, repeat)
+                results.append(result)
+                if 'error' in result:
+                    logger.warning(f"{exporter} × {size}: {result['error']}")
+                else:
+                    rss = f"{result['peak_rss'] / 1048576:.1f} MB" if result['peak_rss'] else '未知'
+                    logger.info(f"{exporter} × {size}: {result['min']:.2f} 秒，峰值内存 {rss}，"
+                                f"输出 {result['output_bytes'] / 1048576:.1f} MB")
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'sizes': sizes,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare_reports(baseline: Dict, current: Dict) -> List[Dict]:
+    """按 (导出器, 规模) 对比两份报告，返回耗时、峰值内存和输出大小的比值（当前/基线）"""
+    previous = {(r['exporter'], r['size']): r for r in baseline['results'] if 'error' not in r}
+    rows = []
+    for result in current['results']:
+        old = previous.get((result['exporter'], result['size']))
+        if old is None or 'error' in result:
+            continue
+        row = {'exporter': result['exporter'], 'size': result['size']}
+        for key in ('min', 'peak_rss', 'output_bytes'):
+            if result.get(key) and old.get(key):
+                row[key] = result[key] / old[key]
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出器基准测试：耗时、峰值内存和输出大小")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='逗号分隔的书籍数量（默认1000,10000,100000）')
+    parser.add_argument('--exporters', default=','.join(EXPORT_CASES),
+                        help=f"逗号分隔的导出器，可选: {','.join(EXPORT_CASES)}")
+    parser.add_argument('--data-dir', help='保存生成的基准数据库，再次运行时复用（默认使用临时目录）')
+    parser.add_argument('--repeat', type=int, default=1, help='每个用例重复次数')
+    parser.add_argument('--output', help='JSON结果输出文件，默认输出到标准输出')
+    parser.add_argument('--compare', metavar='BASELINE', help='与之前保存的JSON结果对比')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    exporters = [name.strip() for name in args.exporters.split(',') if name.strip()]
+    if args.data_dir:
+        report = run_benchmarks(sizes, exporters, args.data_dir, args.repeat)
+    else:
+        with tempfile.TemporaryDirectory() as data_dir:
+            report = run_benchmarks(sizes, exporters, data_dir, args.repeat)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            report['comparison'] = {'baseline': args.compare, 'ratios': compare_reports(json.load(f), report)}
+        for row in report['comparison']['ratios']:
+            ratios = '，'.join(f"{key} ×{row[key]:.2f}" for key in ('min', 'peak_rss', 'output_bytes') if key in row)
+            logger.info(f"{row['exporter']} × {row['size']}: {ratios}")
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        logger.info(f"基准结果已保存到: {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+合成数据生成器 - 按可配置规模生成逼真的用户、书籍、评分和中文书评
+
+使用示例:
+  python -m benchmarks.generate_dataset --db bench.db --users 100 --books-per-user 10000
+  python -m benchmarks.generate_dataset --db bench.db --users 500 --books-per-user 2000 --catalog-size 200000
+"""
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from typing import Iterator, List, Tuple
+from src.database.database import DoubanBookDB
+from src.utils.logger import logger
+
+# 书名、作者和书评用的常见汉字及词语
+TITLE_WORDS = [
+    '小说', '故事', '历史', '传记', '哲学', '思想', '科学', '宇宙', '编程', '设计',
+    '艺术', '音乐', '人生', '时间', '城市', '河流', '远方', '记忆', '孤独', '百年',
+    '夜晚', '春天', '海边', '少年', '帝国', '文明', '战争', '和平', '算法', '自然',
+]
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾'
+GIVEN_NAMES = '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰建国文春'
+REVIEW_PHRASES = [
+    '读完之后久久不能平静', '文字很朴素但是很有力量', '结构有些松散', '翻译质量一般',
+    '值得反复阅读', '前半部分节奏偏慢', '人物刻画非常细腻', '观点新颖，启发很大',
+    '适合在通勤路上读', '部分章节略显冗长', '推荐给所有朋友', '和预期的不太一样',
+    '结尾出人意料', '资料详实，考据严谨', '读起来很轻松', '需要一定的背景知识',
+]
+# 评分分布：None 表示未评分
+RATING_WEIGHTS = [('5星', 30), ('4星', 35), ('3星', 18), ('2星', 5), ('1星', 2), (None, 10)]
+
+
+def random_title(rng: random.Random) -> str:
+    """生成书名"""
+    return ''.join(rng.sample(TITLE_WORDS, rng.randint(1, 3)))
+
+
+def random_author(rng: random.Random) -> str:
+    """生成作者名"""
+    return rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_NAMES) for _ in range(rng.randint(1, 2)))
+
+
+def random_review(rng: random.Random, review_ratio: float) -> str:
+    """按比例生成长度不一的书评，其余为空"""
+    if rng.random() >= review_ratio:
+        return ''
+    return '，'.join(rng.choice(REVIEW_PHRASES) for _ in range(rng.randint(1, 12))) + '。'
+
+
+def generate_rows(users: int, books_per_user: int, catalog_size: int = 0, review_ratio: float = 0.4,
+                  start_year: int = 2010, end_year: int = 2025, seed: int = 42) -> Iterator[Tuple]:
+    """逐行生成书籍记录，字段顺序与 DoubanBookDB.add_book 一致
+
+    catalog_size > 0 时所有用户从同一书目池中取书（不同用户会收藏同一本书），
+    否则每条记录都对应一本不同的书。
+    """
+    rng = random.Random(seed)
+    ratings, weights = zip(*RATING_WEIGHTS)
+    span_days = (date(end_year, 12, 31) - date(start_year, 1, 1)).days
+    catalog = {}
+    subject_seq = 1000000
+
+    for user_index in range(users):
+        user_id = f"bench_user_{user_index:05d}"
+        if catalog_size > 0:
+            subject_ids = rng.sample(range(1, catalog_size + 1), min(books_per_user, catalog_size))
+        else:
+            subject_ids = range(subject_seq, subject_seq + books_per_user)
+            subject_seq += books_per_user
+
+        for subject_id in subject_ids:
+            book = catalog.get(subject_id) if catalog_size > 0 else None
+            if book is None:
+                book = (random_title(rng), random_author(rng),
+                        f"{rng.randint(1950, end_year)}-{rng.randint(1, 12)}")
+                if catalog_size > 0:
+                    catalog[subject_id] = book
+            review_date = date(start_year, 1, 1) + timedelta(days=rng.randint(0, span_days))
+            yield (
+                book[0], book[1], book[2],
+                f"https://book.douban.com/subject/{subject_id}/",
+                rng.choices(ratings, weights)[0],
+                random_review(rng, review_ratio),
+                review_date.strftime('%Y-%m-%d'),
+                user_id,
+            )
+
+
+def populate(db: DoubanBookDB, rows: Iterator[Tuple], batch_size: int = 20000) -> int:
+    """分批写入数据库，返回写入行数"""
+    total = 0
+    batch: List[Tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            total += db.add_books(batch)
+            batch = []
+    if batch:
+        total += db.add_books(batch)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成豆瓣书籍数据集")
+    parser.add_argument('--db', default='bench_douban_books.db', help='目标数据库文件')
+    parser.add_argument('--shard-dir', help='以分片模式写入')
+    parser.add_argument('--users', type=int, default=100, help='用户数量')
+    parser.add_argument('--books-per-user', type=int, default=1000, help='每个用户的书籍数量')
+    parser.add_argument('--catalog-size', type=int, default=0,
+                        help='共享书目池大小，0表示每条记录对应不同的书')
+    parser.add_argument('--review-ratio', type=float, default=0.4, help='有书评的比例')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--batch-size', type=int, default=20000, help='每批写入行数')
+    args = parser.parse_args()
+
+    db = DoubanBookDB(args.db, shard_dir=args.shard_dir)
+    started = time.perf_counter()
+    total = populate(db, generate_rows(args.users, args.books_per_user, args.catalog_size,
+                                       args.review_ratio, seed=args.seed), args.batch_size)
+    elapsed = time.perf_counter() - started
+    logger.info(f"已生成 {total} 条记录到 {args.db}，耗时 {elapsed:.1f} 秒 ({total / max(elapsed, 1e-9):.0f} 行/秒)")
+
+
+if __name__ == "__main__":
+    main()
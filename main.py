@@ -8,6 +8,7 @@ import sys
 import os
 import re
 import argparse
+import multiprocessing
 from src.utils.logger import logger
 
 def main():
@@ -20,11 +21,27 @@ def main():
   %(prog)s                    # 启动GUI界面
   %(prog)s --cli              # 使用命令行模式
   %(prog)s --export user123   # 导出指定用户的HTML文件
+  %(prog)s --export user123 --compact-html  # 书籍很多时导出紧凑的虚拟滚动HTML
+  %(prog)s --export user123 --search-index  # HTML附带搜索索引
+  %(prog)s --export user123 --site-dir site  # 导出为多页面静态网站
+  %(prog)s --export user123 --split-dir out --split-formats html,csv  # 每个评分一个HTML和CSV文件
+  %(prog)s --export user123 --excel books.xlsx  # 导出为Excel，每年一个工作表
+  %(prog)s --export user123 --cache-dir .export_cache  # 增量导出，数据没变化时跳过
+  %(prog)s --export user123 --charts embed  # HTML附带统计图表
+  %(prog)s --export user123 --site-dir site --minify --precompress  # 压缩页面并生成.gz/.br，供静态托管
+  %(prog)s --csv-dump all.csv.gz --csv-columns user_id,title,rating  # 全部用户导出到一个压缩CSV
+  %(prog)s --parquet-dump books.parquet  # 全部用户导出为Parquet，供pandas分析
+  %(prog)s --ndjson-dump books.ndjson.gz  # 全部用户导出为NDJSON
+  %(prog)s --import-ndjson books.ndjson.gz  # 从NDJSON批量导入，无需重新爬取
+  %(prog)s --batch-export out --batch-formats html,csv  # 多进程批量导出全部用户
+  %(prog)s --reclassify-genres --genre-taxonomy genres.json  # 按自定义类型体系重新分类
+  %(prog)s --db-maintain      # 数据库维护（ANALYZE、空间回收、索引审计）
   
 注意事项:
   1. 首次使用需要配置豆瓣Cookie
   2. 数据存储在SQLite数据库中
   3. 支持增量更新和HTML导出
+  4. 数据库维护可在爬取进行中执行
         """
     )
     
@@ -66,6 +83,176 @@ def main():
         help='指定HTML输出文件名'
     )
     
+    parser.add_argument(
+        '--compact-html',
+        action='store_true',
+        help='HTML以紧凑JSON嵌入书籍数据并虚拟滚动渲染，适合书籍数量很多的用户'
+    )
+    
+    parser.add_argument(
+        '--search-index',
+        action='store_true',
+        help='HTML中附带预先构建的搜索索引（书名、作者、出版日期、评分日期、书评），大量书籍时搜索更快'
+    )
+    
+    parser.add_argument(
+        '--charts',
+        choices=['embed', 'link'],
+        help='HTML附带评分分布、年度数量和阅读节奏图表：embed嵌入页面，link保存在页面旁的目录（图片缓存在--cache-dir中）'
+    )
+    
+    parser.add_argument(
+        '--minify',
+        action='store_true',
+        help='压缩导出页面中的空白、样式和脚本，减小HTML和静态网站的体积'
+    )
+    
+    parser.add_argument(
+        '--precompress',
+        action='store_true',
+        help='在HTML页面、样式表和脚本旁生成 .gz 和 .br（需安装brotli）压缩文件，供静态服务器直接返回'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        metavar='DIR',
+        help='启用导出缓存：按书籍内容复用已渲染的片段，书籍数据没有变化时跳过重新导出'
+    )
+    
+    parser.add_argument(
+        '--excel',
+        metavar='FILE',
+        help='配合--export使用，导出为Excel文件（.xlsx），包含统计表和按年份或评分划分的书籍表'
+    )
+    
+    parser.add_argument(
+        '--excel-group',
+        choices=['year', 'rating'],
+        default='year',
+        help='Excel书籍表的划分方式：year每年一个工作表，rating每个评分一个工作表（默认year）'
+    )
+    
+    parser.add_argument(
+        '--split-dir',
+        metavar='DIR',
+        help='配合--export使用，按评分或年份拆分导出到目录，每组一个文件（书籍只读取一遍）'
+    )
+    
+    parser.add_argument(
+        '--split-by',
+        choices=['rating', 'year'],
+        default='rating',
+        help='拆分导出的分组方式：rating每个评分一个文件，year每年一个文件（默认rating）'
+    )
+    
+    parser.add_argument(
+        '--split-formats',
+        default='html',
+        metavar='FORMATS',
+        help='拆分导出的格式，逗号分隔，可选html,csv（默认html）'
+    )
+    
+    parser.add_argument(
+        '--site-dir',
+        metavar='DIR',
+        help='配合--export使用，导出为多页面静态网站目录（首页统计+每年一页，重新导出只重写有变化的页面）'
+    )
+    
+    parser.add_argument(
+        '--site-page-size',
+        type=int,
+        default=0,
+        metavar='N',
+        help='静态网站每页最多N本书，超过时同一年份分为多页（默认0表示不拆分）'
+    )
+    
+    parser.add_argument(
+        '--csv-dump',
+        metavar='FILE',
+        help='把全部用户的书籍流式导出到一个CSV文件（文件名以.gz结尾时gzip压缩）'
+    )
+    
+    parser.add_argument(
+        '--csv-columns',
+        metavar='COLS',
+        help='配合--csv-dump使用，逗号分隔的导出列（默认除genre和user_id外全部），可选: title,author,publish_date,'
+             'douban_url,rating,review_content,review_date,created_at,updated_at,genre,user_id'
+    )
+    
+    parser.add_argument(
+        '--parquet-dump',
+        metavar='FILE',
+        help='把全部用户的书籍导出为带类型列的Parquet文件（.arrow/.feather结尾时写入Arrow IPC格式）'
+    )
+    
+    parser.add_argument(
+        '--ndjson-dump',
+        metavar='FILE',
+        help='把全部用户的书籍导出为NDJSON（每本书一行JSON，文件名以.gz结尾时gzip压缩）'
+    )
+    
+    parser.add_argument(
+        '--import-ndjson',
+        metavar='FILE',
+        help='从NDJSON文件批量导入书籍数据到数据库（支持.gz压缩文件）'
+    )
+    
+    parser.add_argument(
+        '--batch-export',
+        metavar='DIR',
+        help='在进程池中并行批量导出多个用户到DIR（默认全部用户），完成后写入耗时汇总batch_summary.json'
+    )
+    
+    parser.add_argument(
+        '--batch-users',
+        metavar='USERS',
+        help='配合--batch-export使用，逗号分隔的用户ID列表，或@文件名（每行一个用户ID）'
+    )
+    
+    parser.add_argument(
+        '--batch-formats',
+        metavar='FORMATS',
+        default='html',
+        help='配合--batch-export使用，逗号分隔的导出格式：html,csv,parquet,ndjson,excel（默认html）'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        metavar='N',
+        help='配合--batch-export使用，工作进程数（默认CPU核心数）'
+    )
+    
+    parser.add_argument(
+        '--genre-taxonomy',
+        metavar='FILE',
+        help='书籍类型体系JSON文件（{"类型": ["关键词", ...]}，先出现的类型优先），爬取和重新分类时使用'
+    )
+    
+    parser.add_argument(
+        '--reclassify-genres',
+        action='store_true',
+        help='按当前类型体系重新计算数据库中全部书籍的类型'
+    )
+    
+    parser.add_argument(
+        '--shard-dir',
+        metavar='DIR',
+        help='启用分片存储：每个用户的书籍数据保存在DIR下独立的数据库文件中，douban_books.db仅作为目录库'
+    )
+    
+    parser.add_argument(
+        '--db-maintain',
+        action='store_true',
+        help='执行数据库维护：ANALYZE/optimize、增量空间回收、空间占用统计和索引审计'
+    )
+    
+    parser.add_argument(
+        '--full-vacuum',
+        action='store_true',
+        help='配合--db-maintain使用，对未开启增量回收的旧数据库执行一次完整VACUUM（需独占数据库）'
+    )
+    
     args = parser.parse_args()
     
     # 参数验证
@@ -73,10 +260,73 @@ def main():
         logger.error("错误：最大页数必须大于0")
         sys.exit(1)
     
+    if args.workers is not None and args.workers <= 0:
+        logger.error("错误：工作进程数必须大于0")
+        sys.exit(1)
+    
+    if args.site_page_size < 0:
+        logger.error("错误：每页书籍数不能为负数")
+        sys.exit(1)
+    
     if args.output and not args.output.strip():
         logger.error("错误：输出文件名不能为空")
         sys.exit(1)
     
+    # 重新分类书籍类型
+    if args.reclassify_genres:
+        try:
+            run_reclassify_genres(args.genre_taxonomy, args.shard_dir)
+        except Exception as e:
+            logger.error(f"重新分类失败: {e}")
+            sys.exit(1)
+        return
+    
+    # 数据库维护
+    if args.db_maintain:
+        try:
+            run_db_maintenance(args.full_vacuum, args.shard_dir)
+        except Exception as e:
+            logger.error(f"数据库维护失败: {e}")
+            sys.exit(1)
+        return
+    
+    # 全部用户导出为CSV
+    if args.csv_dump:
+        columns = [name.strip() for name in args.csv_columns.split(',')] if args.csv_columns else None
+        try:
+            export_csv_dump(args.csv_dump, columns, args.shard_dir)
+        except Exception as e:
+            logger.error(f"导出CSV时发生错误: {e}")
+            sys.exit(1)
+        return
+    
+    # 全部用户导出为Parquet/Arrow
+    if args.parquet_dump:
+        try:
+            export_parquet_dump(args.parquet_dump, args.shard_dir)
+        except Exception as e:
+            logger.error(f"导出Parquet时发生错误: {e}")
+            sys.exit(1)
+        return
+    
+    # NDJSON导出与导入
+    if args.ndjson_dump or args.import_ndjson:
+        try:
+            run_ndjson_transfer(args.ndjson_dump, args.import_ndjson, args.shard_dir)
+        except Exception as e:
+            logger.error(f"NDJSON导出或导入时发生错误: {e}")
+            sys.exit(1)
+        return
+    
+    # 多用户批量导出
+    if args.batch_export:
+        try:
+            run_batch_export(args)
+        except Exception as e:
+            logger.error(f"批量导出时发生错误: {e}")
+            sys.exit(1)
+        return
+    
     # 仅导出HTML
     if args.export:
         if not args.export or not args.export.strip():
@@ -89,7 +339,19 @@ def main():
             sys.exit(1)
         
         try:
-            export_html_only(args.export.strip(), args.output)
+            if args.split_dir:
+                export_split_only(args)
+                return
+            if args.site_dir:
+                export_site_only(args.export.strip(), args.site_dir, args.site_page_size, args.shard_dir,
+                                 args.minify, args.precompress)
+                return
+            if args.excel:
+                export_excel_only(args.export.strip(), args.excel, args.excel_group, args.shard_dir)
+                return
+            export_html_only(args.export.strip(), args.output, args.shard_dir,
+                             args.compact_html, args.search_index, args.cache_dir, args.charts,
+                             args.minify, args.precompress)
         except FileNotFoundError as e:
             logger.error(f"文件或路径错误: {e}")
             sys.exit(1)
@@ -133,6 +395,7 @@ def run_gui_mode():
         root = tk.Tk()
         app = DoubanBookGUI(root)
         root.mainloop()
+        app.close()
         
     except ImportError as e:
         logger.error(f"启动GUI失败，缺少依赖: {e}")
@@ -168,7 +431,7 @@ def run_cli_mode(args):
                 sys.exit(1)
     
     # 初始化数据库和爬虫
-    db = DoubanBookDB()
+    db = DoubanBookDB(shard_dir=args.shard_dir, genre_classifier=load_genre_classifier(args.genre_taxonomy))
     crawler = DoubanCrawler(db)
     
     try:
@@ -190,8 +453,10 @@ def run_cli_mode(args):
         export_html = input("\n是否导出HTML文件? (y/N): ").strip().lower()
         if export_html in ['y', 'yes']:
             output_file = args.output or f"{user_id}_豆瓣书评.html"
-            exporter = HTMLExporter()
-            if exporter.export_user_books(db, user_id, output_file):
+            exporter = HTMLExporter(compact=args.compact_html, search_index=args.search_index,
+                                    cache_dir=args.cache_dir, charts=args.charts,
+                                    minify=args.minify, precompress=args.precompress)
+            if exporter.export_user_books(db, user_id, output_file, progress_callback=print_export_progress):
                 logger.info(f"HTML文件已导出: {output_file}")
             else:
                 logger.error("HTML导出失败")
@@ -202,12 +467,39 @@ def run_cli_mode(args):
         logger.error(f"爬取失败: {e}")
         sys.exit(1)
 
-def export_html_only(user_id, output_file=None):
+def load_genre_classifier(taxonomy_file=None):
+    """按类型体系文件创建分类器，未指定文件时返回 None（使用内置类型体系）"""
+    if not taxonomy_file:
+        return None
+    from src.utils.genre_classifier import GenreClassifier, load_taxonomy
+    return GenreClassifier(load_taxonomy(taxonomy_file))
+
+def run_reclassify_genres(taxonomy_file=None, shard_dir=None):
+    """按类型体系重新计算全部书籍的类型"""
+    from src.database.database import DoubanBookDB
+    
+    db = DoubanBookDB(shard_dir=shard_dir, genre_classifier=load_genre_classifier(taxonomy_file))
+    updated = db.reclassify_genres()
+    logger.info(f"已重新分类 {updated} 条收藏记录")
+
+def print_export_progress(info):
+    """命令行导出进度：在终端同一行刷新阶段、行数和预计剩余时间，导出结束时换行"""
+    from src.exporter.progress import format_progress
+    
+    if not sys.stderr.isatty():
+        return
+    sys.stderr.write(f"\r{format_progress(info):<48}")
+    if info['fraction'] >= 1:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+def export_html_only(user_id, output_file=None, shard_dir=None, compact=False, search_index=False,
+                     cache_dir=None, charts=None, minify=False, precompress=False):
     """仅导出HTML文件"""
     from src.database.database import DoubanBookDB
     from src.exporter.html_exporter import HTMLExporter
     
-    db = DoubanBookDB()
+    db = DoubanBookDB(shard_dir=shard_dir)
     stats = db.get_user_stats(user_id)
     
     if stats['total_books'] == 0:
@@ -216,8 +508,9 @@ def export_html_only(user_id, output_file=None):
     
     output_file = output_file or f"{user_id}_豆瓣书评.html"
     
-    exporter = HTMLExporter()
-    if exporter.export_user_books(db, user_id, output_file):
+    exporter = HTMLExporter(compact=compact, search_index=search_index, cache_dir=cache_dir, charts=charts,
+                            minify=minify, precompress=precompress)
+    if exporter.export_user_books(db, user_id, output_file, progress_callback=print_export_progress):
         logger.info(f"HTML文件已导出: {output_file}")
         logger.info(f"总书籍数: {stats['total_books']}")
         logger.info(f"有书评数: {stats['books_with_reviews']}")
@@ -225,6 +518,128 @@ def export_html_only(user_id, output_file=None):
         logger.error("HTML导出失败")
         sys.exit(1)
 
+def export_csv_dump(output_file, columns=None, shard_dir=None):
+    """把全部用户的书籍导出到一个CSV文件"""
+    from src.database.database import DoubanBookDB
+    from src.exporter.csv_exporter import CSVExporter
+    
+    db = DoubanBookDB(shard_dir=shard_dir)
+    count = CSVExporter(columns=columns).export_all_users(db, output_file)
+    if not count:
+        logger.error("CSV导出失败")
+        sys.exit(1)
+
+def export_parquet_dump(output_file, shard_dir=None):
+    """把全部用户的书籍导出为Parquet/Arrow文件"""
+    from src.database.database import DoubanBookDB
+    from src.exporter.parquet_exporter import ParquetExporter
+    
+    db = DoubanBookDB(shard_dir=shard_dir)
+    if not ParquetExporter().export_all_users(db, output_file):
+        logger.error("Parquet导出失败")
+        sys.exit(1)
+
+def run_ndjson_transfer(dump_file=None, import_file=None, shard_dir=None):
+    """导入NDJSON文件到数据库，或把全部用户导出为NDJSON文件"""
+    from src.database.database import DoubanBookDB
+    from src.exporter.ndjson_exporter import NDJSONExporter, NDJSONImporter
+    
+    db = DoubanBookDB(shard_dir=shard_dir)
+    if import_file:
+        result = NDJSONImporter().import_file(db, import_file)
+        if not result['imported']:
+            logger.error("没有导入任何书籍")
+            sys.exit(1)
+    if dump_file and not NDJSONExporter().export_all_users(db, dump_file):
+        logger.error("NDJSON导出失败")
+        sys.exit(1)
+
+def export_excel_only(user_id, output_file, group_by='year', shard_dir=None):
+    """导出为Excel文件"""
+    from src.database.database import DoubanBookDB
+    from src.exporter.excel_exporter import ExcelExporter
+    
+    db = DoubanBookDB(shard_dir=shard_dir)
+    if not ExcelExporter(group_by).export_user_books(db, user_id, output_file,
+                                                     progress_callback=print_export_progress):
+        logger.error("Excel导出失败")
+        sys.exit(1)
+
+def run_batch_export(args):
+    """在进程池中批量导出多个用户"""
+    from src.database.database import DoubanBookDB
+    from src.exporter.batch_exporter import BatchExporter
+    
+    user_ids = None
+    if args.batch_users:
+        if args.batch_users.startswith('@'):
+            with open(args.batch_users[1:], encoding='utf-8') as f:
+                user_ids = [line.strip() for line in f if line.strip()]
+        else:
+            user_ids = [user_id.strip() for user_id in args.batch_users.split(',') if user_id.strip()]
+    
+    formats = [fmt.strip() for fmt in args.batch_formats.split(',') if fmt.strip()]
+    html_options = {'compact': args.compact_html, 'search_index': args.search_index, 'cache_dir': args.cache_dir,
+                    'charts': args.charts, 'minify': args.minify, 'precompress': args.precompress}
+    exporter = BatchExporter(formats, args.workers, {'html': html_options})
+    
+    db = DoubanBookDB(shard_dir=args.shard_dir)
+    summary = exporter.export_users(db, args.batch_export, user_ids)
+    if summary['succeeded'] < summary['total_tasks']:
+        for task in summary['tasks']:
+            if not task['success']:
+                logger.error(f"导出失败: {task['user_id']} {task['format']} {task['error'] or ''}")
+        sys.exit(1)
+
+def export_split_only(args):
+    """按评分或年份拆分导出，每种格式只读取一遍书籍"""
+    from src.database.database import DoubanBookDB
+    from src.exporter.csv_exporter import CSVExporter
+    from src.exporter.html_exporter import HTMLExporter
+    
+    exporters = {
+        'html': lambda: HTMLExporter(compact=args.compact_html, search_index=args.search_index,
+                                     cache_dir=args.cache_dir, charts=args.charts,
+                                     minify=args.minify, precompress=args.precompress),
+        'csv': lambda: CSVExporter(cache_dir=args.cache_dir),
+    }
+    formats = [fmt.strip() for fmt in args.split_formats.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in exporters]
+    if unknown:
+        logger.error(f"不支持的拆分导出格式: {', '.join(unknown)}，可选: {', '.join(exporters)}")
+        sys.exit(1)
+    
+    db = DoubanBookDB(shard_dir=args.shard_dir)
+    for fmt in formats:
+        files = exporters[fmt]().export_split(db, args.export.strip(), args.split_dir, args.split_by)
+        if not files:
+            logger.error(f"{fmt.upper()}拆分导出失败")
+            sys.exit(1)
+        for group, path in files.items():
+            logger.info(f"  {group}: {path}")
+
+def export_site_only(user_id, site_dir, page_size=0, shard_dir=None, minify=False, precompress=False):
+    """导出为多页面静态网站"""
+    from src.database.database import DoubanBookDB
+    from src.exporter.site_exporter import SiteExporter
+    
+    db = DoubanBookDB(shard_dir=shard_dir)
+    site_exporter = SiteExporter(page_size=page_size, minify=minify, precompress=precompress)
+    if not site_exporter.export_user_books(db, user_id, site_dir):
+        logger.error("静态网站导出失败")
+        sys.exit(1)
+    logger.info(f"用浏览器打开 {os.path.join(site_dir, 'index.html')} 查看")
+
+def run_db_maintenance(full_vacuum=False, shard_dir=None):
+    """执行数据库维护并输出报告"""
+    from src.database.database import DoubanBookDB
+    from src.database.maintenance import DatabaseMaintenance
+    
+    maintenance = DatabaseMaintenance(DoubanBookDB(shard_dir=shard_dir))
+    report = maintenance.run(full_vacuum=full_vacuum)
+    for line in maintenance.format_report(report):
+        logger.info(line)
+
 def show_help():
     """显示帮助信息"""
     help_text = """
@@ -260,6 +675,9 @@ def show_help():
     logger.info(help_text)
 
 if __name__ == "__main__":
+    # 打包后的程序启动导出工作进程（批量导出、图表渲染）时需要
+    multiprocessing.freeze_support()
+    
     # 检查是否请求帮助
     if len(sys.argv) > 1 and sys.argv[1] in ['-h', '--help', 'help']:
         show_help()
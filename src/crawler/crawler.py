@@ -47,11 +47,13 @@ class DoubanCrawler:
             }
         ]
         
-    def log(self, message):
-        """日志输出"""
-        logger.info(message)
+    def log(self, message, level='INFO'):
+        """日志输出；页面解析细节等诊断信息使用 DEBUG 级别，GUI 默认不显示"""
         if self.gui_callback:
-            self.gui_callback.log(message)
+            # GUI 的日志方法同时写入日志文件
+            self.gui_callback.log(message, level)
+        else:
+            logger.log(level, message)
     
     def update_status(self, status):
         """更新状态"""
@@ -351,7 +353,7 @@ class DoubanCrawler:
                     # 基础延迟 + 随机延迟 + 重试次数延迟
                     delay = random.uniform(min_delay, base_delay) + (attempt * 0.5)
                     delay = min(delay, max_delay)
-                    self.log(f"请求前延迟 {delay:.2f} 秒")
+                    self.log(f"请求前延迟 {delay:.2f} 秒", 'DEBUG')
                     time.sleep(delay)
                     
                     # 确保请求头中的值都是ASCII字符
@@ -410,8 +412,8 @@ class DoubanCrawler:
                 self.log(f"  页面内容已保存到：{debug_file}")
             
             # 添加调试信息
-            self.log(f"第{page+1}页解析结果：")
-            self.log(f"  页面标题：{soup.title.string if soup.title else '无标题'}")
+            self.log(f"第{page+1}页解析结果：", 'DEBUG')
+            self.log(f"  页面标题：{soup.title.string if soup.title else '无标题'}", 'DEBUG')
             
             # 尝试多种可能的选择器
             selectors = [
@@ -426,7 +428,7 @@ class DoubanCrawler:
             items = []
             for selector in selectors:
                 found_items = soup.select(selector)
-                self.log(f"  选择器 '{selector}' 找到 {len(found_items)} 个元素")
+                self.log(f"  选择器 '{selector}' 找到 {len(found_items)} 个元素", 'DEBUG')
                 if found_items:
                     items = found_items
                     break
@@ -438,11 +440,11 @@ class DoubanCrawler:
             if not items:
                 # 尝试查找所有可能的列表项
                 all_list_items = soup.select('li')
-                self.log(f"  找到 {len(all_list_items)} 个列表项")
+                self.log(f"  找到 {len(all_list_items)} 个列表项", 'DEBUG')
                 
                 # 保存部分列表项到日志，用于分析
                 for i, li in enumerate(all_list_items[:5]):
-                    self.log(f"  列表项{i+1}标签: {li.name}, 类: {li.get('class', [])}")
+                    self.log(f"  列表项{i+1}标签: {li.name}, 类: {li.get('class', [])}", 'DEBUG')
                 
                 self.log(f"第{page+1}页没有找到书籍条目，已到达最后一页")
                 break
@@ -480,7 +482,7 @@ class DoubanCrawler:
                                     original_date = review_date_str
                                     
                                     # 添加调试日志
-                                    self.log(f"  处理日期: {original_date}")
+                                    self.log(f"  处理日期: {original_date}", 'DEBUG')
                                     
                                     # 处理不同格式的日期，如 '2023-12-15', '2023/12/15', '2023年12月15日', '2023-12'
                                     processed_date = original_date
@@ -506,7 +508,7 @@ class DoubanCrawler:
                                     for fmt in date_formats:
                                         try:
                                             review_date_obj = datetime.strptime(processed_date, fmt)
-                                            self.log(f"  成功解析日期: {original_date} -> {processed_date} (格式: {fmt})")
+                                            self.log(f"  成功解析日期: {original_date} -> {processed_date} (格式: {fmt})", 'DEBUG')
                                             break
                                         except ValueError:
                                             continue
@@ -517,12 +519,12 @@ class DoubanCrawler:
                                         if year_match:
                                             year = int(year_match.group())
                                             review_date_obj = datetime(year, 1, 1)  # 设为该年1月1日
-                                            self.log(f"  仅提取年份: {original_date} -> {year}")
+                                            self.log(f"  仅提取年份: {original_date} -> {year}", 'DEBUG')
                                         else:
                                             raise ValueError(f"无法解析日期: {original_date}")
                                     
                                     # 检查是否在日期范围内
-                                    self.log(f"  日期比较: {review_date_obj} 是否在 {start_date_obj} 至 {end_date_obj} 之间")
+                                    self.log(f"  日期比较: {review_date_obj} 是否在 {start_date_obj} 至 {end_date_obj} 之间", 'DEBUG')
                                     
                                     if start_date_obj <= review_date_obj <= end_date_obj:
                                         # 存储到数据库
@@ -637,7 +639,7 @@ class DoubanCrawler:
             
             # 页面间增加随机延迟，避免请求过于频繁
             inter_page_delay = random.uniform(2, 5)
-            self.log(f"页面间延迟 {inter_page_delay:.2f} 秒")
+            self.log(f"页面间延迟 {inter_page_delay:.2f} 秒", 'DEBUG')
             time.sleep(inter_page_delay)
         
         # 完成爬取
@@ -0,0 +1,206 @@
+import asyncio
+import sqlite3
+from datetime import datetime
+from typing import List, Optional, Tuple, Dict
+
+import aiosqlite
+
+from src.database.database import (
+    META_SCHEMA_STATEMENTS, UPSERT_CATALOG_SQL, UPSERT_USER_BOOK_SQL, INSERT_CRAWL_LOG_SQL,
+    REVIEW_FILTERS, SELECT_BOOKS_SQL, BOOKS_BY_DATE_RANGE_SQL, BOOKS_BY_RATING_SQL, USER_STATS_SQL,
+    CLEAR_USER_BOOKS_SQL, build_stats_where, book_row_to_dict, ensure_book_schema, split_book_rows
+)
+from src.utils.genre_classifier import GenreClassifier, get_default_classifier
+from src.utils.logger import logger
+
+
+class AsyncDoubanBookDB:
+    """基于aiosqlite的异步数据库访问层，接口与DoubanBookDB保持一致
+
+    用法：
+        async with AsyncDoubanBookDB() as db:
+            await db.add_book(...)
+            stats = await db.get_user_stats(user_id)
+    """
+
+    def __init__(self, db_path: str = "douban_books.db", genre_classifier: Optional[GenreClassifier] = None):
+        """genre_classifier 为写入书籍时计算类型所用的分类器，默认使用内置类型体系"""
+        self.db_path = db_path
+        self.genre_classifier = genre_classifier or get_default_classifier()
+        self._conn: Optional[aiosqlite.Connection] = None
+        # 写事务串行化，避免多个协程在同一连接上交叉提交
+        self._write_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def connect(self) -> None:
+        """打开数据库连接并初始化表结构"""
+        if self._conn is not None:
+            return
+        self._conn = await aiosqlite.connect(self.db_path)
+        self._conn.text_factory = str
+        await self._conn.execute('PRAGMA encoding = "UTF-8"')
+        await self.init_database()
+
+    async def close(self) -> None:
+        """关闭数据库连接"""
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    def _get_connection(self) -> aiosqlite.Connection:
+        """获取已打开的连接"""
+        if self._conn is None:
+            raise RuntimeError("数据库尚未连接，请先调用 connect() 或使用 async with")
+        return self._conn
+
+    async def init_database(self) -> None:
+        """初始化数据库，创建表结构"""
+        conn = self._get_connection()
+        # 书籍表的创建和升级（旧版单表迁移、补充类型列）复用同步实现，在线程中执行
+        await asyncio.to_thread(self._ensure_book_schema)
+        for statement in META_SCHEMA_STATEMENTS:
+            await conn.execute(statement)
+        await conn.commit()
+
+    def _ensure_book_schema(self) -> None:
+        """用独立的同步连接创建或升级书籍表结构"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            ensure_book_schema(conn)
+        finally:
+            conn.close()
+
+    async def add_book(self, title: str, author: str, publish_date: str, douban_url: str,
+                       rating: str, review_content: str, review_date: str, user_id: str) -> bool:
+        """添加或更新书籍记录"""
+        return await self.add_books([(title, author, publish_date, douban_url, rating,
+                                      review_content, review_date, user_id)]) == 1
+
+    async def add_books(self, books: List[Tuple]) -> int:
+        """批量添加或更新书籍记录，单个事务写入，返回写入条数"""
+        if not books:
+            return 0
+        conn = self._get_connection()
+        # 解析链接和计算类型是纯CPU计算，在线程中执行，不阻塞事件循环
+        try:
+            catalog_params, user_params = await asyncio.to_thread(split_book_rows, books, self.genre_classifier)
+        except Exception as e:
+            logger.error(f"批量添加书籍失败: {e}")
+            return 0
+        async with self._write_lock:
+            try:
+                await conn.executemany(UPSERT_CATALOG_SQL, catalog_params)
+                await conn.executemany(UPSERT_USER_BOOK_SQL, user_params)
+                await conn.commit()
+                return len(books)
+            except sqlite3.Error as e:
+                logger.error(f"SQLite错误 - 批量添加书籍失败: {e}")
+                await conn.rollback()
+                return 0
+            except Exception as e:
+                # 任何异常都要回滚，否则未完成的写入会被下一个协程的 commit() 一并提交
+                logger.error(f"批量添加书籍失败: {e}")
+                await conn.rollback()
+                return 0
+
+    async def get_books_by_user(self, user_id: str, has_review: Optional[bool] = None) -> List[Tuple]:
+        """获取用户的书籍列表"""
+        try:
+            return await self._fetchall(SELECT_BOOKS_SQL.format(where='user_id = ?' + REVIEW_FILTERS[has_review]),
+                                        (user_id,))
+        except sqlite3.Error as e:
+            logger.error(f"SQLite错误 - 获取用户书籍列表失败: {e}")
+            return []
+
+    async def get_books_by_date_range(self, user_id: str, start_date: str, end_date: str) -> List[Tuple]:
+        """根据日期范围获取用户的书籍列表"""
+        try:
+            return await self._fetchall(BOOKS_BY_DATE_RANGE_SQL, (user_id, start_date, end_date))
+        except sqlite3.Error as e:
+            logger.error(f"SQLite错误 - 获取用户书籍列表失败: {e}")
+            return []
+
+    async def get_books_by_rating(self, user_id: str, rating: str) -> List[Tuple]:
+        """根据评分获取书籍列表"""
+        return await self._fetchall(BOOKS_BY_RATING_SQL, (user_id, rating))
+
+    async def get_user_stats(self, user_id: str, start_date: str = None, end_date: str = None) -> Dict[str, any]:
+        """获取用户统计信息，支持日期范围过滤"""
+        base_where, params = build_stats_where(user_id, start_date, end_date)
+
+        total_books = (await self._fetchone(
+            USER_STATS_SQL['total_books'].format(where=base_where), params))[0]
+
+        books_with_reviews = (await self._fetchone(
+            USER_STATS_SQL['books_with_reviews'].format(where=base_where), params))[0]
+
+        rating_stats = dict(await self._fetchall(
+            USER_STATS_SQL['rating_stats'].format(where=base_where), params))
+
+        last_crawl = (await self._fetchone(
+            USER_STATS_SQL['last_crawl'].format(where=base_where), params))[0]
+
+        return {
+            'total_books': total_books,
+            'books_with_reviews': books_with_reviews,
+            'rating_stats': rating_stats,
+            'last_crawl': last_crawl
+        }
+
+    async def update_user_info(self, user_id: str, user_name: Optional[str] = None) -> None:
+        """更新用户信息"""
+        conn = self._get_connection()
+        async with self._write_lock:
+            await conn.execute('''
+                INSERT OR REPLACE INTO users (user_id, user_name, last_crawl_time)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (user_id, user_name))
+            await conn.commit()
+
+    async def log_crawl_session(self, user_id: str, start_time: datetime, end_time: datetime,
+                                pages_crawled: int, books_found: int, reviews_found: int,
+                                status: str = "success", error_message: Optional[str] = None) -> None:
+        """记录爬取会话"""
+        conn = self._get_connection()
+        async with self._write_lock:
+            await conn.execute(INSERT_CRAWL_LOG_SQL, (user_id, start_time, end_time, pages_crawled,
+                                                      books_found, reviews_found, status, error_message))
+            await conn.commit()
+
+    async def clear_user_books(self, user_id: str) -> None:
+        """清空用户的书籍数据"""
+        conn = self._get_connection()
+        async with self._write_lock:
+            await conn.execute(CLEAR_USER_BOOKS_SQL, (user_id,))
+            await conn.commit()
+
+    async def export_to_dict(self, user_id: str, start_date: str = None, end_date: str = None) -> dict:
+        """导出用户数据为字典格式，用于HTML生成，支持日期范围过滤"""
+        if start_date and end_date:
+            books = await self.get_books_by_date_range(user_id, start_date, end_date)
+            stats = await self.get_user_stats(user_id, start_date, end_date)
+        else:
+            books = await self.get_books_by_user(user_id)
+            stats = await self.get_user_stats(user_id)
+
+        return {
+            'user_id': user_id,
+            'stats': stats,
+            'books': [book_row_to_dict(book) for book in books]
+        }
+
+    async def _fetchall(self, sql: str, params: tuple = ()) -> List[Tuple]:
+        """执行查询并返回全部结果"""
+        async with self._get_connection().execute(sql, params) as cursor:
+            return await cursor.fetchall()
+
+    async def _fetchone(self, sql: str, params: tuple = ()) -> Optional[Tuple]:
+        """执行查询并返回第一行"""
+        async with self._get_connection().execute(sql, params) as cursor:
+            return await cursor.fetchone()
@@ -1,19 +1,411 @@
+import os
+import re
+import shutil
+import hashlib
 import sqlite3
+import itertools
 from datetime import datetime
-from typing import List, Optional, Tuple, Dict
+from urllib.request import pathname2url
+from typing import Dict, Iterator, List, Optional, Tuple
+from src.utils.genre_classifier import GenreClassifier, get_default_classifier
 from src.utils.logger import logger
 
+# 书籍视图：合并书目信息和用户收藏，供查询和导出使用
+BOOKS_VIEW_SQL = '''
+    CREATE VIEW IF NOT EXISTS books AS
+    SELECT ub.id, c.title, c.author, c.publish_date, c.douban_url, ub.rating,
+           ub.review_content, ub.review_date, ub.user_id, ub.created_at, ub.updated_at,
+           ub.subject_id, ub.genre
+    FROM user_books ub
+    LEFT JOIN book_catalog c ON c.subject_id = ub.subject_id
+'''
+
+# 书籍数据表结构（分片模式下每个分片文件各自包含）
+# book_catalog 保存每本书的公共信息（多个用户收藏同一本书时只存一份），
+# user_books 只保存用户自己的评分和书评；books 视图保持旧表的列，供查询和导出使用
+BOOK_SCHEMA_STATEMENTS = [
+    # 新建数据库启用增量空间回收（对已有数据库无效，需一次完整VACUUM）
+    'PRAGMA auto_vacuum = INCREMENTAL',
+    # 书目表
+    '''
+        CREATE TABLE IF NOT EXISTS book_catalog (
+            subject_id TEXT PRIMARY KEY,
+            douban_url TEXT,
+            title TEXT NOT NULL,
+            author TEXT,
+            publish_date TEXT,
+            metadata TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # 用户收藏表
+    '''
+        CREATE TABLE IF NOT EXISTS user_books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            subject_id TEXT NOT NULL,
+            rating TEXT,
+            review_content TEXT,
+            review_date TEXT,
+            genre TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (user_id, subject_id)
+        )
+    ''',
+    # user_books表索引
+    'CREATE INDEX IF NOT EXISTS idx_user_books_user_id_created_at ON user_books (user_id, created_at)',
+    # 按评分筛选时仍按收录时间顺序读取（界面书籍列表、按评分导出）
+    'CREATE INDEX IF NOT EXISTS idx_user_books_user_id_rating_created_at ON user_books (user_id, rating, created_at)',
+    # 兼容视图：包含旧 books 表的全部列
+    BOOKS_VIEW_SQL,
+]
+
+# 用户和爬取记录表结构（分片模式下只存在于目录库）
+META_SCHEMA_STATEMENTS = [
+    # 用户表
+    '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT UNIQUE NOT NULL,
+            user_name TEXT,
+            last_crawl_time TIMESTAMP,
+            total_books INTEGER DEFAULT 0,
+            books_with_reviews INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # 爬取记录表
+    '''
+        CREATE TABLE IF NOT EXISTS crawl_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            start_time TIMESTAMP,
+            end_time TIMESTAMP,
+            pages_crawled INTEGER,
+            books_found INTEGER,
+            reviews_found INTEGER,
+            status TEXT,
+            error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # users表索引
+    'CREATE INDEX IF NOT EXISTS idx_users_user_id ON users (user_id)',
+    # crawl_logs表索引
+    'CREATE INDEX IF NOT EXISTS idx_crawl_logs_user_id ON crawl_logs (user_id)',
+    'CREATE INDEX IF NOT EXISTS idx_crawl_logs_status ON crawl_logs (status)',
+]
+
+# 分片目录表：记录每个用户的书籍数据所在的分片文件
+SHARD_CATALOG_STATEMENTS = [
+    '''
+        CREATE TABLE IF NOT EXISTS shards (
+            user_id TEXT PRIMARY KEY,
+            shard_file TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_shards_shard_file ON shards (shard_file)',
+]
+
+# 单个连接可同时 ATTACH 的数据库数量（SQLite 默认上限为10）
+MAX_ATTACHED = 10
+
+# 书籍写入语句：先更新书目，再更新用户收藏；重复写入时保留首次收录时间
+UPSERT_CATALOG_SQL = '''
+    INSERT INTO book_catalog (subject_id, douban_url, title, author, publish_date, updated_at)
+    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (subject_id) DO UPDATE SET
+        douban_url = excluded.douban_url, title = excluded.title, author = excluded.author,
+        publish_date = excluded.publish_date, updated_at = CURRENT_TIMESTAMP
+'''
+
+UPSERT_USER_BOOK_SQL = '''
+    INSERT INTO user_books (user_id, subject_id, rating, review_content, review_date, genre, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (user_id, subject_id) DO UPDATE SET
+        rating = excluded.rating, review_content = excluded.review_content,
+        review_date = excluded.review_date, genre = excluded.genre, updated_at = CURRENT_TIMESTAMP
+'''
+
+# 按当前分类器重新计算书籍类型（classify_genre 为注册到连接上的 Python 函数）
+RECLASSIFY_GENRES_SQL = '''
+    UPDATE user_books SET genre = classify_genre(
+        (SELECT title FROM book_catalog c WHERE c.subject_id = user_books.subject_id), review_content)
+'''
+
+INSERT_CRAWL_LOG_SQL = '''
+    INSERT INTO crawl_logs 
+    (user_id, start_time, end_time, pages_crawled, books_found, 
+     reviews_found, status, error_message)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# 书籍查询的公共列（get_books_by_user、get_books_by_date_range 返回的9列）
+BOOK_COLUMNS = '''title, author, publish_date, douban_url, rating, 
+                   review_content, review_date, created_at, updated_at'''
+
+# 导出读取的列：在公共列之后追加书籍类型，只用于 iter_books 和各导出器，公开查询的列数保持不变
+EXPORT_COLUMNS = f'{BOOK_COLUMNS}, genre'
+
+# 界面书籍列表读取的列
+BROWSE_COLUMNS = '''id, title, author, publish_date, rating, review_date,
+                    review_content IS NOT NULL AND review_content != '' AS has_review, created_at'''
+
+# get_books_by_user 按书评有无过滤的条件
+REVIEW_FILTERS = {
+    None: '',
+    True: " AND review_content IS NOT NULL AND review_content != ''",
+    False: " AND (review_content IS NULL OR review_content = '')",
+}
+
+# DoubanBookDB 的查询语句，数据库维护的索引审计（maintenance.QUERY_SET）直接使用这些常量。
+# {where} 为 build_stats_where 生成的条件，可以再追加 REVIEW_FILTERS、RATING_FILTER 等过滤条件
+SELECT_BOOKS_SQL = f'SELECT {BOOK_COLUMNS} FROM books WHERE {{where}} ORDER BY created_at DESC'
+ITER_BOOKS_SQL = f'SELECT {EXPORT_COLUMNS} FROM books WHERE {{where}} ORDER BY created_at DESC'
+
+BOOKS_BY_DATE_RANGE_SQL = '''
+    SELECT title, author, publish_date, douban_url, rating, 
+           review_content, review_date, created_at, updated_at
+    FROM books 
+    WHERE user_id = ? AND review_date BETWEEN ? AND ?
+    ORDER BY created_at DESC
+'''
+
+BOOKS_BY_RATING_SQL = '''
+    SELECT title, author, publish_date, douban_url, rating, 
+           review_content, review_date, created_at
+    FROM books 
+    WHERE user_id = ? AND rating = ?
+    ORDER BY created_at DESC
+'''
+
+RATING_FILTER = ' AND rating = ?'
+
+# get_user_stats 的各项统计
+USER_STATS_SQL = {
+    'total_books': 'SELECT COUNT(*) FROM user_books WHERE {where}',
+    'books_with_reviews': "SELECT COUNT(*) FROM user_books WHERE {where} AND review_content IS NOT NULL AND review_content != ''",
+    'rating_stats': 'SELECT rating, COUNT(*) FROM user_books WHERE {where} AND rating IS NOT NULL GROUP BY rating ORDER BY rating DESC',
+    'last_crawl': 'SELECT MAX(created_at) FROM user_books WHERE {where}',
+}
+
+COUNT_BOOKS_SQL = 'SELECT COUNT(*) FROM books WHERE {where}'
+
+# browse_books 的分页查询：{order} 为 DESC（向更早翻页）或 ASC（向更新翻页），{op} 相应为 < 或 >
+BROWSE_BOOKS_SQL = f'SELECT {BROWSE_COLUMNS} FROM books WHERE {{where}} ORDER BY created_at {{order}}, id {{order}} LIMIT ?'
+BROWSE_TIE_FILTER = ' AND created_at = ? AND id {op} ?'
+BROWSE_RANGE_FILTER = ' AND created_at {op} ?'
+
+CLEAR_USER_BOOKS_SQL = 'DELETE FROM user_books WHERE user_id = ?'
+
+
+# 旧版 books 表中没有用户ID的记录迁移后所属的用户
+LEGACY_USER_ID = 'legacy_unknown_user'
+
+_SUBJECT_ID_PATTERN = re.compile(r'/subject/(\d+)')
+
+
+def subject_id_from_url(douban_url: str, title: str = None, author: str = None, publish_date: str = None) -> str:
+    """从豆瓣链接中提取书籍ID，无法识别时使用链接本身
+
+    没有链接时按书名、作者和出版日期生成ID，避免所有无链接的书籍共用同一条书目、互相覆盖书名和作者。
+    """
+    match = _SUBJECT_ID_PATTERN.search(douban_url or '')
+    if match:
+        return match.group(1)
+    if douban_url:
+        return douban_url
+    key = '|'.join(value or '' for value in (title, author, publish_date))
+    return 'local:' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def split_book_rows(books: List[Tuple], classifier: Optional[GenreClassifier] = None
+                    ) -> Tuple[List[Tuple], List[Tuple]]:
+    """将 add_book 字段顺序的记录拆分为书目参数和用户收藏参数，同时计算书籍类型"""
+    classifier = classifier or get_default_classifier()
+    catalog_params = []
+    user_params = []
+    for title, author, publish_date, douban_url, rating, review_content, review_date, user_id in books:
+        subject_id = subject_id_from_url(douban_url, title, author, publish_date)
+        catalog_params.append((subject_id, douban_url, title, author, publish_date))
+        user_params.append((user_id, subject_id, rating, review_content, review_date,
+                            classifier.classify(title, review_content)))
+    return catalog_params, user_params
+
+
+def reclassify_genres(conn: sqlite3.Connection, classifier: Optional[GenreClassifier] = None,
+                      user_id: Optional[str] = None, only_missing: bool = False) -> int:
+    """在数据库中批量重新计算书籍类型，返回更新的记录数（调用方负责提交）"""
+    classifier = classifier or get_default_classifier()
+    conn.create_function('classify_genre', 2, classifier.classify, deterministic=True)
+    conditions = []
+    params = []
+    if user_id is not None:
+        conditions.append('user_id = ?')
+        params.append(user_id)
+    if only_missing:
+        conditions.append('genre IS NULL')
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    return conn.execute(RECLASSIFY_GENRES_SQL + where, params).rowcount
+
+
+def ensure_book_schema(conn: sqlite3.Connection) -> None:
+    """创建书籍表结构；旧版本的 books 数据表会被迁移到 book_catalog/user_books，
+    缺少类型列的 user_books 会补上该列并计算已有书籍的类型"""
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'books'").fetchone()
+    legacy = bool(row and row[0] == 'table')
+    has_user_books = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_books'").fetchone()
+    missing_genre = bool(has_user_books) and not conn.execute(
+        "SELECT 1 FROM pragma_table_info('user_books') WHERE name = 'genre'").fetchone()
+    if legacy or missing_genre:
+        conn.execute('BEGIN')
+    if legacy:
+        # 先改名让出 books 名称给兼容视图，迁移完成后删除
+        conn.execute('ALTER TABLE books RENAME TO books_legacy')
+    try:
+        if missing_genre:
+            # 视图的列在创建时确定，加列后需要重建
+            conn.execute('ALTER TABLE user_books ADD COLUMN genre TEXT')
+            conn.execute('DROP VIEW IF EXISTS books')
+        for statement in BOOK_SCHEMA_STATEMENTS:
+            conn.execute(statement)
+        if legacy:
+            _migrate_legacy_books(conn)
+        if legacy or missing_genre:
+            updated = reclassify_genres(conn, only_missing=True)
+            logger.info(f"已为{updated}条收藏记录计算书籍类型")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _migrate_legacy_books(conn: sqlite3.Connection) -> None:
+    """把旧的 books 表数据拆分写入 book_catalog 和 user_books，再删除旧表
+
+    旧表中没有用户ID的记录归入 LEGACY_USER_ID 名下，不会在迁移中丢失。
+    """
+    conn.create_function('subject_id_from_url', 4, subject_id_from_url, deterministic=True)
+    orphans = conn.execute('SELECT COUNT(*) FROM books_legacy WHERE user_id IS NULL').fetchone()[0]
+    if orphans:
+        logger.warning(f"旧版books表中有{orphans}条记录没有用户ID，已迁移到用户 {LEGACY_USER_ID} 名下")
+    # 按更新时间顺序写入，同一本书保留最新的书目信息
+    conn.execute('''
+        INSERT OR REPLACE INTO book_catalog
+        (subject_id, douban_url, title, author, publish_date, created_at, updated_at)
+        SELECT subject_id_from_url(douban_url, title, author, publish_date), douban_url, title, author,
+               publish_date, created_at, updated_at
+        FROM books_legacy ORDER BY updated_at
+    ''')
+    cursor = conn.execute('''
+        INSERT OR REPLACE INTO user_books
+        (user_id, subject_id, rating, review_content, review_date, created_at, updated_at)
+        SELECT COALESCE(user_id, ?), subject_id_from_url(douban_url, title, author, publish_date),
+               rating, review_content, review_date, created_at, updated_at
+        FROM books_legacy ORDER BY id
+    ''', (LEGACY_USER_ID,))
+    conn.execute('DROP TABLE books_legacy')
+    logger.info(f"已将旧版books表迁移为book_catalog/user_books，共{cursor.rowcount}条记录")
+
+
+def connect_readonly(path: str) -> sqlite3.Connection:
+    """以只读模式打开数据库文件，用于工作进程并行读取，不会创建文件或持有写锁"""
+    uri = f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    conn.text_factory = str
+    return conn
+
+
+def build_stats_where(user_id: str, start_date: str = None, end_date: str = None) -> Tuple[str, tuple]:
+    """构建统计查询的条件子句和参数，支持日期范围过滤"""
+    base_where = 'user_id = ?'
+    params = [user_id]
+    if start_date and end_date:
+        base_where += ' AND review_date BETWEEN ? AND ?'
+        params.extend([start_date, end_date])
+    return base_where, tuple(params)
+
+
+def book_row_to_dict(book: Tuple) -> dict:
+    """将书籍查询结果行转换为字典格式"""
+    return {
+        'title': book[0],
+        'author': book[1],
+        'publish_date': book[2],
+        'douban_url': book[3],
+        'rating': book[4],
+        'review_content': book[5],
+        'review_date': book[6],
+        'created_at': book[7],
+        'genre': book[9] if len(book) > 9 else None
+    }
+
+
 class DoubanBookDB:
-    def __init__(self, db_path: str = "douban_books.db"):
+    def __init__(self, db_path: str = "douban_books.db", shard_dir: Optional[str] = None,
+                 shard_buckets: int = 0, readonly: bool = False,
+                 genre_classifier: Optional[GenreClassifier] = None):
+        """初始化数据库
+        
+        shard_dir 不为空时启用分片存储：db_path 作为目录库，只保存用户、爬取记录和分片映射，
+        每个用户的书籍数据写入 shard_dir 下独立的SQLite文件，不同用户可以并行写入。
+        shard_buckets > 0 时按用户ID哈希分到固定数量的分片文件，而不是每个用户一个文件。
+        readonly 为 True 时所有连接以只读模式打开且不初始化表结构，供导出工作进程并行读取。
+        genre_classifier 为写入书籍时计算类型所用的分类器，默认使用内置类型体系。
+        """
         self.db_path = db_path
+        self.genre_classifier = genre_classifier or get_default_classifier()
+        self.shard_dir = shard_dir
+        self.shard_buckets = shard_buckets
+        self.readonly = readonly
+        self._shard_files: Dict[str, str] = {}
+        # 各用户最近一次写入的序号，供缓存判断数据是否变化；next() 在多线程中也不会重复
+        self._write_counter = itertools.count(1)
+        self._write_versions: Dict[str, int] = {}
+        if readonly:
+            return
+        if shard_dir:
+            os.makedirs(shard_dir, exist_ok=True)
         self.init_database()
     
-    def _get_connection(self):
-        """获取数据库连接，确保使用UTF-8编码"""
-        conn = sqlite3.connect(self.db_path)
+    def write_version(self, user_id: str) -> int:
+        """用户书籍数据的版本：通过本对象每写入一次就会变化，没有写入过时为 0
+
+        只反映本进程中经由本对象的写入，用于界面缓存统计结果等场景。
+        """
+        return self._write_versions.get(user_id, 0)
+    
+    def _mark_written(self, user_ids) -> None:
+        """记录用户的书籍数据已被修改"""
+        for user_id in user_ids:
+            self._write_versions[user_id] = next(self._write_counter)
+    
+    @property
+    def sharded(self) -> bool:
+        """是否启用分片存储"""
+        return bool(self.shard_dir)
+    
+    def _get_connection(self, user_id: Optional[str] = None, create_shard: bool = False):
+        """获取数据库连接，确保使用UTF-8编码
+        
+        分片模式下传入 user_id 返回该用户所在分片的连接，否则返回目录库连接；
+        只有写入时（create_shard=True）才会为新用户创建分片，读取未知用户时返回空的内存库
+        """
+        path = self.db_path
+        if self.sharded and user_id is not None:
+            path = self._get_shard_path(user_id, create_shard)
+        if self.readonly and path is not None:
+            return connect_readonly(path)
+        conn = sqlite3.connect(path or ':memory:')
         # 设置数据库连接为UTF-8编码
         conn.text_factory = str
         conn.execute('PRAGMA encoding = "UTF-8"')
+        if path is None:
+            ensure_book_schema(conn)
         return conn
     
     def init_database(self) -> None:
@@ -21,89 +413,92 @@ class DoubanBookDB:
         conn = self._get_connection()
         cursor = conn.cursor()
         
-        # 创建书籍表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS books (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                author TEXT,
-                publish_date TEXT,
-                douban_url TEXT UNIQUE,
-                rating TEXT,
-                review_content TEXT,
-                review_date TEXT,
-                user_id TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # 创建用户表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT UNIQUE NOT NULL,
-                user_name TEXT,
-                last_crawl_time TIMESTAMP,
-                total_books INTEGER DEFAULT 0,
-                books_with_reviews INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # 创建爬取记录表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS crawl_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                start_time TIMESTAMP,
-                end_time TIMESTAMP,
-                pages_crawled INTEGER,
-                books_found INTEGER,
-                reviews_found INTEGER,
-                status TEXT,
-                error_message TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # 添加索引以提高查询性能
-        # books表索引
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_user_id ON books (user_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_rating ON books (rating)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_created_at ON books (created_at)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_user_id_created_at ON books (user_id, created_at)')
-        
-        # users表索引
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_user_id ON users (user_id)')
-        
-        # crawl_logs表索引
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_crawl_logs_user_id ON crawl_logs (user_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_crawl_logs_status ON crawl_logs (status)')
+        # 创建表结构并添加索引以提高查询性能；分片模式下书籍表只存在于各分片
+        if self.sharded:
+            statements = META_SCHEMA_STATEMENTS + SHARD_CATALOG_STATEMENTS
+        else:
+            ensure_book_schema(conn)
+            statements = META_SCHEMA_STATEMENTS
+        for statement in statements:
+            cursor.execute(statement)
         
         conn.commit()
         conn.close()
     
+    def _shard_file_name(self, user_id: str) -> str:
+        """计算用户对应的分片文件名"""
+        digest = hashlib.md5(user_id.encode('utf-8')).hexdigest()
+        if self.shard_buckets > 0:
+            return f"bucket_{int(digest, 16) % self.shard_buckets:04d}.db"
+        safe_name = re.sub(r'[^\w\-.]', '_', user_id)
+        # 用户ID含特殊字符时追加哈希，避免不同用户映射到同一文件
+        if safe_name != user_id:
+            safe_name = f"{safe_name}_{digest[:8]}"
+        return f"user_{safe_name}.db"
+    
+    def _get_shard_path(self, user_id: str, create: bool = False) -> Optional[str]:
+        """获取用户所在分片文件路径，首次写入时登记到目录库并初始化表结构"""
+        shard_file = self._shard_files.get(user_id)
+        if shard_file is None and self.readonly:
+            conn = connect_readonly(self.db_path)
+            row = conn.execute('SELECT shard_file FROM shards WHERE user_id = ?', (user_id,)).fetchone()
+            conn.close()
+            if not row:
+                return None
+            shard_file = self._shard_files[user_id] = row[0]
+        elif shard_file is None:
+            conn = sqlite3.connect(self.db_path)
+            row = conn.execute('SELECT shard_file FROM shards WHERE user_id = ?', (user_id,)).fetchone()
+            if row:
+                shard_file = row[0]
+            elif not create:
+                conn.close()
+                return None
+            else:
+                shard_file = self._shard_file_name(user_id)
+                conn.execute('INSERT OR IGNORE INTO shards (user_id, shard_file) VALUES (?, ?)',
+                             (user_id, shard_file))
+                conn.commit()
+            conn.close()
+            
+            shard_conn = sqlite3.connect(os.path.join(self.shard_dir, shard_file))
+            ensure_book_schema(shard_conn)
+            shard_conn.close()
+            self._shard_files[user_id] = shard_file
+        return os.path.join(self.shard_dir, shard_file)
+    
+    def _list_shard_paths(self) -> List[str]:
+        """列出目录库中登记的全部分片文件路径"""
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute('SELECT DISTINCT shard_file FROM shards ORDER BY shard_file').fetchall()
+        conn.close()
+        paths = [os.path.join(self.shard_dir, row[0]) for row in rows]
+        return [path for path in paths if os.path.exists(path)]
+    
+    def get_book_db_path(self, user_id: str) -> Optional[str]:
+        """返回保存该用户书籍的数据库文件路径，供其他进程只读打开；分片模式下用户没有数据时返回 None"""
+        if self.sharded:
+            return self._get_shard_path(user_id)
+        return self.db_path
+    
     def add_book(self, title: str, author: str, publish_date: str, douban_url: str, 
                  rating: str, review_content: str, review_date: str, user_id: str) -> bool:
         """添加或更新书籍记录"""
         try:
-            conn = self._get_connection()
+            conn = self._get_connection(user_id, create_shard=True)
             cursor = conn.cursor()
             
             # 使用事务来确保数据一致性
             conn.execute('BEGIN TRANSACTION')
             
-            # 使用 INSERT OR REPLACE 来处理重复的 URL
-            cursor.execute('''
-                INSERT OR REPLACE INTO books 
-                (title, author, publish_date, douban_url, rating, review_content, 
-                 review_date, user_id, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (title, author, publish_date, douban_url, rating, review_content, review_date, user_id))
+            subject_id = subject_id_from_url(douban_url, title, author, publish_date)
+            cursor.execute(UPSERT_CATALOG_SQL, (subject_id, douban_url, title, author, publish_date))
+            genre = self.genre_classifier.classify(title, review_content)
+            cursor.execute(UPSERT_USER_BOOK_SQL, (user_id, subject_id, rating, review_content, review_date, genre))
             
             conn.commit()
             conn.close()
+            self._mark_written([user_id])
             return True
         except sqlite3.Error as e:
             logger.error(f"SQLite错误 - 添加书籍失败: {e}")
@@ -122,35 +517,61 @@ class DoubanBookDB:
                 pass
             return False
     
+    def add_books(self, books: List[Tuple]) -> int:
+        """批量添加或更新书籍记录，单个事务写入，返回写入条数
+        
+        books 中每项的字段顺序与 add_book 参数一致：
+        (title, author, publish_date, douban_url, rating, review_content, review_date, user_id)
+        """
+        if not books:
+            return 0
+        if self.sharded:
+            # 分片模式下按用户分组，分别写入各自的分片
+            groups: Dict[str, List[Tuple]] = {}
+            for book in books:
+                groups.setdefault(book[7], []).append(book)
+            return sum(self._write_books(user_id, group) for user_id, group in groups.items())
+        return self._write_books(None, books)
+    
+    def _write_books(self, user_id: Optional[str], books: List[Tuple]) -> int:
+        """在单个事务中写入同一数据库文件的书籍记录"""
+        try:
+            conn = self._get_connection(user_id, create_shard=True)
+            cursor = conn.cursor()
+            
+            conn.execute('BEGIN TRANSACTION')
+            catalog_params, user_params = split_book_rows(books, self.genre_classifier)
+            cursor.executemany(UPSERT_CATALOG_SQL, catalog_params)
+            cursor.executemany(UPSERT_USER_BOOK_SQL, user_params)
+            
+            conn.commit()
+            conn.close()
+            self._mark_written({book[7] for book in books})
+            return len(books)
+        except sqlite3.Error as e:
+            logger.error(f"SQLite错误 - 批量添加书籍失败: {e}")
+            try:
+                conn.rollback()
+                conn.close()
+            except:
+                pass
+            return 0
+        except Exception as e:
+            logger.error(f"批量添加书籍失败: {e}")
+            try:
+                conn.rollback()
+                conn.close()
+            except:
+                pass
+            return 0
+    
     def get_books_by_user(self, user_id: str, has_review: Optional[bool] = None) -> List[Tuple]:
         """获取用户的书籍列表"""
         try:
-            conn = self._get_connection()
+            conn = self._get_connection(user_id)
             cursor = conn.cursor()
             
-            if has_review is None:
-                cursor.execute('''
-                    SELECT title, author, publish_date, douban_url, rating, 
-                           review_content, review_date, created_at, updated_at
-                    FROM books WHERE user_id = ?
-                    ORDER BY created_at DESC
-                ''', (user_id,))
-            elif has_review:
-                cursor.execute('''
-                    SELECT title, author, publish_date, douban_url, rating, 
-                           review_content, review_date, created_at, updated_at
-                    FROM books 
-                    WHERE user_id = ? AND review_content IS NOT NULL AND review_content != ''
-                    ORDER BY created_at DESC
-                ''', (user_id,))
-            else:
-                cursor.execute('''
-                    SELECT title, author, publish_date, douban_url, rating, 
-                           review_content, review_date, created_at, updated_at
-                    FROM books 
-                    WHERE user_id = ? AND (review_content IS NULL OR review_content = '')
-                    ORDER BY created_at DESC
-                ''', (user_id,))
+            cursor.execute(SELECT_BOOKS_SQL.format(where='user_id = ?' + REVIEW_FILTERS[has_review]), (user_id,))
             
             books = cursor.fetchall()
             conn.close()
@@ -173,16 +594,10 @@ class DoubanBookDB:
     def get_books_by_date_range(self, user_id: str, start_date: str, end_date: str) -> List[Tuple]:
         """根据日期范围获取用户的书籍列表"""
         try:
-            conn = self._get_connection()
+            conn = self._get_connection(user_id)
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT title, author, publish_date, douban_url, rating, 
-                       review_content, review_date, created_at, updated_at
-                FROM books 
-                WHERE user_id = ? AND review_date BETWEEN ? AND ?
-                ORDER BY created_at DESC
-            ''', (user_id, start_date, end_date))
+            cursor.execute(BOOKS_BY_DATE_RANGE_SQL, (user_id, start_date, end_date))
             
             books = cursor.fetchall()
             conn.close()
@@ -204,60 +619,145 @@ class DoubanBookDB:
     
     def get_books_by_rating(self, user_id: str, rating: str) -> List[Tuple]:
         """根据评分获取书籍列表"""
-        conn = self._get_connection()
+        conn = self._get_connection(user_id)
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT title, author, publish_date, douban_url, rating, 
-                   review_content, review_date, created_at
-            FROM books 
-            WHERE user_id = ? AND rating = ?
-            ORDER BY created_at DESC
-        ''', (user_id, rating))
+        cursor.execute(BOOKS_BY_RATING_SQL, (user_id, rating))
         
         books = cursor.fetchall()
         conn.close()
         return books
-    
+
+    def iter_books(self, user_id: str, start_date: str = None, end_date: str = None,
+                   has_review: Optional[bool] = None, batch_size: int = 500,
+                   rating: Optional[str] = None) -> Iterator[Tuple]:
+        """逐批从游标读取用户书籍，用于大数据量的流式导出，内存占用与书籍总数无关
+
+        返回记录的列见 EXPORT_COLUMNS（get_books_by_user 的9列之后追加 genre），支持日期范围、书评和评分过滤。
+        """
+        where, params = build_stats_where(user_id, start_date, end_date)
+        if rating is not None:
+            where += RATING_FILTER
+            params += (rating,)
+        conn = self._get_connection(user_id)
+        try:
+            cursor = conn.execute(ITER_BOOKS_SQL.format(where=where + REVIEW_FILTERS[has_review]), params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+    def count_books(self, user_id: str, start_date: str = None, end_date: str = None,
+                    rating: Optional[str] = None) -> int:
+        """统计 iter_books 将返回的记录数，用于导出进度"""
+        where, params = build_stats_where(user_id, start_date, end_date)
+        if rating is not None:
+            where += RATING_FILTER
+            params += (rating,)
+        conn = self._get_connection(user_id)
+        try:
+            return conn.execute(COUNT_BOOKS_SQL.format(where=where), params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def browse_books(self, user_id: str, after: Optional[Tuple[str, int]] = None,
+                     before: Optional[Tuple[str, int]] = None, limit: int = 200,
+                     rating: Optional[str] = None, start_date: str = None, end_date: str = None,
+                     text: Optional[str] = None) -> List[Tuple]:
+        """按收录时间倒序分页读取书籍，用于界面中的书籍列表
+
+        使用键集分页：after=(created_at, id) 返回排在该书之后（更早收录）的一页，before 返回排在该书
+        之前（更新收录）的一页，结果都按倒序排列。查询沿 (user_id, created_at) 或 (user_id, rating,
+        created_at) 索引读取，不使用 OFFSET，无论翻到哪里代价都相同。
+        text 在书名、作者和书评中做包含匹配（LIKE '%x%'），无法使用索引：每页沿索引逐条比对直到凑满 limit 条，
+        匹配很少时一页就要扫描该用户的大部分书籍，调用方应避免每次按键都查询。
+        返回的列见 BROWSE_COLUMNS，翻页键为每行的 (created_at, id)。
+        """
+        where, params = build_stats_where(user_id, start_date, end_date)
+        if rating is not None:
+            where += RATING_FILTER
+            params += (rating,)
+        if text:
+            pattern = '%' + re.sub(r'([\\%_])', r'\\\1', text) + '%'
+            where += " AND (title LIKE ? ESCAPE '\\' OR author LIKE ? ESCAPE '\\' OR review_content LIKE ? ESCAPE '\\')"
+            params += (pattern, pattern, pattern)
+        key = after if after is not None else before
+        order, op = ('ASC', '>') if after is None and before is not None else ('DESC', '<')
+
+        conn = self._get_connection(user_id)
+        try:
+            def fetch(condition: str, condition_params: tuple, count: int) -> List[Tuple]:
+                sql = BROWSE_BOOKS_SQL.format(where=where + condition, order=order)
+                return conn.execute(sql, params + condition_params + (count,)).fetchall()
+
+            if key is None:
+                rows = fetch('', (), limit)
+            else:
+                # 分两段读取而不用 (created_at, id) < (?, ?)：同一秒收录大量书籍时，行值比较只能按
+                # created_at 定位，需要逐条跳过同一秒内已显示的记录；分开后两段都是索引上的范围查找
+                created_at, book_id = key
+                rows = fetch(BROWSE_TIE_FILTER.format(op=op), (created_at, book_id), limit)
+                if len(rows) < limit:
+                    rows += fetch(BROWSE_RANGE_FILTER.format(op=op), (created_at,), limit - len(rows))
+        finally:
+            conn.close()
+        return rows[::-1] if order == 'ASC' else rows
+
+    def get_user_ids(self) -> List[str]:
+        """列出有书籍数据的全部用户ID；分片模式下读取目录库中的分片登记"""
+        conn = self._get_connection()
+        try:
+            if self.sharded:
+                rows = conn.execute('SELECT user_id FROM shards ORDER BY user_id').fetchall()
+            else:
+                rows = conn.execute('SELECT DISTINCT user_id FROM user_books ORDER BY user_id').fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def reclassify_genres(self, user_id: Optional[str] = None) -> int:
+        """用当前分类器重新计算已保存书籍的类型（更换类型体系后使用），返回更新的记录数"""
+        if self.sharded:
+            paths = [self._get_shard_path(user_id)] if user_id is not None else self._list_shard_paths()
+        else:
+            paths = [self.db_path]
+        updated = 0
+        for path in paths:
+            if path is None:
+                continue
+            conn = sqlite3.connect(path)
+            try:
+                updated += reclassify_genres(conn, self.genre_classifier, user_id)
+                conn.commit()
+            finally:
+                conn.close()
+        return updated
+
     def get_user_stats(self, user_id: str, start_date: str = None, end_date: str = None) -> Dict[str, any]:
         """获取用户统计信息，支持日期范围过滤"""
-        conn = self._get_connection()
+        conn = self._get_connection(user_id)
         cursor = conn.cursor()
         
-        # 构建基础查询条件
-        base_where = 'user_id = ?'
-        params = [user_id]
-        
-        # 添加日期范围过滤
-        if start_date and end_date:
-            base_where += ' AND review_date BETWEEN ? AND ?'
-            params.extend([start_date, end_date])
+        # 构建基础查询条件（含日期范围过滤）
+        base_where, params = build_stats_where(user_id, start_date, end_date)
         
         # 总书籍数
-        cursor.execute(f'SELECT COUNT(*) FROM books WHERE {base_where}', tuple(params))
+        cursor.execute(USER_STATS_SQL['total_books'].format(where=base_where), params)
         total_books = cursor.fetchone()[0]
         
         # 有书评的书籍数
-        cursor.execute(f'''
-            SELECT COUNT(*) FROM books 
-            WHERE {base_where} AND review_content IS NOT NULL AND review_content != ''
-        ''', tuple(params))
+        cursor.execute(USER_STATS_SQL['books_with_reviews'].format(where=base_where), params)
         books_with_reviews = cursor.fetchone()[0]
         
         # 各评分统计
-        cursor.execute(f'''
-            SELECT rating, COUNT(*) 
-            FROM books 
-            WHERE {base_where} AND rating IS NOT NULL 
-            GROUP BY rating
-            ORDER BY rating DESC
-        ''', tuple(params))
+        cursor.execute(USER_STATS_SQL['rating_stats'].format(where=base_where), params)
         rating_stats = dict(cursor.fetchall())
         
         # 最近爬取时间
-        cursor.execute(f'''
-            SELECT MAX(created_at) FROM books WHERE {base_where}
-        ''', tuple(params))
+        cursor.execute(USER_STATS_SQL['last_crawl'].format(where=base_where), params)
         last_crawl = cursor.fetchone()[0]
         
         conn.close()
@@ -289,12 +789,7 @@ class DoubanBookDB:
         conn = self._get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO crawl_logs 
-            (user_id, start_time, end_time, pages_crawled, books_found, 
-             reviews_found, status, error_message)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (user_id, start_time, end_time, pages_crawled, books_found, 
+        cursor.execute(INSERT_CRAWL_LOG_SQL, (user_id, start_time, end_time, pages_crawled, books_found, 
               reviews_found, status, error_message))
         
         conn.commit()
@@ -302,14 +797,104 @@ class DoubanBookDB:
     
     def clear_user_books(self, user_id: str) -> None:
         """清空用户的书籍数据"""
-        conn = self._get_connection()
+        self._mark_written([user_id])
+        if self.sharded and self.shard_buckets <= 0:
+            # 每用户一个分片时直接删除分片文件，不会在共享文件中留下碎片
+            self._detach_user_shard(user_id, None)
+            return
+        
+        conn = self._get_connection(user_id)
         cursor = conn.cursor()
         
-        cursor.execute('DELETE FROM books WHERE user_id = ?', (user_id,))
+        cursor.execute(CLEAR_USER_BOOKS_SQL, (user_id,))
         
         conn.commit()
         conn.close()
     
+    def archive_user(self, user_id: str, archive_dir: str) -> Optional[str]:
+        """归档用户数据：将用户的分片文件移动到归档目录，返回归档后的路径
+        
+        仅适用于每用户一个分片的模式；归档后的文件可直接作为普通数据库打开。
+        """
+        if not self.sharded or self.shard_buckets > 0:
+            logger.error("只有每用户独立分片的存储模式才支持按文件归档")
+            return None
+        os.makedirs(archive_dir, exist_ok=True)
+        self._mark_written([user_id])
+        return self._detach_user_shard(user_id, archive_dir)
+    
+    def _detach_user_shard(self, user_id: str, archive_dir: Optional[str]) -> Optional[str]:
+        """从目录库移除用户的分片登记，并删除或移动分片文件"""
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute('SELECT shard_file FROM shards WHERE user_id = ?', (user_id,)).fetchone()
+        conn.execute('DELETE FROM shards WHERE user_id = ?', (user_id,))
+        conn.commit()
+        conn.close()
+        self._shard_files.pop(user_id, None)
+        
+        if not row:
+            return None
+        shard_path = os.path.join(self.shard_dir, row[0])
+        if not os.path.exists(shard_path):
+            return None
+        if archive_dir is None:
+            os.remove(shard_path)
+            return None
+        target = os.path.join(archive_dir, row[0])
+        shutil.move(shard_path, target)
+        return target
+    
+    def get_global_stats(self) -> Dict[str, any]:
+        """获取全部用户的汇总统计；分片模式下通过 ATTACH 跨分片查询"""
+        if not self.sharded:
+            conn = self._get_connection()
+            result = self._collect_global_stats(conn, ['main'])
+            conn.close()
+            return result
+        
+        totals = {'total_users': 0, 'total_books': 0, 'books_with_reviews': 0, 'rating_stats': {}}
+        shard_paths = self._list_shard_paths()
+        conn = self._get_connection()
+        try:
+            # 每批最多 ATTACH MAX_ATTACHED 个分片，在一条 UNION ALL 查询中汇总
+            for i in range(0, len(shard_paths), MAX_ATTACHED):
+                batch = shard_paths[i:i + MAX_ATTACHED]
+                aliases = [f'shard{j}' for j in range(len(batch))]
+                for alias, path in zip(aliases, batch):
+                    conn.execute('ATTACH DATABASE ? AS ' + alias, (path,))
+                partial = self._collect_global_stats(conn, aliases)
+                for alias in aliases:
+                    conn.execute('DETACH DATABASE ' + alias)
+                
+                totals['total_users'] += partial['total_users']
+                totals['total_books'] += partial['total_books']
+                totals['books_with_reviews'] += partial['books_with_reviews']
+                for rating, count in partial['rating_stats'].items():
+                    totals['rating_stats'][rating] = totals['rating_stats'].get(rating, 0) + count
+        finally:
+            conn.close()
+        return totals
+    
+    def _collect_global_stats(self, conn, schemas: List[str]) -> Dict[str, any]:
+        """对给定的若干数据库（main 或已 ATTACH 的分片）执行汇总统计"""
+        union = ' UNION ALL '.join(
+            f'SELECT user_id, rating, review_content FROM {schema}.user_books' for schema in schemas)
+        row = conn.execute(f'''
+            SELECT COUNT(DISTINCT user_id), COUNT(*),
+                   SUM(CASE WHEN review_content IS NOT NULL AND review_content != '' THEN 1 ELSE 0 END)
+            FROM ({union})
+        ''').fetchone()
+        rating_stats = dict(conn.execute(f'''
+            SELECT rating, COUNT(*) FROM ({union})
+            WHERE rating IS NOT NULL GROUP BY rating ORDER BY rating DESC
+        ''').fetchall())
+        return {
+            'total_users': row[0] or 0,
+            'total_books': row[1] or 0,
+            'books_with_reviews': row[2] or 0,
+            'rating_stats': rating_stats
+        }
+    
     def export_to_dict(self, user_id: str, start_date: str = None, end_date: str = None) -> dict:
         """导出用户数据为字典格式，用于HTML生成，支持日期范围过滤"""
         if start_date and end_date:
@@ -322,17 +907,5 @@ class DoubanBookDB:
         return {
             'user_id': user_id,
             'stats': stats,
-            'books': [
-                {
-                    'title': book[0],
-                    'author': book[1],
-                    'publish_date': book[2],
-                    'douban_url': book[3],
-                    'rating': book[4],
-                    'review_content': book[5],
-                    'review_date': book[6],
-                    'created_at': book[7]
-                }
-                for book in books
-            ]
+            'books': [book_row_to_dict(book) for book in books]
         }
\ No newline at end of file
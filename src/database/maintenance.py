@@ -0,0 +1,240 @@
+import os
+import sqlite3
+from typing import Dict, List, Tuple
+from src.database.database import (
+    DoubanBookDB, REVIEW_FILTERS, SELECT_BOOKS_SQL, ITER_BOOKS_SQL, BOOKS_BY_DATE_RANGE_SQL,
+    BOOKS_BY_RATING_SQL, RATING_FILTER, USER_STATS_SQL, COUNT_BOOKS_SQL, BROWSE_BOOKS_SQL,
+    BROWSE_TIE_FILTER, BROWSE_RANGE_FILTER, CLEAR_USER_BOOKS_SQL, build_stats_where
+)
+from src.utils.logger import logger
+
+# DoubanBookDB 使用的查询集合，用于 EXPLAIN QUERY PLAN 索引审计
+# 语句取自 database.py 中的查询常量，这里只填入审计用的条件和参数
+_USER_WHERE, _USER_PARAMS = build_stats_where('u')
+_STATS_WHERE, _STATS_PARAMS = build_stats_where('u', '2000-01-01', '2099-12-31')
+_BROWSE_KEY = ('2099-12-31', 0)
+QUERY_SET: List[Tuple[str, str, tuple]] = [
+    ('get_books_by_user',
+     SELECT_BOOKS_SQL.format(where=_USER_WHERE + REVIEW_FILTERS[None]),
+     _USER_PARAMS),
+    ('get_books_by_user(has_review=True)',
+     SELECT_BOOKS_SQL.format(where=_USER_WHERE + REVIEW_FILTERS[True]),
+     _USER_PARAMS),
+    ('iter_books(日期范围)',
+     ITER_BOOKS_SQL.format(where=_STATS_WHERE),
+     _STATS_PARAMS),
+    ('get_books_by_date_range',
+     BOOKS_BY_DATE_RANGE_SQL,
+     _STATS_PARAMS),
+    ('get_books_by_rating',
+     BOOKS_BY_RATING_SQL,
+     _USER_PARAMS + ('5星',)),
+    *[(f'get_user_stats.{name}', sql.format(where=_STATS_WHERE), _STATS_PARAMS)
+      for name, sql in USER_STATS_SQL.items()],
+    ('count_books',
+     COUNT_BOOKS_SQL.format(where=_STATS_WHERE),
+     _STATS_PARAMS),
+    ('browse_books(同一秒内)',
+     BROWSE_BOOKS_SQL.format(where=_USER_WHERE + BROWSE_TIE_FILTER.format(op='<'), order='DESC'),
+     _USER_PARAMS + _BROWSE_KEY + (200,)),
+    ('browse_books',
+     BROWSE_BOOKS_SQL.format(where=_USER_WHERE + BROWSE_RANGE_FILTER.format(op='<'), order='DESC'),
+     _USER_PARAMS + _BROWSE_KEY[:1] + (200,)),
+    ('browse_books(rating)',
+     BROWSE_BOOKS_SQL.format(where=_USER_WHERE + RATING_FILTER + BROWSE_RANGE_FILTER.format(op='<'), order='DESC'),
+     _USER_PARAMS + ('5星',) + _BROWSE_KEY[:1] + (200,)),
+    # UPSERT 写入时按唯一约束查找冲突记录，这两条查询模拟该查找
+    ('add_book(书目冲突检测)',
+     'SELECT subject_id FROM book_catalog WHERE subject_id = ?',
+     ('1',)),
+    ('add_book(收藏冲突检测)',
+     'SELECT id FROM user_books WHERE user_id = ? AND subject_id = ?',
+     ('u', '1')),
+    ('clear_user_books',
+     CLEAR_USER_BOOKS_SQL,
+     _USER_PARAMS),
+]
+
+
+class DatabaseMaintenance:
+    """数据库维护：ANALYZE/optimize、增量回收空间、空间占用统计和索引审计
+
+    所有步骤都使用短事务并设置忙等待超时，可以在爬取进行中执行；
+    需要独占数据库的完整 VACUUM 仅在显式要求且数据库空闲时执行。
+    """
+
+    def __init__(self, db: DoubanBookDB, busy_timeout_ms: int = 5000):
+        self.db = db
+        self.busy_timeout_ms = busy_timeout_ms
+
+    def _get_connection(self, path: str):
+        """获取带忙等待超时的数据库连接"""
+        conn = sqlite3.connect(path)
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        return conn
+
+    def run(self, vacuum_pages: int = 1000, full_vacuum: bool = False) -> Dict[str, any]:
+        """执行全部维护步骤，返回维护报告；分片模式下逐个维护目录库和各分片文件"""
+        paths = [self.db.db_path]
+        if self.db.sharded:
+            paths.extend(self.db._list_shard_paths())
+
+        report = {'db_path': self.db.db_path, 'files': []}
+        for path in paths:
+            conn = self._get_connection(path)
+            try:
+                size_before = self._file_size(path)
+                report['files'].append({
+                    'path': path,
+                    'size_before': size_before,
+                    'analyze': self.analyze(conn),
+                    'vacuum': self.incremental_vacuum(conn, vacuum_pages, full_vacuum),
+                    'sizes': self.object_sizes(conn),
+                    'size_after': self._file_size(path),
+                })
+            finally:
+                conn.close()
+
+        # 索引审计需要书籍表：非分片模式用主库，分片模式用第一个分片
+        if self.db.sharded and len(paths) == 1:
+            report['index_audit'] = {'plans': [], 'used': [], 'unused': [], 'redundant': [], 'warnings': []}
+            return report
+        conn = self._get_connection(paths[1] if self.db.sharded else paths[0])
+        try:
+            report['index_audit'] = self.audit_indexes(conn)
+        finally:
+            conn.close()
+        return report
+
+    def analyze(self, conn) -> str:
+        """更新查询规划器统计信息"""
+        try:
+            conn.execute('ANALYZE')
+            conn.execute('PRAGMA optimize')
+            conn.commit()
+            return 'ok'
+        except sqlite3.OperationalError as e:
+            logger.warning(f"ANALYZE 执行失败（数据库可能正忙）: {e}")
+            return f'skipped: {e}'
+
+    def incremental_vacuum(self, conn, pages: int = 1000, full_vacuum: bool = False) -> Dict[str, any]:
+        """回收空闲页；auto_vacuum 未开启时可选执行一次完整 VACUUM 以启用增量模式"""
+        auto_vacuum = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        freelist_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        result = {'auto_vacuum': auto_vacuum, 'freelist_before': freelist_before, 'action': 'none'}
+
+        try:
+            if auto_vacuum == 2:
+                # 增量模式：每次只回收有限页数，持锁时间短
+                # execute() 只单步执行该 PRAGMA（每步回收一页），需用 executescript 执行到底
+                conn.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+                result['action'] = 'incremental'
+            elif full_vacuum:
+                # 开启增量模式需要一次完整 VACUUM，会独占数据库
+                conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                conn.execute('VACUUM')
+                result['action'] = 'full'
+            elif freelist_before:
+                result['action'] = 'skipped: auto_vacuum未开启，使用 full_vacuum 启用增量回收'
+        except sqlite3.OperationalError as e:
+            logger.warning(f"空间回收失败（数据库可能正忙）: {e}")
+            result['action'] = f'skipped: {e}'
+
+        result['freelist_after'] = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        return result
+
+    def object_sizes(self, conn) -> List[Tuple[str, str, int]]:
+        """统计每个表和索引占用的字节数，按大小降序"""
+        types = dict(conn.execute("SELECT name, type FROM sqlite_master").fetchall())
+        try:
+            rows = conn.execute('''
+                SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY SUM(pgsize) DESC
+            ''').fetchall()
+        except sqlite3.OperationalError:
+            # SQLite 未编译 dbstat 虚表时只报告总大小
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+            page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+            return [('(total)', 'database', page_size * page_count)]
+        return [(name, types.get(name, 'index' if name.startswith('sqlite_autoindex') else 'table'), size)
+                for name, size in rows]
+
+    def audit_indexes(self, conn) -> Dict[str, List]:
+        """用 EXPLAIN QUERY PLAN 检查查询集合，找出未使用、冗余和缺失的索引"""
+        indexes = {}
+        for name, table, sql in conn.execute('''
+            SELECT name, tbl_name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL
+        '''):
+            columns = [c.strip() for c in sql[sql.rindex('(') + 1:sql.rindex(')')].split(',')]
+            indexes[name] = (table, columns)
+
+        used = set()
+        plans = []
+        warnings = []
+        for query_name, sql, params in QUERY_SET:
+            try:
+                details = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+            except sqlite3.Error as e:
+                warnings.append((query_name, f'无法分析: {e}'))
+                continue
+            plans.append((query_name, details))
+            for detail in details:
+                for index_name in indexes:
+                    if f'INDEX {index_name} ' in f'{detail} ':
+                        used.add(index_name)
+                if detail.startswith('SCAN ') and 'INDEX' not in detail:
+                    warnings.append((query_name, f'全表扫描: {detail}'))
+                elif 'USE TEMP B-TREE' in detail:
+                    warnings.append((query_name, f'临时排序: {detail}'))
+
+        # 只审计被查询集合覆盖的表，其余表的索引不做判断
+        audited_tables = {'book_catalog', 'user_books'}
+        unused = sorted(name for name, (table, _) in indexes.items()
+                        if table in audited_tables and name not in used)
+
+        # 某个索引的列是另一个索引的前缀时视为冗余
+        redundant = []
+        for name, (table, columns) in indexes.items():
+            for other, (other_table, other_columns) in indexes.items():
+                if (name != other and table == other_table and len(columns) < len(other_columns)
+                        and other_columns[:len(columns)] == columns):
+                    redundant.append((name, other))
+                    break
+
+        return {
+            'plans': plans,
+            'used': sorted(used),
+            'unused': unused,
+            'redundant': sorted(redundant),
+            'warnings': warnings,
+        }
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        """数据库文件大小（字节）"""
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def format_report(report: Dict[str, any]) -> List[str]:
+        """将维护报告格式化为便于日志输出的文本行"""
+        lines = [f"数据库维护: {report['db_path']}"]
+        for file_report in report['files']:
+            if len(report['files']) > 1:
+                lines.append(f"  文件: {file_report['path']}")
+            lines.append(f"  ANALYZE/optimize: {file_report['analyze']}")
+            vacuum = file_report['vacuum']
+            lines.append(f"  空间回收: {vacuum['action']} (空闲页 {vacuum['freelist_before']} -> {vacuum['freelist_after']})")
+            lines.append(f"  文件大小: {file_report['size_before']} -> {file_report['size_after']} 字节")
+            lines.append("  空间占用:")
+            for name, obj_type, size in file_report['sizes']:
+                lines.append(f"    {name} ({obj_type}): {size} 字节")
+        audit = report['index_audit']
+        for name in audit['unused']:
+            lines.append(f"  未使用的索引: {name}（查询集合中没有任何查询用到，写入时仍需维护）")
+        for name, other in audit['redundant']:
+            lines.append(f"  冗余索引: {name}（是 {other} 的前缀）")
+        for query_name, warning in audit['warnings']:
+            lines.append(f"  可能缺少索引: {query_name} - {warning}")
+        return lines
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import importlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from src.database.database import DoubanBookDB
+from src.utils.logger import logger
+
+# 支持的导出格式：格式名 -> (模块, 导出器类, 文件后缀)；导出器在工作进程中按需导入
+EXPORT_FORMATS = {
+    'html': ('src.exporter.html_exporter', 'HTMLExporter', '.html'),
+    'csv': ('src.exporter.csv_exporter', 'CSVExporter', '.csv'),
+    'parquet': ('src.exporter.parquet_exporter', 'ParquetExporter', '.parquet'),
+    'ndjson': ('src.exporter.ndjson_exporter', 'NDJSONExporter', '.ndjson'),
+    'excel': ('src.exporter.excel_exporter', 'ExcelExporter', '.xlsx'),
+}
+
+SUMMARY_FILE = 'batch_summary.json'
+
+
+class BatchExporter:
+    """多用户批量导出：每个 (用户, 格式) 作为一个任务在进程池中并行执行
+
+    HTML 渲染等导出工作是纯 Python 的 CPU 计算，多进程才能利用多个核心。
+    每个工作进程以只读模式打开数据库，不与爬虫或其他进程争用写锁。
+    完成后在输出目录写入 batch_summary.json，记录每个任务的耗时和文件大小。
+    """
+
+    def __init__(self, formats: List[str] = None, workers: Optional[int] = None,
+                 exporter_options: Optional[Dict[str, Dict]] = None):
+        self.formats = formats or ['html']
+        unknown = [fmt for fmt in self.formats if fmt not in EXPORT_FORMATS]
+        if unknown:
+            raise ValueError(f"不支持的导出格式: {', '.join(unknown)}，可选: {', '.join(EXPORT_FORMATS)}")
+        self.workers = workers
+        # 各格式导出器的构造参数，如 {'html': {'compact': True}}
+        self.exporter_options = exporter_options or {}
+
+    def export_users(self, db: DoubanBookDB, output_dir: str, user_ids: Optional[List[str]] = None,
+                     start_date: str = None, end_date: str = None,
+                     progress_callback: Optional[Callable[[int, int, Dict], None]] = None) -> Dict:
+        """导出多个用户（默认全部用户），返回汇总信息
+
+        progress_callback(已完成任务数, 任务总数, 任务结果) 在每个任务完成时调用。
+        """
+        started = time.perf_counter()
+        os.makedirs(output_dir, exist_ok=True)
+        user_ids = user_ids if user_ids is not None else db.get_user_ids()
+        # 工作进程只读打开数据库，表结构需要的升级先在这里完成
+        for user_id in user_ids:
+            db.get_book_db_path(user_id)
+        tasks = [
+            {
+                'db_path': db.db_path,
+                'shard_dir': db.shard_dir,
+                'user_id': user_id,
+                'format': fmt,
+                'options': self.exporter_options.get(fmt, {}),
+                'output_file': os.path.join(output_dir, f"{user_id}_豆瓣书评{EXPORT_FORMATS[fmt][2]}"),
+                'start_date': start_date,
+                'end_date': end_date,
+            }
+            for user_id in user_ids
+            for fmt in self.formats
+        ]
+
+        results = []
+        for result in self._run_tasks(tasks):
+            results.append(result)
+            status = '完成' if result['success'] else '失败'
+            logger.info(f"[{len(results)}/{len(tasks)}] {result['user_id']} {result['format']} "
+                        f"{status}，耗时 {result['seconds']:.2f} 秒")
+            if progress_callback:
+                progress_callback(len(results), len(tasks), result)
+
+        summary = self._build_summary(results, time.perf_counter() - started)
+        with open(os.path.join(output_dir, SUMMARY_FILE), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        logger.info(f"批量导出完成：{summary['succeeded']}/{summary['total_tasks']} 个任务成功，"
+                    f"总耗时 {summary['wall_seconds']:.2f} 秒（任务累计 {summary['task_seconds']:.2f} 秒）")
+        return summary
+
+    def _run_tasks(self, tasks: List[Dict]):
+        """执行导出任务，按完成顺序产出结果；只有一个工作进程时直接在当前进程执行"""
+        workers = self.workers or os.cpu_count() or 1
+        workers = min(workers, len(tasks))
+        if workers <= 1:
+            for task in tasks:
+                yield _export_task(task)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_export_task, task) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _build_summary(self, results: List[Dict], wall_seconds: float) -> Dict:
+        """汇总各任务的耗时：总耗时、任务累计耗时、按格式统计"""
+        by_format: Dict[str, Dict] = {}
+        for result in results:
+            entry = by_format.setdefault(result['format'], {'tasks': 0, 'seconds': 0.0, 'bytes': 0})
+            entry['tasks'] += 1
+            entry['seconds'] += result['seconds']
+            entry['bytes'] += result['size']
+        return {
+            'finished_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'workers': self.workers or os.cpu_count() or 1,
+            'total_tasks': len(results),
+            'succeeded': sum(1 for result in results if result['success']),
+            'wall_seconds': wall_seconds,
+            'task_seconds': sum(result['seconds'] for result in results),
+            'by_format': by_format,
+            'tasks': sorted(results, key=lambda result: (result['user_id'], result['format'])),
+        }
+
+
+def _export_task(task: Dict) -> Dict:
+    """在工作进程中执行一个导出任务：只读打开数据库，调用对应格式的导出器"""
+    started = time.perf_counter()
+    result = {'user_id': task['user_id'], 'format': task['format'], 'output_file': task['output_file'],
+              'success': False, 'size': 0, 'error': None}
+    try:
+        module_name, class_name, _ = EXPORT_FORMATS[task['format']]
+        exporter_class = getattr(importlib.import_module(module_name), class_name)
+        exporter = exporter_class(**task['options'])
+        db = DoubanBookDB(task['db_path'], shard_dir=task['shard_dir'], readonly=True)
+        result['success'] = bool(exporter.export_user_books(
+            db, task['user_id'], task['output_file'], task['start_date'], task['end_date']))
+        if result['success']:
+            result['size'] = os.path.getsize(task['output_file'])
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - started
+    return result
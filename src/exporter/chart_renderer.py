@@ -0,0 +1,186 @@
+import os
+import json
+import base64
+import shutil
+import hashlib
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from src.exporter.report_stats import ReportStats
+from src.utils.logger import logger
+
+# 修改图表样式后递增，使磁盘上缓存的图片失效
+CHART_VERSION = 1
+
+# 报告中的图表：名称 -> 标题，按此顺序显示
+CHART_TITLES = {
+    'rating': '评分分布',
+    'yearly': '每年阅读数量',
+    'pace': '阅读节奏（每月）',
+}
+
+# 按顺序选用系统中第一个可用的中文字体，都没有时使用 matplotlib 默认字体
+CJK_FONTS = ['Microsoft YaHei', 'SimHei', 'PingFang SC', 'Noto Sans CJK SC', 'Source Han Sans SC',
+             'WenQuanYi Micro Hei', 'Heiti SC']
+
+
+def chart_data(stats: ReportStats) -> Dict[str, Dict[str, list]]:
+    """从统计结果提取各图表的数据 {名称: {'labels': [...], 'values': [...]}}，没有数据的图表不包含在内"""
+    charts = {}
+    if stats.rating_counts:
+        ratings = sorted(stats.rating_counts, reverse=True)
+        charts['rating'] = {'labels': ratings, 'values': [stats.rating_counts[r] for r in ratings]}
+    if stats.yearly_counts:
+        years = sorted(stats.yearly_counts)
+        charts['yearly'] = {'labels': [str(year) for year in years],
+                            'values': [stats.yearly_counts[year] for year in years]}
+    if stats.monthly_counts:
+        # 补齐没有读书的月份，节奏图的横轴是连续的时间
+        first, last = min(stats.monthly_counts), max(stats.monthly_counts)
+        months = []
+        year, month = first
+        while (year, month) <= last:
+            months.append((year, month))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        charts['pace'] = {'labels': [f"{year}-{month:02d}" for year, month in months],
+                          'values': [stats.monthly_counts.get(key, 0) for key in months]}
+    return charts
+
+
+class ChartBatch:
+    """一次报告导出的图表：图片路径在提交时即可确定，wait() 等待后台渲染完成"""
+
+    def __init__(self, charts: List[Dict], executor: Optional[ProcessPoolExecutor] = None, future=None):
+        self.charts = charts
+        self._executor = executor
+        self._future = future
+
+    def wait(self) -> List[Dict]:
+        """等待渲染完成，返回成功生成图片的图表"""
+        if self._future is not None:
+            try:
+                self._future.result()
+            except Exception as e:
+                logger.warning(f"图表渲染失败: {e}")
+            finally:
+                self._executor.shutdown()
+                self._future = None
+        return [chart for chart in self.charts if os.path.exists(chart['path'])]
+
+
+class ChartRenderer:
+    """报告图表渲染器：用 matplotlib 的 Agg 后端在工作进程中把统计数据画成 PNG
+
+    图片以图表数据的哈希命名保存在 cache_dir 中，统计数据没有变化的图表直接复用，不会启动工作进程。
+    渲染在后台进行，调用方可以在等待期间继续写入书籍列表。
+    """
+
+    def __init__(self, cache_dir: str, in_process: bool = False):
+        self.cache_dir = cache_dir
+        # 打包环境等无法启动子进程时在当前进程中渲染
+        self.in_process = in_process
+        self.available = importlib.util.find_spec('matplotlib') is not None
+        self.rendered = 0
+        self.reused = 0
+
+    @staticmethod
+    def chart_key(name: str, data: Dict[str, list]) -> str:
+        """图表图片的文件名：图表名称、样式版本和数据共同决定"""
+        payload = json.dumps([CHART_VERSION, name, data], ensure_ascii=False)
+        return f"{name}-{hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]}.png"
+
+    def submit(self, stats: ReportStats) -> ChartBatch:
+        """开始渲染统计结果对应的图表，缓存中已有的图表不重新渲染"""
+        if not self.available:
+            logger.warning("未安装 matplotlib，报告中不包含图表")
+            return ChartBatch([])
+        os.makedirs(self.cache_dir, exist_ok=True)
+        charts = []
+        missing = []
+        for name, data in chart_data(stats).items():
+            chart = {'name': name, 'title': CHART_TITLES[name],
+                     'path': os.path.join(self.cache_dir, self.chart_key(name, data))}
+            charts.append(chart)
+            if os.path.exists(chart['path']):
+                self.reused += 1
+            else:
+                missing.append(dict(chart, data=data))
+        if not missing:
+            return ChartBatch(charts)
+
+        self.rendered += len(missing)
+        if self.in_process:
+            _render_charts(missing)
+            return ChartBatch(charts)
+        try:
+            executor = ProcessPoolExecutor(max_workers=1)
+            return ChartBatch(charts, executor, executor.submit(_render_charts, missing))
+        except OSError as e:
+            logger.warning(f"无法启动图表渲染进程，改为在当前进程中渲染: {e}")
+            _render_charts(missing)
+            return ChartBatch(charts)
+
+
+def chart_data_uri(path: str) -> str:
+    """把PNG图片转换为可直接嵌入页面的 data URI"""
+    with open(path, 'rb') as f:
+        return 'data:image/png;base64,' + base64.b64encode(f.read()).decode('ascii')
+
+
+def publish_charts(charts: List[Dict], target_dir: str) -> None:
+    """把图表图片复制到报告旁的目录，并删除该目录中不再使用的旧图片"""
+    os.makedirs(target_dir, exist_ok=True)
+    names = {os.path.basename(chart['path']) for chart in charts}
+    for chart in charts:
+        target = os.path.join(target_dir, os.path.basename(chart['path']))
+        if os.path.abspath(target) != os.path.abspath(chart['path']) and not os.path.exists(target):
+            shutil.copyfile(chart['path'], target)
+    for name in os.listdir(target_dir):
+        if name.endswith('.png') and name not in names:
+            os.remove(os.path.join(target_dir, name))
+
+
+def _render_charts(charts: List[Dict]) -> None:
+    """在工作进程中渲染图表；每张图先写临时文件再替换，中途失败不会留下残缺的缓存"""
+    import logging
+    import warnings
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib import font_manager
+
+    logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+    installed = {font.name for font in font_manager.fontManager.ttflist}
+    fonts = [font for font in CJK_FONTS if font in installed]
+    if fonts:
+        plt.rcParams['font.sans-serif'] = fonts + plt.rcParams['font.sans-serif']
+    else:
+        # 没有中文字体时图中只保留数字和符号，标题由页面中的图片说明显示
+        warnings.filterwarnings('ignore', message='Glyph .* missing from font')
+    plt.rcParams['axes.unicode_minus'] = False
+
+    for chart in charts:
+        labels, values = chart['data']['labels'], chart['data']['values']
+        if not fonts:
+            labels = [label.replace('星', '★').replace('未评分', '-') for label in labels]
+        fig, ax = plt.subplots(figsize=(6, 3.2), dpi=100)
+        if chart['name'] == 'pace':
+            ax.plot(range(len(values)), values, color='#2E7D32', marker='o' if len(values) <= 24 else None)
+            ax.fill_between(range(len(values)), values, color='#2E7D32', alpha=0.15)
+            # 月份很多时只标注部分刻度
+            step = max(1, len(labels) // 12)
+            ax.set_xticks(range(0, len(labels), step))
+            ax.set_xticklabels(labels[::step], rotation=45, ha='right', fontsize=8)
+        else:
+            ax.bar(range(len(values)), values, color='#4CAF50')
+            ax.set_xticks(range(len(labels)))
+            ax.set_xticklabels(labels, rotation=45 if len(labels) > 8 else 0, fontsize=8)
+        if fonts:
+            ax.set_title(chart['title'])
+            ax.set_ylabel('书籍数')
+        ax.spines[['top', 'right']].set_visible(False)
+        fig.tight_layout()
+        temp_file = f"{chart['path']}.part"
+        fig.savefig(temp_file, format='png')
+        plt.close(fig)
+        os.replace(temp_file, chart['path'])
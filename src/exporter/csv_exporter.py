@@ -1,93 +1,254 @@
 import csv
+import gzip
+import hashlib
+import io
+import json
 import os
-from typing import List, Dict
+from collections import deque
+from itertools import islice
+from typing import Callable, Deque, Iterable, Iterator, List, Dict, Optional, Tuple
 from src.database.database import DoubanBookDB
+from src.exporter.fanout import FanoutWriter, group_filename
+from src.exporter.fragment_cache import FragmentCache
+from src.exporter.progress import ExportProgress
+from src.exporter.report_stats import GROUP_BY_CHOICES, book_group, order_groups
 from src.utils.logger import logger
 from datetime import datetime
 
+# 可导出的列：(列名, 表头)，前10列与 iter_books 返回记录的列顺序一致，user_id 在导出时追加到行尾
+CSV_COLUMNS: List[Tuple[str, str]] = [
+    ('title', '书名'),
+    ('author', '作者'),
+    ('publish_date', '出版日期'),
+    ('douban_url', '豆瓣链接'),
+    ('rating', '评分'),
+    ('review_content', '书评内容'),
+    ('review_date', '评分日期'),
+    ('created_at', '爬取时间'),
+    ('updated_at', '更新时间'),
+    ('genre', '类型'),
+    ('user_id', '用户ID'),
+]
+DEFAULT_COLUMNS = [name for name, _ in CSV_COLUMNS[:9]]
+_COLUMN_INDEX = {name: i for i, (name, _) in enumerate(CSV_COLUMNS)}
+_COLUMN_HEADERS = dict(CSV_COLUMNS)
+
+# 导出进度各阶段的权重：查询只统计行数，耗时几乎全部在写入
+CSV_PROGRESS_PHASES = {'query': 1, 'write': 99}
+
+# 修改输出格式后递增，使导出清单中记录的内容摘要失效
+CSV_FORMAT_VERSION = 1
+
 class CSVExporter:
-    def __init__(self):
-        """初始化CSV导出器"""
-        self.headers = [
-            '书名', '作者', '出版日期', '豆瓣链接', '评分', 
-            '书评内容', '评分日期', '爬取时间', '更新时间'
-        ]
-    
-    def export_user_books(self, db: DoubanBookDB, user_id: str, output_file: str, 
-                         start_date: str = None, end_date: str = None) -> bool:
-        """导出用户书籍数据为CSV文件"""
+    def __init__(self, cache_dir: Optional[str] = None, columns: Optional[List[str]] = None,
+                 compress: bool = False, chunk_size: int = 1000):
+        """初始化CSV导出器
+
+        columns 指定导出的列及顺序（见 CSV_COLUMNS），默认导出前9列（不含类型和用户ID）；
+        compress 为 True 或输出文件名以 .gz 结尾时写入 gzip 压缩文件；
+        指定 cache_dir 时按书籍内容哈希复用已格式化的CSV行。
+        """
+        self.columns = list(columns) if columns else list(DEFAULT_COLUMNS)
+        unknown = [name for name in self.columns if name not in _COLUMN_INDEX]
+        if unknown:
+            raise ValueError(f"未知的CSV列: {', '.join(unknown)}")
+        self.headers = [_COLUMN_HEADERS[name] for name in self.columns]
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self.cache = FragmentCache(cache_dir) if cache_dir else None
+        self._indexes = [_COLUMN_INDEX[name] for name in self.columns]
+        self._needs_user_id = 'user_id' in self.columns
+
+    def _open_output(self, path: str, output_file: str):
+        """打开输出文件（文本模式，带BOM以便Excel识别UTF-8），按目标文件名或 compress 选项使用gzip压缩"""
+        if self.compress or output_file.endswith('.gz'):
+            return gzip.open(path, 'wt', newline='', encoding='utf-8-sig', compresslevel=6)
+        return open(path, 'w', newline='', encoding='utf-8-sig')
+
+    def _project(self, rows: Iterable[Tuple], user_id: str) -> Iterator[Tuple]:
+        """把数据库记录转换为所选列的输出行，空值写为空字符串"""
+        for row in rows:
+            yield self._project_row(row, user_id)
+
+    def _project_row(self, row: Tuple, user_id: str) -> Tuple:
+        """把一条数据库记录转换为所选列的输出行"""
+        if self._needs_user_id:
+            row = row + (user_id,)
+        return tuple(row[i] or '' for i in self._indexes)
+
+    def _format_line(self, row) -> str:
+        """把一行输出数据格式化为CSV文本行"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(row)
+        return buffer.getvalue()
+
+    def _write_rows(self, f, writer, rows: Iterator[Tuple]) -> int:
+        """分块写入数据行，返回写入的行数"""
+        count = 0
+        if self.cache:
+            namespace = 'csv:' + ','.join(self.columns)
+            for line in self.cache.render(rows, namespace, self._format_line):
+                f.write(line)
+                count += 1
+            return count
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return count
+            writer.writerows(chunk)
+            count += len(chunk)
+
+    def _export_stream(self, output_file: str, sources: Iterable[Tuple[str, Iterable[Tuple]]]) -> int:
+        """把若干 (用户ID, 记录游标) 依次写入同一个CSV文件，返回写入的行数
+
+        先写入临时文件，成功后再替换目标文件；没有任何数据行时不生成文件。
+        """
+        temp_file = f"{output_file}.part"
         try:
-            # 获取用户数据
-            if start_date and end_date:
-                books = db.get_books_by_date_range(user_id, start_date, end_date)
-            else:
-                books = db.get_books_by_user(user_id)
-            
-            if not books:
-                logger.error(f"用户 {user_id} 在指定时间范围内没有书籍数据")
-                return False
-            
-            # 写入CSV文件
-            with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
+            count = 0
+            with self._open_output(temp_file, output_file) as f:
                 writer = csv.writer(f)
-                # 写入表头
                 writer.writerow(self.headers)
-                
-                # 写入数据行
-                for book in books:
-                    row = [
-                        book[0] or '',  # 书名
-                        book[1] or '',  # 作者
-                        book[2] or '',  # 出版日期
-                        book[3] or '',  # 豆瓣链接
-                        book[4] or '',  # 评分
-                        book[5] or '',  # 书评内容
-                        book[6] or '',  # 评分日期
-                        book[7] or '',  # 爬取时间
-                        book[8] or ''   # 更新时间
-                    ]
-                    writer.writerow(row)
-            
+                for user_id, rows in sources:
+                    count += self._write_rows(f, writer, self._project(rows, user_id))
+            if count:
+                os.replace(temp_file, output_file)
+            return count
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def _content_digest(self, db: DoubanBookDB, user_id: str, output_file: str,
+                        start_date: str = None, end_date: str = None) -> str:
+        """导出内容的摘要：导出选项加上全部输出行，与上次导出相同时无需重写文件"""
+        digest = hashlib.sha1(json.dumps(
+            [CSV_FORMAT_VERSION, self.columns, self.compress or output_file.endswith('.gz'),
+             user_id, start_date, end_date]
+        ).encode('utf-8'))
+        for row in self._project(db.iter_books(user_id, start_date, end_date, batch_size=self.chunk_size),
+                                 user_id):
+            digest.update(json.dumps(row, ensure_ascii=False).encode('utf-8'))
+        return digest.hexdigest()
+
+    def export_user_books(self, db: DoubanBookDB, user_id: str, output_file: str,
+                         start_date: str = None, end_date: str = None,
+                         progress_callback: Optional[Callable[[Dict], None]] = None) -> bool:
+        """导出用户书籍数据为CSV文件，书籍从数据库游标分块读取后直接写入
+
+        progress_callback 接收导出进度（见 ExportProgress），按查询、写入两个阶段报告。
+        指定 cache_dir 时先计算内容摘要，与上次导出相同则跳过整个文件的写入。
+        """
+        try:
+            progress = ExportProgress(progress_callback, CSV_PROGRESS_PHASES)
+            total = progress.query_total(lambda: db.count_books(user_id, start_date, end_date))
+            digest = None
+            if self.cache:
+                digest = self._content_digest(db, user_id, output_file, start_date, end_date)
+                if self.cache.is_unchanged(output_file, digest):
+                    logger.info(f"书籍数据没有变化，跳过导出: {output_file}")
+                    return True
+            rows = progress.track(db.iter_books(user_id, start_date, end_date, batch_size=self.chunk_size),
+                                  'write', total)
+            if not self._export_stream(output_file, [(user_id, rows)]):
+                logger.error(f"用户 {user_id} 在指定时间范围内没有书籍数据")
+                return False
+            if digest is not None:
+                self.cache.save_manifest(output_file, digest)
+
             logger.info(f"CSV文件已导出到: {output_file}")
             return True
-            
+
         except Exception as e:
             logger.error(f"CSV导出失败: {e}")
             return False
-    
+
     def export_books_by_rating(self, db: DoubanBookDB, user_id: str, rating: str, output_file: str) -> bool:
         """按评分导出书籍为CSV文件"""
         try:
-            books = db.get_books_by_rating(user_id, rating)
-            
-            if not books:
+            rows = db.iter_books(user_id, rating=rating, batch_size=self.chunk_size)
+            if not self._export_stream(output_file, [(user_id, rows)]):
                 logger.error(f"用户 {user_id} 没有 {rating} 的书籍")
                 return False
-            
-            # 写入CSV文件
-            with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                # 写入表头
-                writer.writerow(self.headers)
-                
-                # 写入数据行
-                for book in books:
-                    row = [
-                        book[0] or '',  # 书名
-                        book[1] or '',  # 作者
-                        book[2] or '',  # 出版日期
-                        book[3] or '',  # 豆瓣链接
-                        book[4] or '',  # 评分
-                        book[5] or '',  # 书评内容
-                        book[6] or '',  # 评分日期
-                        book[7] or '',  # 爬取时间
-                        book[8] or ''   # 更新时间
-                    ]
-                    writer.writerow(row)
-            
+
             logger.info(f"按评分 {rating} 导出的CSV文件已保存到: {output_file}")
             return True
-            
+
         except Exception as e:
             logger.error(f"按评分导出CSV失败: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def export_split(self, db: DoubanBookDB, user_id: str, output_dir: str, group_by: str = 'rating',
+                     start_date: str = None, end_date: str = None) -> Dict[str, str]:
+        """按评分或年份拆分导出：一遍读取用户书籍，每行直接写入所属分组的CSV文件
+
+        返回 {分组: 文件路径}，如 {'5星': 'out/user123_5星.csv', ...}；没有数据或失败时返回空字典。
+        """
+        if group_by not in GROUP_BY_CHOICES:
+            raise ValueError(f"不支持的分组方式: {group_by}，可选: {', '.join(GROUP_BY_CHOICES)}")
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            suffix = '.csv.gz' if self.compress else '.csv'
+            writers = {}
+
+            def open_sink(group, path):
+                f = self._open_output(path, path)
+                writers[group] = csv.writer(f)
+                writers[group].writerow(self.headers)
+                return f
+
+            with FanoutWriter(open_sink) as fanout:
+                rows = db.iter_books(user_id, start_date, end_date, batch_size=self.chunk_size)
+                if self.cache:
+                    # 缓存按批查找，先记下每行的分组，取回格式化好的行后按顺序分发
+                    groups = deque()
+                    lines = self.cache.render(self._project(self._record_groups(rows, group_by, groups), user_id),
+                                              'csv:' + ','.join(self.columns), self._format_line)
+                    for line in lines:
+                        group = groups.popleft()
+                        fanout.get(group, os.path.join(output_dir, group_filename(user_id, group, suffix))).write(line)
+                else:
+                    for row in rows:
+                        group = book_group(row, group_by)
+                        fanout.get(group, os.path.join(output_dir, group_filename(user_id, group, suffix)))
+                        writers[group].writerow(self._project_row(row, user_id))
+                committed = fanout.commit()
+                files = {group: committed[group] for group in order_groups(committed)}
+
+            if not files:
+                logger.error(f"用户 {user_id} 在指定时间范围内没有书籍数据")
+                return {}
+
+            logger.info(f"已按{'评分' if group_by == 'rating' else '年份'}拆分导出 {len(files)} 个CSV文件到: {output_dir}")
+            return files
+
+        except Exception as e:
+            logger.error(f"拆分导出CSV失败: {e}")
+            return {}
+
+    @staticmethod
+    def _record_groups(rows: Iterable[Tuple], group_by: str, groups: Deque[str]) -> Iterator[Tuple]:
+        """原样产出记录，同时按顺序记下每条记录的分组"""
+        for row in rows:
+            groups.append(book_group(row, group_by))
+            yield row
+
+    def export_all_users(self, db: DoubanBookDB, output_file: str,
+                         user_ids: Optional[List[str]] = None) -> int:
+        """把多个用户（默认全部用户）的书籍导出到同一个CSV文件，返回导出的书籍数
+
+        逐个用户流式读取，内存占用与总行数无关；建议在 columns 中包含 user_id 以区分用户。
+        """
+        try:
+            user_ids = user_ids if user_ids is not None else db.get_user_ids()
+            sources = ((user_id, db.iter_books(user_id, batch_size=self.chunk_size)) for user_id in user_ids)
+            count = self._export_stream(output_file, sources)
+            if not count:
+                logger.error("没有可导出的书籍数据")
+                return 0
+
+            logger.info(f"{len(user_ids)} 个用户的 {count} 本书籍已导出到: {output_file}")
+            return count
+
+        except Exception as e:
+            logger.error(f"批量导出CSV失败: {e}")
+            return 0
@@ -0,0 +1,155 @@
+import os
+import re
+from typing import Callable, Dict, Optional, Tuple
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font
+
+from src.database.database import DoubanBookDB, book_row_to_dict
+from src.exporter.progress import ExportProgress
+from src.exporter.report_stats import GROUP_BY_CHOICES, ReportStats, book_group, order_groups
+from src.utils.logger import logger
+
+# 导出进度各阶段的权重，按实测耗时的大致比例：逐行写入工作表，最后压缩保存文件
+EXCEL_PROGRESS_PHASES = {'query': 1, 'render': 89, 'write': 10}
+
+# 书籍工作表的列：(表头, 列宽)，与 iter_books 返回记录的前8列对应
+EXCEL_COLUMNS = [
+    ('书名', 30), ('作者', 20), ('出版日期', 12), ('豆瓣链接', 40),
+    ('评分', 8), ('书评内容', 60), ('评分日期', 12), ('爬取时间', 20),
+]
+
+# Excel 单元格最多保存的字符数
+MAX_CELL_LENGTH = 32767
+
+# 工作表名称不允许的字符，名称最长31个字符
+_SHEET_NAME_PATTERN = re.compile(r'[\[\]:*?/\\]')
+
+
+def clean_cell(value):
+    """去掉 Excel 不支持的控制字符并截断超长文本"""
+    if isinstance(value, str):
+        value = ILLEGAL_CHARACTERS_RE.sub('', value)
+        if len(value) > MAX_CELL_LENGTH:
+            value = value[:MAX_CELL_LENGTH]
+    return value
+
+
+class ExcelExporter:
+    """Excel导出器：使用 openpyxl 只写模式逐行写入 .xlsx，内存占用与书籍数量无关
+
+    第一个工作表为统计汇总，之后按年份或评分每组一个工作表。
+    只写模式下各工作表的行直接写入临时文件，可以交替追加，因此书籍只需从数据库读取一遍。
+    """
+
+    def __init__(self, group_by: str = 'year'):
+        if group_by not in GROUP_BY_CHOICES:
+            raise ValueError(f"不支持的分表方式: {group_by}，可选: {', '.join(GROUP_BY_CHOICES)}")
+        self.group_by = group_by
+        self.header_font = Font(bold=True)
+
+    def _group_name(self, row: Tuple) -> str:
+        """计算一本书所属的工作表名称"""
+        return _SHEET_NAME_PATTERN.sub('_', book_group(row, self.group_by))[:31]
+
+    def _header_row(self, ws, headers):
+        """生成加粗的表头行"""
+        cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = self.header_font
+            cells.append(cell)
+        return cells
+
+    def _create_book_sheet(self, wb: Workbook, name: str):
+        """创建书籍工作表并写入表头"""
+        ws = wb.create_sheet(title=name)
+        for i, (_, width) in enumerate(EXCEL_COLUMNS):
+            ws.column_dimensions[chr(ord('A') + i)].width = width
+        ws.freeze_panes = 'A2'
+        ws.append(self._header_row(ws, [header for header, _ in EXCEL_COLUMNS]))
+        return ws
+
+    def _write_stats_sheet(self, ws, user_id: str, stats: ReportStats, sheet_counts: Dict[str, int]) -> None:
+        """写入统计汇总：总数、评分分布、各工作表书籍数、最爱作者和评分最高的书籍"""
+        ws.column_dimensions['A'].width = 30
+        ws.column_dimensions['B'].width = 20
+        ws.append(self._header_row(ws, ['用户', user_id]))
+        ws.append(['总书籍数', stats.total_books])
+        ws.append(['有书评数', stats.books_with_reviews])
+
+        ws.append([])
+        ws.append(self._header_row(ws, ['评分', '书籍数']))
+        for rating, count in sorted(stats.rating_counts.items(), reverse=True):
+            ws.append([rating, count])
+
+        ws.append([])
+        ws.append(self._header_row(ws, ['工作表', '书籍数']))
+        for name, count in sheet_counts.items():
+            ws.append([name, count])
+
+        ws.append([])
+        ws.append(self._header_row(ws, ['最爱作者', '书籍数']))
+        for author, count in stats.favorite_authors(10):
+            ws.append([clean_cell(author), count])
+
+        ws.append([])
+        ws.append(self._header_row(ws, ['评分最高的书籍', '评分']))
+        for book in stats.top_books():
+            ws.append([clean_cell(book['title']), book['rating']])
+
+    def export_user_books(self, db: DoubanBookDB, user_id: str, output_file: str,
+                          start_date: str = None, end_date: str = None,
+                          progress_callback: Optional[Callable[[Dict], None]] = None) -> bool:
+        """导出用户书籍数据为 .xlsx 文件，支持日期范围过滤
+
+        progress_callback 接收导出进度（见 ExportProgress），按查询、渲染工作表、写入文件三个阶段报告。
+        """
+        temp_file = f"{output_file}.part"
+        try:
+            progress = ExportProgress(progress_callback, EXCEL_PROGRESS_PHASES)
+            total = progress.query_total(lambda: db.count_books(user_id, start_date, end_date))
+            wb = Workbook(write_only=True)
+            # 统计表最先创建以排在第一位，数据在书籍写完后再追加
+            stats_sheet = wb.create_sheet(title='统计')
+            sheets = {}
+            sheet_counts: Dict[str, int] = {}
+            stats = ReportStats()
+
+            for row in progress.track(db.iter_books(user_id, start_date, end_date, batch_size=1000),
+                                      'render', total):
+                stats.add(book_row_to_dict(row))
+                name = self._group_name(row)
+                ws = sheets.get(name)
+                if ws is None:
+                    ws = sheets[name] = self._create_book_sheet(wb, name)
+                    sheet_counts[name] = 0
+                ws.append([clean_cell(value) for value in row[:len(EXCEL_COLUMNS)]])
+                sheet_counts[name] += 1
+
+            if not stats.total_books:
+                logger.error(f"用户 {user_id} 在指定时间范围内没有书籍数据")
+                return False
+
+            # 工作表按年份或评分从高到低排列，未知年份和未评分放在最后
+            names = order_groups(sheets)
+            for position, name in enumerate(names, 1):
+                wb.move_sheet(name, position - wb.index(sheets[name]))
+
+            self._write_stats_sheet(stats_sheet, user_id, stats, {name: sheet_counts[name] for name in names})
+            progress.start('write', 1)
+            wb.save(temp_file)
+            progress.finish()
+            os.replace(temp_file, output_file)
+
+            logger.info(f"Excel文件已导出到: {output_file}（{len(sheets)} 个工作表）")
+            return True
+
+        except Exception as e:
+            logger.error(f"Excel导出失败: {e}")
+            return False
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
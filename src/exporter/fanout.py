@@ -0,0 +1,67 @@
+import os
+import re
+from typing import Any, Callable, Dict
+
+# 文件名中不允许的字符
+_FILENAME_PATTERN = re.compile(r'[\\/:*?"<>|\s]')
+
+
+def group_filename(user_id: str, group: str, suffix: str) -> str:
+    """按组导出的文件名：<用户ID>_<分组><后缀>，如 user123_5星.html"""
+    return f"{user_id}_{_FILENAME_PATTERN.sub('_', group)}{suffix}"
+
+
+class FanoutWriter:
+    """按组分发写入：一遍读取书籍，每行交给所属分组的输出
+
+    某个分组第一次出现时才调用 open_sink(分组, 临时文件路径) 创建输出，输出对象需要有 close() 方法。
+    全部写完后 commit() 把各组的临时文件替换为目标文件；发生异常或没有提交时删除全部临时文件，
+    不会留下只写了一部分的分组文件。
+    用法：
+        with FanoutWriter(open_sink) as fanout:
+            for row in rows:
+                fanout.get(group, path).write(...)
+            fanout.commit()
+    """
+
+    def __init__(self, open_sink: Callable[[str, str], Any]):
+        self.open_sink = open_sink
+        self.sinks: Dict[str, Any] = {}
+        self.paths: Dict[str, str] = {}
+        self.counts: Dict[str, int] = {}
+
+    def get(self, group: str, path: str):
+        """返回分组的输出，第一次使用时打开；每次调用计为该分组的一行"""
+        sink = self.sinks.get(group)
+        if sink is None:
+            sink = self.sinks[group] = self.open_sink(group, self.temp_path(path))
+            self.paths[group] = path
+            self.counts[group] = 0
+        self.counts[group] += 1
+        return sink
+
+    @staticmethod
+    def temp_path(path: str) -> str:
+        """目标文件对应的临时文件"""
+        return f"{path}.part"
+
+    def close(self) -> None:
+        """关闭全部分组的输出"""
+        for sink in self.sinks.values():
+            sink.close()
+
+    def commit(self) -> Dict[str, str]:
+        """关闭输出并把临时文件替换为目标文件，返回 {分组: 文件路径}"""
+        self.close()
+        for path in self.paths.values():
+            os.replace(self.temp_path(path), path)
+        return dict(self.paths)
+
+    def __enter__(self) -> 'FanoutWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+        for path in self.paths.values():
+            if os.path.exists(self.temp_path(path)):
+                os.remove(self.temp_path(path))
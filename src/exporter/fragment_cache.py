@@ -0,0 +1,134 @@
+import os
+import json
+import hashlib
+import sqlite3
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+FRAGMENT_SCHEMA_STATEMENTS = [
+    # 渲染片段：键为渲染器命名空间加书籍内容的哈希，内容不变的书籍跨导出、跨用户复用
+    '''
+        CREATE TABLE IF NOT EXISTS fragments (
+            key TEXT PRIMARY KEY,
+            fragment TEXT NOT NULL,
+            used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_fragments_used_at ON fragments (used_at)',
+    # 导出清单：记录每个输出文件上次导出时的内容摘要
+    '''
+        CREATE TABLE IF NOT EXISTS manifests (
+            output_file TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+]
+
+
+class FragmentCache:
+    """导出片段缓存：按书籍内容哈希保存渲染好的HTML片段或CSV行，并记录每个输出文件的导出清单
+
+    缓存保存在 cache_dir 下的 SQLite 文件中，多个导出进程可以同时使用。
+    """
+
+    def __init__(self, cache_dir: str, max_age_days: int = 30, busy_timeout: float = 30.0):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, 'fragments.db')
+        self.max_age_days = max_age_days
+        self.busy_timeout = busy_timeout
+        self.hits = 0
+        self.misses = 0
+        conn = self._get_connection()
+        for statement in FRAGMENT_SCHEMA_STATEMENTS:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+
+    def _get_connection(self):
+        """获取缓存库连接"""
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout)
+        conn.text_factory = str
+        # 缓存丢失只会导致重新渲染，不需要每次提交都同步落盘
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = OFF')
+        return conn
+
+    @staticmethod
+    def content_key(namespace: str, values: Tuple) -> str:
+        """计算片段键：命名空间（渲染器及其版本）加内容的哈希"""
+        payload = json.dumps(values, ensure_ascii=False, default=str)
+        return hashlib.sha1(f"{namespace}\n{payload}".encode('utf-8')).hexdigest()
+
+    def render(self, rows: Iterable[Tuple], namespace: str, render_func: Callable[[Tuple], str],
+               key_columns: int = None, batch_size: int = 500) -> Iterator[str]:
+        """按原顺序产出每行的片段：分批查找缓存，未命中的行调用 render_func 渲染后写回缓存
+
+        key_columns 指定参与哈希的前几列（如不含爬取时间），默认全部列。
+        """
+        conn = self._get_connection()
+        try:
+            batch: List[Tuple] = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    yield from self._render_batch(conn, batch, namespace, render_func, key_columns)
+                    batch = []
+            if batch:
+                yield from self._render_batch(conn, batch, namespace, render_func, key_columns)
+        finally:
+            conn.close()
+
+    def _render_batch(self, conn, batch: List[Tuple], namespace: str, render_func: Callable[[Tuple], str],
+                      key_columns: int = None) -> List[str]:
+        """处理一批行：一次查询取出已缓存的片段，新渲染的片段在同一事务中写回"""
+        keys = [self.content_key(namespace, tuple(row[:key_columns])) for row in batch]
+        placeholders = ','.join('?' * len(keys))
+        cached = dict(conn.execute(f'SELECT key, fragment FROM fragments WHERE key IN ({placeholders})', keys))
+
+        fragments = []
+        new_fragments = []
+        for key, row in zip(keys, batch):
+            fragment = cached.get(key)
+            if fragment is None:
+                fragment = render_func(row)
+                cached[key] = fragment
+                new_fragments.append((key, fragment))
+            fragments.append(fragment)
+        self.hits += len(batch) - len(new_fragments)
+        self.misses += len(new_fragments)
+
+        if new_fragments:
+            conn.executemany('INSERT OR REPLACE INTO fragments (key, fragment) VALUES (?, ?)', new_fragments)
+        # 命中的片段每天最多刷新一次使用时间，避免每次导出都写整张表
+        conn.execute(f'''
+            UPDATE fragments SET used_at = CURRENT_TIMESTAMP
+            WHERE key IN ({placeholders}) AND used_at < datetime('now', '-1 day')
+        ''', keys)
+        conn.commit()
+        return fragments
+
+    def is_unchanged(self, output_file: str, digest: str) -> bool:
+        """输出文件存在且上次导出的内容摘要相同时返回 True"""
+        if not os.path.exists(output_file):
+            return False
+        conn = self._get_connection()
+        try:
+            row = conn.execute('SELECT digest FROM manifests WHERE output_file = ?',
+                               (os.path.abspath(output_file),)).fetchone()
+        finally:
+            conn.close()
+        return bool(row) and row[0] == digest
+
+    def save_manifest(self, output_file: str, digest: str) -> None:
+        """记录输出文件本次导出的内容摘要，并清理长期未使用的片段"""
+        conn = self._get_connection()
+        try:
+            conn.execute('''
+                INSERT OR REPLACE INTO manifests (output_file, digest, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (os.path.abspath(output_file), digest))
+            conn.execute("DELETE FROM fragments WHERE used_at < datetime('now', ?)",
+                         (f'-{int(self.max_age_days)} days',))
+            conn.commit()
+        finally:
+            conn.close()
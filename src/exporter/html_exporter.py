@@ -1,11 +1,65 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from collections import deque
 from datetime import datetime
-from src.database.database import DoubanBookDB
+from urllib.parse import quote
+from src.database.database import DoubanBookDB, book_row_to_dict
+from src.exporter.chart_renderer import ChartBatch, ChartRenderer, chart_data_uri, publish_charts
+from src.exporter.fanout import FanoutWriter, group_filename
+from src.exporter.fragment_cache import FragmentCache
+from src.exporter.progress import ExportProgress
+from src.exporter.report_stats import GROUP_BY_CHOICES, ReportStats, book_group, order_groups
+from src.exporter.search_index import SearchIndexBuilder
+from src.exporter.static_output import minify_html, precompress
 from src.utils.logger import logger
-from typing import Dict, List
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 紧凑模式下书籍链接只保存该前缀之后的部分
+DOUBAN_SUBJECT_PREFIX = 'https://book.douban.com/subject/'
+
+# 修改模板或 _generate_book_html 后递增，使片段缓存和导出清单失效
+RENDER_VERSION = 3
+
+# 页面搜索匹配的字段（书籍记录中的列号）：书名、作者、出版日期、评分时间、书评；
+# 搜索索引、标准页面和紧凑页面的逐本比对都只看这些字段，启用索引前后搜索结果相同
+SEARCH_COLUMNS = (0, 1, 2, 6, 5)
+
+# 紧凑JSON书籍数组和数据标签的结尾
+COMPACT_SUFFIX = ']}</script>'
+
+# 统计图表的输出方式：embed 以 data URI 嵌入页面，link 保存在页面旁的 <文件名>_charts 目录中
+CHART_MODES = ('embed', 'link')
+
+# 导出进度各阶段的权重，按实测耗时的大致比例：统计和渲染各读取一遍书籍
+HTML_PROGRESS_PHASES = {'query': 1, 'aggregate': 45, 'render': 50, 'write': 4}
+
 
 class HTMLExporter:
-    def __init__(self):
+    def __init__(self, compact: bool = False, search_index: bool = False, cache_dir: Optional[str] = None,
+                 charts: Optional[str] = None, minify: bool = False, precompress: bool = False):
+        """compact=True 时书籍以紧凑JSON嵌入页面，由浏览器虚拟滚动只渲染可见的行，适合大量书籍；
+        search_index=True 时附带预先构建的倒排索引，页面搜索改为查索引；
+        指定 cache_dir 时按书籍内容哈希缓存渲染结果，内容没有变化的导出直接跳过；
+        charts 为 embed 或 link 时附带评分分布、年度数量和阅读节奏图表，图片缓存在 cache_dir/charts 中；
+        minify=True 时压缩页面中的空白、样式和脚本，precompress=True 时在页面旁生成 .gz/.br 供静态托管"""
+        if charts is not None and charts not in CHART_MODES:
+            raise ValueError(f"不支持的图表方式: {charts}，可选: {', '.join(CHART_MODES)}")
+        self.compact = compact
+        self.search_index = search_index
+        self.charts = charts
+        self.minify = minify
+        self.precompress = precompress
+        self.cache_dir = cache_dir
+        self.cache = FragmentCache(cache_dir) if cache_dir else None
         self.template = self._get_html_template()
+        # 流式导出时在书籍列表处拆开模板：先写页头，逐本写书籍，最后写页尾
+        self.header_template, self.footer_template = self.template.split('{books_html}')
+        # 紧凑模式沿用页头页尾，只把操作DOM的过滤脚本换成基于数组的虚拟滚动脚本
+        self.compact_footer_template = (self.footer_template[:self.footer_template.index('<script>')]
+                                        + self._get_compact_script() + '\n</body>\n</html>\n')
     
     def _get_html_template(self) -> str:
         """HTML模板"""
@@ -210,6 +264,131 @@ class HTMLExporter:
             display: none;
         }}
         
+        .yearly-stats .stats {{
+            margin-top: 10px;
+        }}
+        
+        .preferences, .top10 {{
+            margin: 30px 0 0;
+            padding: 20px;
+            background-color: #f8f9fa;
+            border-radius: 8px;
+        }}
+        
+        .preference-groups {{
+            display: flex;
+            flex-wrap: wrap;
+            gap: 30px;
+            margin-top: 20px;
+        }}
+        
+        .preference-group {{
+            flex: 1;
+            min-width: 250px;
+        }}
+        
+        .preference-group h4, .top10 h3, .top10-rank, .top10-info h4, .top10-info a {{
+            color: #2E7D32;
+        }}
+        
+        .preference-group h4 {{
+            margin-bottom: 15px;
+        }}
+        
+        .preference-group ul {{
+            list-style-type: none;
+            padding: 0;
+        }}
+        
+        .preference-group li {{
+            margin-bottom: 10px;
+            padding: 8px;
+            background-color: white;
+            border-radius: 4px;
+        }}
+        
+        .top10 {{
+            margin: 30px 0;
+        }}
+        
+        .top10 h3 {{
+            text-align: center;
+            margin-bottom: 20px;
+        }}
+        
+        .top10 ol {{
+            list-style-position: inside;
+            padding: 0;
+            max-width: 800px;
+            margin: 0 auto;
+        }}
+        
+        .top10 li {{
+            margin-bottom: 15px;
+            padding: 15px;
+            background-color: white;
+            border-radius: 8px;
+            box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+        }}
+        
+        .top10-item {{
+            display: flex;
+            align-items: center;
+            gap: 15px;
+        }}
+        
+        .top10-rank {{
+            font-size: 1.5em;
+            font-weight: bold;
+        }}
+        
+        .top10-info {{
+            flex: 1;
+        }}
+        
+        .top10-info h4 {{
+            margin: 0;
+        }}
+        
+        .top10-info a {{
+            text-decoration: none;
+        }}
+        
+        .top10-info p {{
+            margin: 5px 0;
+            color: #666;
+        }}
+        
+        .top10 .book-rating {{
+            font-size: 1em;
+        }}
+        
+        .charts {{
+            display: flex;
+            flex-wrap: wrap;
+            gap: 20px;
+            justify-content: center;
+            margin-top: 30px;
+        }}
+        
+        .charts img {{
+            max-width: 100%;
+            border-radius: 8px;
+            background-color: white;
+        }}
+        
+        .book-list.virtual {{
+            height: 80vh;
+            overflow-y: auto;
+            position: relative;
+        }}
+        
+        .book-list.virtual .book-window {{
+            position: absolute;
+            left: 0;
+            right: 0;
+        }}
+        
         @media (max-width: 768px) {{
             .container {{
                 padding: 15px;
@@ -258,6 +437,9 @@ class HTMLExporter:
             <!-- 阅读偏好统计 -->
             {reading_preferences_html}
             
+            <!-- 统计图表 -->
+            {charts_html}
+            
             <div class="search-box">
                 <input type="text" class="search-input" placeholder="搜索书名、作者或书评内容..." 
                        onkeyup="searchBooks(this.value)">
@@ -308,16 +490,17 @@ class HTMLExporter:
         function searchBooks(query) {{
             const books = document.querySelectorAll('.book-item');
             const searchTerm = query.toLowerCase();
+            // 导出时附带了搜索索引的页面，只需逐本比对索引命中的书籍
+            const candidates = typeof searchCandidates === 'function' ? searchCandidates(searchTerm) : null;
             
-            books.forEach(book => {{
-                const title = book.querySelector('.book-title').textContent.toLowerCase();
-                const author = book.querySelector('.book-meta').textContent.toLowerCase();
-                const review = book.querySelector('.book-review') ? 
-                    book.querySelector('.book-review').textContent.toLowerCase() : '';
-                
-                const matches = title.includes(searchTerm) || 
-                               author.includes(searchTerm) || 
-                               review.includes(searchTerm);
+            books.forEach((book, i) => {{
+                if (candidates && !candidates.has(i)) {{
+                    book.style.display = 'none';
+                    return;
+                }}
+                // 只比对字段内容，不含"作者："等标签文字
+                const fields = book.querySelectorAll('.book-title, .meta-value, .review-text');
+                const matches = Array.from(fields).some(field => field.textContent.toLowerCase().includes(searchTerm));
                 
                 book.style.display = matches ? 'flex' : 'none';
             }});
@@ -327,12 +510,236 @@ class HTMLExporter:
 </html>
         """
     
+    def _get_compact_script(self) -> str:
+        """紧凑模式的虚拟滚动脚本：只渲染滚动区域内可见的书籍，筛选和搜索直接在数组上进行"""
+        return """
+    <script>
+        const bookData = JSON.parse(document.getElementById('bookData').textContent);
+        const rows = bookData.rows;
+        const ROW_ESTIMATE = 160;
+        const OVERSCAN = 8;
+        
+        const list = document.getElementById('bookList');
+        const spacer = document.createElement('div');
+        const win = document.createElement('div');
+        win.className = 'book-window';
+        spacer.appendChild(win);
+        list.appendChild(spacer);
+        list.classList.add('virtual');
+        
+        // 每本书的高度先用估计值，渲染后替换为实际高度
+        const heights = new Float64Array(rows.length).fill(ROW_ESTIMATE);
+        let view = rows.map((_, i) => i);
+        let offsets = new Float64Array(1);
+        let currentRating = 'all';
+        let currentQuery = '';
+        let searchText = null;
+        
+        function escapeHtml(text) {{
+            return String(text).replace(/[&<>"']/g, c => ({{
+                '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'
+            }})[c]);
+        }}
+        
+        function bookUrl(url) {{
+            if (!url) return '#';
+            return url.startsWith('http') ? url : bookData.urlPrefix + url;
+        }}
+        
+        function bookRating(row) {{
+            return row[4] === null ? '未评分' : bookData.ratings[row[4]];
+        }}
+        
+        function hasReview(row) {{
+            return Boolean(row[5] && row[5].trim());
+        }}
+        
+        function renderBook(row) {{
+            const rating = bookRating(row);
+            const ratingClass = rating !== '未评分' ? 'rating-' + rating : 'rating-unrated';
+            const review = hasReview(row)
+                ? '<div class="book-review"><span class="review-label">📝 我的书评：</span>' + escapeHtml(row[5]) + '</div>'
+                : '<div class="no-review">📝 暂无书评</div>';
+            return '<div class="book-item"><div class="book-info">'
+                + '<div class="book-title"><a href="' + escapeHtml(bookUrl(row[3])) + '" target="_blank">'
+                + escapeHtml(row[0] || '未知书名') + '</a></div>'
+                + '<div class="book-meta">👤 作者：' + escapeHtml(row[1] || '未知作者')
+                + ' | 📅 出版：' + escapeHtml(row[2] || '未知')
+                + ' | 🕒 评分时间：' + escapeHtml(row[6] || '未知日期') + '</div>'
+                + '<div><span class="book-rating ' + escapeHtml(ratingClass) + '">⭐ ' + escapeHtml(rating) + '</span></div>'
+                + review + '</div></div>';
+        }}
+        
+        function updateOffsets() {{
+            offsets = new Float64Array(view.length + 1);
+            for (let i = 0; i < view.length; i++) {{
+                offsets[i + 1] = offsets[i] + heights[view[i]];
+            }}
+            spacer.style.height = offsets[view.length] + 'px';
+        }}
+        
+        function findIndex(top) {{
+            // 二分查找覆盖该位置的书籍
+            let lo = 0, hi = view.length;
+            while (lo < hi) {{
+                const mid = (lo + hi) >> 1;
+                if (offsets[mid + 1] <= top) lo = mid + 1; else hi = mid;
+            }}
+            return lo;
+        }}
+        
+        function render(measure = true) {{
+            const top = list.scrollTop;
+            const start = Math.max(0, findIndex(top) - OVERSCAN);
+            const end = Math.min(view.length, findIndex(top + list.clientHeight) + OVERSCAN + 1);
+            let html = '';
+            for (let i = start; i < end; i++) {{
+                html += renderBook(rows[view[i]]);
+            }}
+            win.style.transform = 'translateY(' + offsets[start] + 'px)';
+            win.innerHTML = html;
+            if (!measure) return;
+            
+            let changed = false;
+            const items = win.children;
+            for (let i = 0; i < items.length; i++) {{
+                const next = i + 1 < items.length ? items[i + 1].offsetTop : win.offsetHeight;
+                const height = next - items[i].offsetTop;
+                if (height > 0 && height !== heights[view[start + i]]) {{
+                    heights[view[start + i]] = height;
+                    changed = true;
+                }}
+            }}
+            if (changed) {{
+                updateOffsets();
+                render(false);
+            }}
+        }}
+        
+        function matchesQuery(i, query) {{
+            if (searchText[i] === undefined) {{
+                searchText[i] = [rows[i][0], rows[i][1], rows[i][2], rows[i][6], rows[i][5]].map(text => (text || '').toLowerCase());
+            }}
+            return searchText[i].some(text => text.includes(query));
+        }}
+        
+        function applyFilters() {{
+            const query = currentQuery.toLowerCase();
+            // 导出时附带了搜索索引的页面，只需逐本比对索引命中的书籍
+            const candidates = query && typeof searchCandidates === 'function' ? searchCandidates(query) : null;
+            if (query && !searchText) {{
+                searchText = new Array(rows.length);
+            }}
+            view = [];
+            for (let i = 0; i < rows.length; i++) {{
+                const row = rows[i];
+                if (currentRating === 'has-review') {{
+                    if (!hasReview(row)) continue;
+                }} else if (currentRating !== 'all' && bookRating(row) !== currentRating) {{
+                    continue;
+                }}
+                if (query && ((candidates && !candidates.has(i)) || !matchesQuery(i, query))) continue;
+                view.push(i);
+            }}
+            updateOffsets();
+            list.scrollTop = 0;
+            render();
+        }}
+        
+        function filterByRating(rating) {{
+            document.querySelectorAll('.rating-btn').forEach(btn => btn.classList.remove('active'));
+            event.target.classList.add('active');
+            currentRating = rating;
+            applyFilters();
+        }}
+        
+        function searchBooks(query) {{
+            currentQuery = query;
+            applyFilters();
+        }}
+        
+        let ticking = false;
+        list.addEventListener('scroll', () => {{
+            if (ticking) return;
+            ticking = true;
+            requestAnimationFrame(() => {{
+                ticking = false;
+                render();
+            }});
+        }});
+        window.addEventListener('resize', () => render());
+        
+        updateOffsets();
+        render();
+    </script>"""
+    
+    def _get_search_index_script(self) -> str:
+        """搜索索引查询脚本：按与 SearchIndexBuilder 相同的规则切分查询，求各二元组倒排表的交集"""
+        return """
+    <script>
+        const searchIndex = JSON.parse(document.getElementById('searchIndex').textContent);
+        const decodedPostings = new Map();
+        
+        function postingsOf(token) {
+            // 倒排表按差值编码，首次用到时解码
+            let ids = decodedPostings.get(token);
+            if (ids === undefined) {
+                const deltas = searchIndex.tokens[token] || [];
+                ids = new Array(deltas.length);
+                let id = 0;
+                for (let i = 0; i < deltas.length; i++) {
+                    id += deltas[i];
+                    ids[i] = id;
+                }
+                decodedPostings.set(token, ids);
+            }
+            return ids;
+        }
+        
+        function charPostings(ch) {
+            // 单字查询：合并所有包含该字的词条
+            const ids = new Set();
+            for (const token in searchIndex.tokens) {
+                if (token.includes(ch)) postingsOf(token).forEach(id => ids.add(id));
+            }
+            return ids;
+        }
+        
+        // 返回可能匹配查询的书籍编号集合；查询中没有可索引的字符时返回 null，由调用方逐本比对
+        function searchCandidates(query) {
+            const runs = query.toLowerCase().match(/[\\p{L}\\p{N}_]+/gu);
+            if (!runs) return null;
+            const lists = [];
+            for (const run of runs) {
+                const chars = Array.from(run);
+                if (chars.length === 1) {
+                    lists.push(Array.from(charPostings(chars[0])));
+                } else {
+                    for (let i = 0; i + 1 < chars.length; i++) {
+                        lists.push(postingsOf(chars[i] + chars[i + 1]));
+                    }
+                }
+            }
+            // 从最短的倒排表开始求交集
+            lists.sort((a, b) => a.length - b.length);
+            let result = new Set(lists[0]);
+            for (let i = 1; i < lists.length && result.size; i++) {
+                const next = new Set();
+                for (const id of lists[i]) {
+                    if (result.has(id)) next.add(id);
+                }
+                result = next;
+            }
+            return result;
+        }
+    </script>"""
+    
     def _generate_rating_stats_html(self, rating_stats: Dict[str, int]) -> str:
         """生成评分统计HTML"""
         if not rating_stats:
             return ""
         
-        stats_html = '<div class="stats" style="margin-top: 20px;">'
+        stats_html = '<div class="stats">'
         for rating, count in sorted(rating_stats.items(), reverse=True):
             stats_html += f'''
                 <div class="stat-item">
@@ -355,39 +762,9 @@ class HTMLExporter:
         
         return buttons_html
     
-    def _generate_yearly_stats_html(self, books: List[Dict]) -> str:
+    def _generate_yearly_stats_html(self, stats: ReportStats) -> str:
         """生成年度统计HTML"""
-        if not books:
-            return ""
-        
-        # 统计每年的书籍数量
-        yearly_stats = {}
-        for book in books:
-            review_date = book['review_date']
-            if review_date and review_date != '未知日期':
-                # 提取年份
-                try:
-                    if '-' in review_date:
-                        year = review_date.split('-')[0]
-                    elif '年' in review_date:
-                        year = review_date.split('年')[0]
-                    elif '/' in review_date:
-                        year = review_date.split('/')[0]
-                    else:
-                        # 尝试提取数字年份
-                        import re
-                        year_match = re.search(r'\d{4}', review_date)
-                        if year_match:
-                            year = year_match.group()
-                        else:
-                            continue
-                    
-                    if year.isdigit():
-                        year = int(year)
-                        yearly_stats[year] = yearly_stats.get(year, 0) + 1
-                except:
-                    continue
-        
+        yearly_stats = stats.yearly_counts
         if not yearly_stats:
             return ""
         
@@ -395,9 +772,9 @@ class HTMLExporter:
         sorted_years = sorted(yearly_stats.items(), reverse=True)
         
         stats_html = '''
-        <div class="stats" style="margin-top: 20px;">
+        <div class="stats yearly-stats">
             <h3>📅 年度阅读统计</h3>
-            <div class="stats" style="margin-top: 10px;">
+            <div class="stats">
         '''        
         for year, count in sorted_years:
             stats_html += f'''                
@@ -413,74 +790,30 @@ class HTMLExporter:
         '''
         return stats_html
     
-    def _generate_reading_preferences_html(self, books: List[Dict]) -> str:
+    def _generate_reading_preferences_html(self, stats: ReportStats) -> str:
         """生成阅读偏好HTML，包括最喜欢的作者"""
-        if not books:
+        if not stats.total_books:
             return ""
         
-        # 统计作者
-        author_stats = {}
-        for book in books:
-            author = book['author']
-            if author and author != '未知作者':
-                author_stats[author] = author_stats.get(author, 0) + 1
-        
-        # 找出最喜欢的作者（数量最多的前3个）
-        favorite_authors = sorted(author_stats.items(), key=lambda x: x[1], reverse=True)[:3]
-        
-        # 统计书籍类型（简单实现，基于书名关键词）
-        genre_stats = {
-            '小说': 0,
-            '文学': 0,
-            '历史': 0,
-            '哲学': 0,
-            '科学': 0,
-            '技术': 0,
-            '艺术': 0,
-            '其他': 0
-        }
-        
-        for book in books:
-            title = book['title']
-            if title:
-                title_lower = title.lower()
-                
-                if any(keyword in title_lower for keyword in ['小说', '故事', '文学', '长篇', '短篇']):
-                    genre_stats['小说'] += 1
-                elif any(keyword in title_lower for keyword in ['历史', '传记', '自传', '回忆录']):
-                    genre_stats['历史'] += 1
-                elif any(keyword in title_lower for keyword in ['哲学', '思想', '智慧', '人生']):
-                    genre_stats['哲学'] += 1
-                elif any(keyword in title_lower for keyword in ['科学', '科普', '自然', '宇宙']):
-                    genre_stats['科学'] += 1
-                elif any(keyword in title_lower for keyword in ['技术', '编程', '计算机', '软件']):
-                    genre_stats['技术'] += 1
-                elif any(keyword in title_lower for keyword in ['艺术', '设计', '音乐', '绘画']):
-                    genre_stats['艺术'] += 1
-                else:
-                    genre_stats['其他'] += 1
-        
-        # 过滤掉数量为0的类型
-        genre_stats = {k: v for k, v in genre_stats.items() if v > 0}
-        
-        # 找出最喜欢的类型
-        favorite_genres = sorted(genre_stats.items(), key=lambda x: x[1], reverse=True)[:3]
+        # 最喜欢的作者和类型（数量最多的前3个）
+        favorite_authors = stats.favorite_authors(3)
+        favorite_genres = stats.favorite_genres(3)
         
         preferences_html = '''
-        <div style="margin-top: 30px; padding: 20px; background-color: #f8f9fa; border-radius: 8px;">
+        <div class="preferences">
             <h3>📚 阅读偏好</h3>
-            <div style="display: flex; flex-wrap: wrap; gap: 30px; margin-top: 20px;">
+            <div class="preference-groups">
         '''        
         # 最喜欢的作者
         if favorite_authors:
             preferences_html += '''
-            <div style="flex: 1; min-width: 250px;">
-                <h4 style="color: #2E7D32; margin-bottom: 15px;">👤 最喜欢的作者</h4>
-                <ul style="list-style-type: none; padding: 0;">
+            <div class="preference-group">
+                <h4>👤 最喜欢的作者</h4>
+                <ul>
             '''            
             for author, count in favorite_authors:
                 preferences_html += f'''                    
-                    <li style="margin-bottom: 10px; padding: 8px; background-color: white; border-radius: 4px;">
+                    <li>
                         <strong>{author}</strong> - {count}本书
                     </li>
                 '''            
@@ -491,13 +824,13 @@ class HTMLExporter:
         # 最喜欢的类型
         if favorite_genres:
             preferences_html += '''
-            <div style="flex: 1; min-width: 250px;">
-                <h4 style="color: #2E7D32; margin-bottom: 15px;">📖 最喜欢的类型</h4>
-                <ul style="list-style-type: none; padding: 0;">
+            <div class="preference-group">
+                <h4>📖 最喜欢的类型</h4>
+                <ul>
             '''            
             for genre, count in favorite_genres:
                 preferences_html += f'''                    
-                    <li style="margin-bottom: 10px; padding: 8px; background-color: white; border-radius: 4px;">
+                    <li>
                         <strong>{genre}</strong> - {count}本书
                     </li>
                 '''            
@@ -511,42 +844,16 @@ class HTMLExporter:
         '''
         return preferences_html
     
-    def _generate_top10_books_html(self, books: List[Dict]) -> str:
+    def _generate_top10_books_html(self, stats: ReportStats) -> str:
         """生成TOP10榜单HTML"""
-        if not books:
-            return ""
-        
-        # 筛选出有评分的书籍
-        rated_books = [book for book in books if book['rating'] and book['rating'] != '未评分']
-        
-        if not rated_books:
-            return ""
-        
-        # 将评分转换为可比较的数值
-        def get_rating_value(rating):
-            """将评分字符串转换为数值"""
-            if '星' in rating:
-                # 处理如"5星"格式
-                return float(rating.replace('星', ''))
-            elif '分' in rating:
-                # 处理如"9.5分"格式
-                return float(rating.replace('分', ''))
-            else:
-                try:
-                    return float(rating)
-                except:
-                    return 0
-        
-        # 按评分降序排序，取前10本
-        top_books = sorted(rated_books, key=lambda x: get_rating_value(x['rating']), reverse=True)[:10]
-        
+        top_books = stats.top_books()
         if not top_books:
             return ""
         
         top10_html = '''
-        <div style="margin: 30px 0; padding: 20px; background-color: #f8f9fa; border-radius: 8px;">
-            <h3 style="color: #2E7D32; text-align: center; margin-bottom: 20px;">🏆 TOP10 推荐书籍</h3>
-            <ol style="list-style-position: inside; padding: 0; max-width: 800px; margin: 0 auto;">
+        <div class="top10">
+            <h3>🏆 TOP10 推荐书籍</h3>
+            <ol>
         '''        
         for i, book in enumerate(top_books, 1):
             title = book['title']
@@ -555,16 +862,16 @@ class HTMLExporter:
             douban_url = book['douban_url']
             
             top10_html += f'''                
-                <li style="margin-bottom: 15px; padding: 15px; background-color: white; border-radius: 8px; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
-                    <div style="display: flex; align-items: center; gap: 15px;">
-                        <span style="font-size: 1.5em; font-weight: bold; color: #2E7D32;">{i}</span>
-                        <div style="flex: 1;">
-                            <h4 style="margin: 0; color: #2E7D32;">
-                                <a href="{douban_url}" target="_blank" style="color: #2E7D32; text-decoration: none;">{title}</a>
+                <li>
+                    <div class="top10-item">
+                        <span class="top10-rank">{i}</span>
+                        <div class="top10-info">
+                            <h4>
+                                <a href="{douban_url}" target="_blank">{title}</a>
                             </h4>
-                            <p style="margin: 5px 0; color: #666;">作者: {author}</p>
+                            <p>作者: {author}</p>
                         </div>
-                        <span class="book-rating rating-{rating}" style="font-size: 1em;">{rating}</span>
+                        <span class="book-rating rating-{rating}">{rating}</span>
                     </div>
                 </li>
             '''        
@@ -574,20 +881,62 @@ class HTMLExporter:
         '''
         return top10_html
     
+    def _generate_charts_html(self, charts: List[Dict], sources: List[str]) -> str:
+        """生成统计图表HTML，sources 为每张图表的图片地址"""
+        if not charts:
+            return ""
+        
+        charts_html = '<div class="charts">'
+        for chart, source in zip(charts, sources):
+            title = chart['title']
+            charts_html += f'<img src="{source}" alt="{title}" title="{title}">'
+        charts_html += '</div>'
+        return charts_html
+    
+    @staticmethod
+    def _charts_dir(output_file: str) -> str:
+        """链接方式下图表图片所在的目录：与页面同目录的 <文件名>_charts"""
+        return f"{os.path.splitext(output_file)[0]}_charts"
+    
+    def _submit_charts(self, stats: ReportStats, output_file: str) -> Tuple[ChartBatch, List[str]]:
+        """开始渲染图表，返回图表和各自的图片地址
+
+        链接方式下图片地址在渲染前即可确定，渲染在后台与书籍列表的写入同时进行；
+        嵌入方式需要等待渲染完成后转为 data URI。
+        指定 cache_dir 时图片缓存在 cache_dir/charts 中，统计数据没有变化的图表不重新渲染。
+        """
+        if self.cache_dir:
+            cache_dir = os.path.join(self.cache_dir, 'charts')
+        elif self.charts == 'link':
+            # 图片以数据哈希命名，页面旁的图表目录本身就是缓存
+            cache_dir = self._charts_dir(output_file)
+        else:
+            # 嵌入方式且没有缓存目录：图片只在本次导出中使用
+            with tempfile.TemporaryDirectory(prefix='charts_') as temp_dir:
+                charts = ChartRenderer(temp_dir).submit(stats).wait()
+                return ChartBatch(charts), [chart_data_uri(chart['path']) for chart in charts]
+        
+        batch = ChartRenderer(cache_dir).submit(stats)
+        if self.charts == 'embed':
+            charts = batch.wait()
+            return ChartBatch(charts), [chart_data_uri(chart['path']) for chart in charts]
+        charts_dir = os.path.basename(self._charts_dir(output_file))
+        return batch, [quote(f"{charts_dir}/{os.path.basename(chart['path'])}") for chart in batch.charts]
+    
     def _generate_book_html(self, book: Dict) -> str:
         """生成单本书的HTML"""
         title = book['title'] or '未知书名'
-        author = book['author'] or '未知作者'
-        publish_date = book['publish_date'] or '未知'
         douban_url = book['douban_url'] or '#'
         rating = book['rating'] or '未评分'
         review_content = book['review_content'] or ''
-        review_date = book['review_date'] or '未知日期'
         
         # 安全的HTML转义
         title = self._escape_html(title)
-        author = self._escape_html(author)
         review_content = self._escape_html(review_content)
+        # 可搜索的字段值放在 meta-value 中，缺失时显示的占位文字不参与搜索
+        author = self._meta_value(book['author'], '未知作者')
+        publish_date = self._meta_value(book['publish_date'], '未知')
+        review_date = self._meta_value(book['review_date'], '未知日期')
         
         has_review = bool(review_content.strip())
         rating_class = f"rating-{rating}" if rating != '未评分' else "rating-unrated"
@@ -597,7 +946,7 @@ class HTMLExporter:
             review_html = f'''
                 <div class="book-review">
                     <span class="review-label">📝 我的书评：</span>
-                    {review_content}
+                    <span class="review-text">{review_content}</span>
                 </div>
             '''
         else:
@@ -620,6 +969,12 @@ class HTMLExporter:
             </div>
         '''
     
+    def _meta_value(self, value: Optional[str], placeholder: str) -> str:
+        """书籍信息行中的一个字段：有值时转义后放入 meta-value，否则显示占位文字"""
+        if not value:
+            return placeholder
+        return f'<span class="meta-value">{self._escape_html(value)}</span>'
+    
     def _escape_html(self, text: str) -> str:
         """HTML转义"""
         if not text:
@@ -631,101 +986,296 @@ class HTMLExporter:
                    .replace('"', "&quot;")
                    .replace("'", "&#x27;"))
     
+    def _compact_prefix(self, ratings: List[str]) -> str:
+        """紧凑JSON的开头：元数据（链接前缀、评分表）和书籍数组的起始"""
+        meta = json.dumps({'urlPrefix': DOUBAN_SUBJECT_PREFIX, 'ratings': ratings}, ensure_ascii=False)
+        return '<script type="application/json" id="bookData">' + meta[:-1] + ',"rows":['
+    
+    def _compact_item(self, row: Tuple, rating_index: Dict[str, int]) -> str:
+        """把一本书写成紧凑JSON数组：评分以序号引用评分表，豆瓣链接去掉公共前缀"""
+        title, author, publish_date, douban_url, rating, review_content, review_date = row[:7]
+        if douban_url and douban_url.startswith(DOUBAN_SUBJECT_PREFIX):
+            douban_url = douban_url[len(DOUBAN_SUBJECT_PREFIX):]
+        item = [title, author, publish_date, douban_url, rating_index.get(rating) if rating else None,
+                review_content, review_date]
+        # 避免书评中的 </script> 提前结束脚本标签
+        return json.dumps(item, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    
+    def _write_compact_books(self, f, rows: Iterable[Tuple], ratings: Iterable[str],
+                             index: Optional[SearchIndexBuilder] = None) -> None:
+        """把书籍写成紧凑JSON：每本书一个数组"""
+        ratings = list(ratings)
+        rating_index = {rating: i for i, rating in enumerate(ratings)}
+        f.write(self._compact_prefix(ratings))
+        for i, row in enumerate(rows):
+            if index is not None:
+                index.add(i, *(row[column] for column in SEARCH_COLUMNS))
+            if i:
+                f.write(',')
+            f.write(self._compact_item(row, rating_index))
+        f.write(COMPACT_SUFFIX)
+    
+    def _write_search_index(self, f, index: SearchIndexBuilder) -> None:
+        """写入倒排索引数据和查询脚本"""
+        f.write('<script type="application/json" id="searchIndex">')
+        f.write(index.to_json().replace('</', '<\\/'))
+        f.write('</script>')
+        script = self._get_search_index_script()
+        f.write(minify_html(script) if self.minify else script)
+    
+    def _render_books(self, rows: Iterable[Tuple]) -> Iterable[str]:
+        """逐本渲染书籍HTML；启用缓存时内容没有变化的书籍直接复用上次的片段"""
+        render = lambda row: self._generate_book_html(book_row_to_dict(row))
+        if self.minify:
+            render = lambda row, plain=render: minify_html(plain(row))
+        if self.cache is None:
+            return map(render, rows)
+        # 只有前7列（不含爬取和更新时间）会显示在页面上
+        namespace = f"html:{RENDER_VERSION}{':min' if self.minify else ''}"
+        return self.cache.render(rows, namespace, render, key_columns=7)
+    
+    @staticmethod
+    def _index_rows(rows: Iterable[Tuple], index: SearchIndexBuilder) -> Iterable[Tuple]:
+        """在书籍写入的同一遍中把每本书加入搜索索引"""
+        for i, row in enumerate(rows):
+            index.add(i, *(row[column] for column in SEARCH_COLUMNS))
+            yield row
+    
+    def _render_header(self, title: str, stats: ReportStats, export_date: str, charts_html: str = "") -> str:
+        """用统计结果填充页头：书籍列表之前的全部内容"""
+        header = self.header_template.format(
+            user_id=title,
+            total_books=stats.total_books,
+            books_with_reviews=stats.books_with_reviews,
+            export_date=export_date,
+            rating_stats_html=self._generate_rating_stats_html(stats.rating_counts),
+            rating_filter_buttons=self._generate_rating_filter_buttons(stats.rating_counts),
+            yearly_stats_html=self._generate_yearly_stats_html(stats),
+            reading_preferences_html=self._generate_reading_preferences_html(stats),
+            charts_html=charts_html,
+            top10_books_html=self._generate_top10_books_html(stats)
+        )
+        return minify_html(header) if self.minify else header
+    
+    def _write_books(self, f, rows: Iterable[Tuple], stats: ReportStats,
+                     index: Optional[SearchIndexBuilder] = None) -> None:
+        """边读边写书籍列表：紧凑模式写JSON数组，否则写渲染好的HTML片段"""
+        if self.compact:
+            self._write_compact_books(f, rows, sorted(stats.rating_counts), index)
+            return
+        if index is not None:
+            rows = self._index_rows(rows, index)
+        for fragment in self._render_books(rows):
+            f.write(fragment)
+    
+    def _write_footer(self, f, index: Optional[SearchIndexBuilder], export_date: str) -> None:
+        """写入搜索索引（如果有）和页尾"""
+        if index is not None:
+            self._write_search_index(f, index)
+        footer = self.compact_footer_template if self.compact else self.footer_template
+        footer = footer.format(export_date=export_date)
+        f.write(minify_html(footer) if self.minify else footer)
+    
+    def _publish(self, temp_file: str, output_file: str) -> None:
+        """用写好的临时文件替换目标文件，需要时生成预压缩文件"""
+        os.replace(temp_file, output_file)
+        if self.precompress:
+            precompress(output_file, force=True)
+    
     def export_user_books(self, db: DoubanBookDB, user_id: str, output_file: str, 
-                         start_date: str = None, end_date: str = None) -> bool:
-        """导出用户书籍数据为HTML文件，支持日期范围过滤"""
+                         start_date: str = None, end_date: str = None,
+                         progress_callback: Optional[Callable[[Dict], None]] = None) -> bool:
+        """导出用户书籍数据为HTML文件，支持日期范围过滤
+
+        书籍从数据库游标逐批读取并直接写入文件，不在内存中拼接整个页面。
+        progress_callback 接收导出进度（见 ExportProgress），按查询、统计、渲染、写入四个阶段报告。
+        """
+        temp_file = f"{output_file}.part"
         try:
-            # 获取用户数据
-            if start_date and end_date:
-                data = db.export_to_dict(user_id, start_date, end_date)
-            else:
-                data = db.export_to_dict(user_id)
-            
-            if not data['books']:
+            progress = ExportProgress(progress_callback, HTML_PROGRESS_PHASES)
+            total = progress.query_total(lambda: db.count_books(user_id, start_date, end_date))
+            # 第一遍：单遍聚合页头各统计区块，内存占用与书籍数量无关；
+            # 启用缓存时同时计算内容摘要，与上次导出相同则无需重写
+            stats = ReportStats()
+            digest = hashlib.sha1(json.dumps(
+                [RENDER_VERSION, self.compact, self.search_index, self.charts, self.minify,
+                 user_id, start_date, end_date]
+            ).encode('utf-8'))
+            for row in progress.track(db.iter_books(user_id, start_date, end_date), 'aggregate', total):
+                stats.add(book_row_to_dict(row))
+                if self.cache:
+                    digest.update(json.dumps(row[:7], ensure_ascii=False).encode('utf-8'))
+            if not stats.total_books:
                 logger.error(f"用户 {user_id} 在指定日期范围内没有书籍数据")
                 return False
             
-            # 生成各部分HTML
-            rating_stats_html = self._generate_rating_stats_html(data['stats']['rating_stats'])
-            rating_filter_buttons = self._generate_rating_filter_buttons(data['stats']['rating_stats'])
-            yearly_stats_html = self._generate_yearly_stats_html(data['books'])
-            reading_preferences_html = self._generate_reading_preferences_html(data['books'])
-            top10_books_html = self._generate_top10_books_html(data['books'])
+            if self.cache and self.cache.is_unchanged(output_file, digest.hexdigest()):
+                logger.info(f"书籍数据没有变化，跳过导出: {output_file}")
+                if self.precompress:
+                    # 页面没有重写，只在压缩文件缺失或比页面旧时补写
+                    precompress(output_file)
+                return True
             
-            books_html = ""
-            for book in data['books']:
-                books_html += self._generate_book_html(book)
+            # 图表在工作进程中渲染，同时在当前进程写入书籍列表
+            chart_batch, chart_sources = ChartBatch([]), []
+            if self.charts:
+                chart_batch, chart_sources = self._submit_charts(stats, output_file)
             
-            # 填充模板
-            html_content = self.template.format(
-                user_id=user_id,
-                total_books=data['stats']['total_books'],
-                books_with_reviews=data['stats']['books_with_reviews'],
-                export_date=datetime.now().strftime("%Y-%m-%d %H:%M"),
-                rating_stats_html=rating_stats_html,
-                rating_filter_buttons=rating_filter_buttons,
-                yearly_stats_html=yearly_stats_html,
-                reading_preferences_html=reading_preferences_html,
-                top10_books_html=top10_books_html,
-                books_html=books_html
-            )
+            export_date = datetime.now().strftime("%Y-%m-%d %H:%M")
+            header = self._render_header(user_id, stats, export_date,
+                                         self._generate_charts_html(chart_batch.charts, chart_sources))
             
-            # 写入文件
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            # 第二遍：边读边写书籍列表，写完后再替换目标文件，避免失败时留下半个页面
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(header)
+                # 索引与书籍写入同一遍完成，写在书籍列表之后
+                index = SearchIndexBuilder() if self.search_index else None
+                rows = progress.track(db.iter_books(user_id, start_date, end_date), 'render', total)
+                self._write_books(f, rows, stats, index)
+                self._write_footer(f, index, export_date)
+            # 写入阶段：等待图表、替换目标文件和生成预压缩文件
+            progress.start('write', 1)
+            if self.charts == 'link':
+                publish_charts(chart_batch.wait(), self._charts_dir(output_file))
+            self._publish(temp_file, output_file)
+            if self.cache:
+                self.cache.save_manifest(output_file, digest.hexdigest())
+            progress.finish()
             
             logger.info(f"HTML文件已导出到: {output_file}")
             return True
             
         except Exception as e:
             logger.error(f"HTML导出失败: {e}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
             return False
     
     def export_books_by_rating(self, db: DoubanBookDB, user_id: str, rating: str, output_file: str) -> bool:
-        """按评分导出书籍"""
+        """按评分导出书籍，页头统计只包含该评分的书籍"""
+        temp_file = f"{output_file}.part"
         try:
-            books = db.get_books_by_rating(user_id, rating)
-            
-            if not books:
+            stats = ReportStats().consume(book_row_to_dict(row) for row in db.iter_books(user_id, rating=rating))
+            if not stats.total_books:
                 logger.error(f"用户 {user_id} 没有 {rating} 的书籍")
                 return False
             
-            # 转换为字典格式
-            book_dicts = []
-            for book in books:
-                book_dicts.append({
-                    'title': book[0],
-                    'author': book[1],
-                    'publish_date': book[2],
-                    'douban_url': book[3],
-                    'rating': book[4],
-                    'review_content': book[5],
-                    'review_date': book[6],
-                    'created_at': book[7]
-                })
-            
-            # 生成HTML
-            books_html = ""
-            for book in book_dicts:
-                books_html += self._generate_book_html(book)
-            
-            # 简化的模板用于单评分导出
-            html_content = self.template.format(
-                user_id=f"{user_id} - {rating}",
-                total_books=len(book_dicts),
-                books_with_reviews=len([b for b in book_dicts if b['review_content'].strip()]),
-                export_date=datetime.now().strftime("%Y-%m-%d %H:%M"),
-                rating_stats_html="",
-                rating_filter_buttons="",
-                books_html=books_html
-            )
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            export_date = datetime.now().strftime("%Y-%m-%d %H:%M")
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(self._render_header(f"{user_id} - {rating}", stats, export_date))
+                index = SearchIndexBuilder() if self.search_index else None
+                self._write_books(f, db.iter_books(user_id, rating=rating), stats, index)
+                self._write_footer(f, index, export_date)
+            self._publish(temp_file, output_file)
             
             logger.info(f"{rating} 书籍HTML文件已导出到: {output_file}")
             return True
             
         except Exception as e:
             logger.error(f"按评分导出HTML失败: {e}")
-            return False
\ No newline at end of file
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return False
+    
+    def export_split(self, db: DoubanBookDB, user_id: str, output_dir: str, group_by: str = 'rating',
+                     start_date: str = None, end_date: str = None) -> Dict[str, str]:
+        """按评分或年份拆分导出：一遍读取用户书籍，同时生成每组一个HTML页面
+
+        书籍边读边渲染并写入所属分组的正文临时文件，同时累计各组的统计；读完后为每组写入页头、
+        拷贝正文并写入页尾。返回 {分组: 文件路径}，没有数据或失败时返回空字典。
+        """
+        if group_by not in GROUP_BY_CHOICES:
+            raise ValueError(f"不支持的分组方式: {group_by}，可选: {', '.join(GROUP_BY_CHOICES)}")
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            groups = {}
+            # 紧凑模式下各组共用一张评分表，书籍数组写完后评分表才完整，写页头时再输出
+            rating_index: Dict[str, int] = {}
+            
+            with FanoutWriter(lambda group, path: open(path, 'w', encoding='utf-8')) as fanout:
+                pending = deque()
+                rows = self._route_rows(db.iter_books(user_id, start_date, end_date), group_by,
+                                        groups, pending, output_dir, user_id)
+                if self.compact:
+                    for row in rows:
+                        group = pending.popleft()
+                        body = fanout.get(group['name'], group['body'])
+                        if row[4]:
+                            rating_index.setdefault(row[4], len(rating_index))
+                        if fanout.counts[group['name']] > 1:
+                            body.write(',')
+                        body.write(self._compact_item(row, rating_index))
+                else:
+                    for fragment in self._render_books(rows):
+                        group = pending.popleft()
+                        fanout.get(group['name'], group['body']).write(fragment)
+                fanout.close()
+                
+                if not groups:
+                    logger.error(f"用户 {user_id} 在指定时间范围内没有书籍数据")
+                    return {}
+                
+                export_date = datetime.now().strftime("%Y-%m-%d %H:%M")
+                files = {}
+                for name in order_groups(groups):
+                    group = groups[name]
+                    self._write_group_page(group, f"{user_id} - {name}", fanout.temp_path(group['body']),
+                                           list(rating_index), export_date)
+                    files[name] = group['path']
+            
+            logger.info(f"已按{'评分' if group_by == 'rating' else '年份'}拆分导出 {len(files)} 个HTML文件到: {output_dir}")
+            return files
+            
+        except Exception as e:
+            logger.error(f"拆分导出HTML失败: {e}")
+            return {}
+    
+    def _route_rows(self, rows: Iterable[Tuple], group_by: str, groups: Dict[str, Dict], pending: Deque[Dict],
+                    output_dir: str, user_id: str) -> Iterator[Tuple]:
+        """原样产出记录，同时统计每条记录所属的分组，并按顺序记下分组供写入时取用
+
+        启用片段缓存时渲染按批进行，记录会先于写入被读出，所以分组需要排队保存。
+        """
+        for row in rows:
+            name = book_group(row, group_by)
+            group = groups.get(name)
+            if group is None:
+                path = os.path.join(output_dir, group_filename(user_id, name, '.html'))
+                group = groups[name] = {
+                    'name': name,
+                    'path': path,
+                    'body': f"{path}.body",
+                    'stats': ReportStats(),
+                    'index': SearchIndexBuilder() if self.search_index else None,
+                }
+            if group['index'] is not None:
+                group['index'].add(group['stats'].total_books, *(row[column] for column in SEARCH_COLUMNS))
+            group['stats'].add(book_row_to_dict(row))
+            pending.append(group)
+            yield row
+    
+    def _write_group_page(self, group: Dict, title: str, body_file: str, ratings: List[str],
+                          export_date: str) -> None:
+        """拼接一个分组的页面：页头、正文临时文件和页尾"""
+        output_file = group['path']
+        temp_file = f"{output_file}.part"
+        try:
+            chart_batch, chart_sources = ChartBatch([]), []
+            if self.charts:
+                chart_batch, chart_sources = self._submit_charts(group['stats'], output_file)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(self._render_header(title, group['stats'], export_date,
+                                            self._generate_charts_html(chart_batch.charts, chart_sources)))
+                if self.compact:
+                    f.write(self._compact_prefix(ratings))
+                with open(body_file, encoding='utf-8') as body:
+                    shutil.copyfileobj(body, f, 1024 * 1024)
+                if self.compact:
+                    f.write(COMPACT_SUFFIX)
+                self._write_footer(f, group['index'], export_date)
+            if self.charts == 'link':
+                publish_charts(chart_batch.wait(), self._charts_dir(output_file))
+            self._publish(temp_file, output_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
@@ -0,0 +1,192 @@
+import gzip
+import json
+import os
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.database.database import DoubanBookDB, subject_id_from_url
+from src.utils.logger import logger
+
+# 每行JSON对象的字段，与 iter_books 返回记录的列顺序一致
+NDJSON_FIELDS = [
+    'title', 'author', 'publish_date', 'douban_url', 'rating',
+    'review_content', 'review_date', 'created_at', 'updated_at', 'genre',
+]
+
+# 导入时写入数据库所需的字段（add_book 的参数顺序）
+IMPORT_FIELDS = [
+    'title', 'author', 'publish_date', 'douban_url', 'rating',
+    'review_content', 'review_date', 'user_id',
+]
+
+
+def open_text(path: str, mode: str, compressed: bool):
+    """以UTF-8文本模式打开普通文件或gzip文件"""
+    if compressed:
+        return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=6)
+    return open(path, mode, encoding='utf-8')
+
+
+class NDJSONExporter:
+    """NDJSON导出器：每本书一行JSON对象，供其他系统按行流式处理
+
+    compress 为 True 或输出文件名以 .gz 结尾时写入gzip压缩文件。
+    """
+
+    def __init__(self, compress: bool = False, chunk_size: int = 1000):
+        self.compress = compress
+        self.chunk_size = chunk_size
+
+    def _format_lines(self, user_id: str, rows: Iterable[Tuple]) -> Iterator[str]:
+        """把数据库记录转换为JSON行"""
+        for row in rows:
+            book = dict(zip(NDJSON_FIELDS, row))
+            book['user_id'] = user_id
+            book['subject_id'] = subject_id_from_url(book['douban_url'], book['title'], book['author'],
+                                                     book['publish_date'])
+            yield json.dumps(book, ensure_ascii=False) + '\n'
+
+    def _export_stream(self, output_file: str, sources: Iterable[Tuple[str, Iterable[Tuple]]]) -> int:
+        """把若干 (用户ID, 记录游标) 依次分块写入同一个文件，返回写入的行数"""
+        temp_file = f"{output_file}.part"
+        compressed = self.compress or output_file.endswith('.gz')
+        try:
+            count = 0
+            with open_text(temp_file, 'w', compressed) as f:
+                for user_id, rows in sources:
+                    lines = self._format_lines(user_id, rows)
+                    while True:
+                        chunk = list(islice(lines, self.chunk_size))
+                        if not chunk:
+                            break
+                        f.writelines(chunk)
+                        count += len(chunk)
+            if count:
+                os.replace(temp_file, output_file)
+            return count
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def export_user_books(self, db: DoubanBookDB, user_id: str, output_file: str,
+                          start_date: str = None, end_date: str = None) -> bool:
+        """导出用户书籍数据为NDJSON文件，支持日期范围过滤"""
+        try:
+            started = time.perf_counter()
+            rows = db.iter_books(user_id, start_date, end_date, batch_size=self.chunk_size)
+            count = self._export_stream(output_file, [(user_id, rows)])
+            if not count:
+                logger.error(f"用户 {user_id} 在指定时间范围内没有书籍数据")
+                return False
+
+            elapsed = time.perf_counter() - started
+            logger.info(f"NDJSON文件已导出到: {output_file}（{count}本，{count / max(elapsed, 1e-6):.0f}本/秒）")
+            return True
+
+        except Exception as e:
+            logger.error(f"NDJSON导出失败: {e}")
+            return False
+
+    def export_all_users(self, db: DoubanBookDB, output_file: str,
+                         user_ids: Optional[List[str]] = None) -> int:
+        """把多个用户（默认全部用户）的书籍导出到同一个NDJSON文件，返回导出的书籍数"""
+        try:
+            started = time.perf_counter()
+            user_ids = user_ids if user_ids is not None else db.get_user_ids()
+            sources = ((user_id, db.iter_books(user_id, batch_size=self.chunk_size)) for user_id in user_ids)
+            count = self._export_stream(output_file, sources)
+            if not count:
+                logger.error("没有可导出的书籍数据")
+                return 0
+
+            elapsed = time.perf_counter() - started
+            logger.info(f"{len(user_ids)} 个用户的 {count} 本书籍已导出到: {output_file}"
+                        f"（{count / max(elapsed, 1e-6):.0f}本/秒）")
+            return count
+
+        except Exception as e:
+            logger.error(f"批量NDJSON导出失败: {e}")
+            return 0
+
+
+class NDJSONImporter:
+    """NDJSON批量导入器：把 NDJSONExporter 导出的文件写回数据库，无需重新爬取
+
+    每 batch_size 行调用一次 add_books，在单个事务中 UPSERT，重复导入同一文件结果不变。
+    某一批写入失败时逐行重试，只跳过无法写入的行。爬取时间（created_at）记录为导入时间。
+    """
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+
+    def import_file(self, db: DoubanBookDB, input_file: str, user_id: Optional[str] = None) -> Dict[str, float]:
+        """导入NDJSON文件（.gz 结尾时按gzip读取），指定 user_id 时把全部书籍导入到该用户名下
+
+        返回 {'imported': 导入条数, 'skipped': 跳过的无效行数, 'seconds': 耗时, 'rows_per_second': 吞吐量}
+        """
+        started = time.perf_counter()
+        imported = 0
+        skipped = 0
+        with open_text(input_file, 'r', input_file.endswith('.gz')) as f:
+            batch: List[Tuple] = []
+            for line_number, line in enumerate(f, 1):
+                book = self._parse_line(line, user_id)
+                if book is None:
+                    if line.strip():
+                        skipped += 1
+                        logger.warning(f"第 {line_number} 行不是有效的书籍记录，已跳过")
+                    continue
+                batch.append(book)
+                if len(batch) >= self.batch_size:
+                    written, failed = self._write_batch(db, batch)
+                    imported += written
+                    skipped += failed
+                    batch = []
+            if batch:
+                written, failed = self._write_batch(db, batch)
+                imported += written
+                skipped += failed
+
+        elapsed = time.perf_counter() - started
+        result = {
+            'imported': imported,
+            'skipped': skipped,
+            'seconds': elapsed,
+            'rows_per_second': imported / max(elapsed, 1e-6),
+        }
+        logger.info(f"已从 {input_file} 导入 {imported} 本书籍，跳过 {skipped} 行，"
+                    f"耗时 {elapsed:.2f} 秒（{result['rows_per_second']:.0f}本/秒）")
+        return result
+
+    @staticmethod
+    def _write_batch(db: DoubanBookDB, batch: List[Tuple]) -> Tuple[int, int]:
+        """写入一批记录，返回 (写入条数, 跳过条数)
+
+        add_books 在单个事务中写入，一行违反约束就会整批回滚；此时逐行重试，只丢弃写不进去的行。
+        """
+        written = db.add_books(batch)
+        if written == len(batch):
+            return written, 0
+        written = 0
+        for book in batch:
+            if db.add_book(*book):
+                written += 1
+            else:
+                logger.warning(f"书籍记录无法写入数据库，已跳过: {book[3]}")
+        return written, len(batch) - written
+
+    @staticmethod
+    def _parse_line(line: str, user_id: Optional[str]) -> Optional[Tuple]:
+        """解析一行JSON为 add_books 的记录，缺少书名、链接或用户ID时返回 None"""
+        try:
+            book = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(book, dict):
+            return None
+        if user_id:
+            book['user_id'] = user_id
+        if not book.get('title') or not book.get('douban_url') or not book.get('user_id'):
+            return None
+        return tuple(book.get(field) for field in IMPORT_FIELDS)
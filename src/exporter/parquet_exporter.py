@@ -0,0 +1,176 @@
+import os
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from src.database.database import DoubanBookDB, subject_id_from_url
+from src.exporter.report_stats import rating_value
+from src.utils.logger import logger
+
+# 列式导出的表结构：评分、日期等转换为带类型的列，分析时无需再解析字符串
+ARROW_SCHEMA = pa.schema([
+    ('user_id', pa.string()),
+    ('subject_id', pa.string()),
+    ('title', pa.string()),
+    ('author', pa.string()),
+    ('publish_date', pa.string()),
+    ('douban_url', pa.string()),
+    ('rating', pa.string()),
+    ('rating_value', pa.float32()),
+    ('review_content', pa.string()),
+    ('has_review', pa.bool_()),
+    ('review_date', pa.date32()),
+    ('genre', pa.string()),
+    ('created_at', pa.timestamp('s')),
+    ('updated_at', pa.timestamp('s')),
+])
+
+# 取值重复度高的列使用字典编码
+DICTIONARY_COLUMNS = ['user_id', 'author', 'rating', 'genre']
+
+# 以 Arrow IPC（Feather v2）格式写入的文件后缀，其余按 Parquet 写入
+ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+
+# 非 ISO 标准格式（含未补零的月日）的评分日期
+_DATE_FORMATS = ('%Y-%m-%d', '%Y年%m月%d日', '%Y/%m/%d')
+
+
+def parse_review_date(value: Optional[str]) -> Optional[date]:
+    """解析评分日期（2024-01-01、2024年1月1日、2024/01/01），无法识别时返回 None"""
+    if not value or value == '未知日期':
+        return None
+    # 绝大多数日期为 ISO 格式，fromisoformat 比 strptime 快一个数量级
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """解析 SQLite CURRENT_TIMESTAMP 格式（YYYY-MM-DD HH:MM:SS）的时间"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def normalized_rating(rating: Optional[str]) -> Optional[float]:
+    """评分数值（"5星" → 5.0），未评分或无法识别时返回 None"""
+    if not rating or rating == '未评分':
+        return None
+    return rating_value(rating) or None
+
+
+class ParquetExporter:
+    """列式导出器：把书籍数据写为 Parquet 或 Arrow IPC（Feather）文件，供 pandas 等分析工具直接加载
+
+    书籍从数据库游标读取，每积累 row_group_size 行写出一个行组，内存占用与书籍总数无关。
+    用法：
+        ParquetExporter().export_user_books(db, user_id, 'books.parquet')
+        df = pandas.read_parquet('books.parquet')
+    """
+
+    def __init__(self, row_group_size: int = 50000, compression: str = 'zstd'):
+        self.row_group_size = row_group_size
+        self.compression = compression
+
+    def _open_writer(self, path: str, output_file: str):
+        """按目标文件后缀创建 Parquet 或 Arrow IPC 写入器"""
+        if output_file.lower().endswith(ARROW_SUFFIXES):
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            return pa.ipc.new_file(path, ARROW_SCHEMA, options=options)
+        return pq.ParquetWriter(path, ARROW_SCHEMA, compression=self.compression,
+                                use_dictionary=DICTIONARY_COLUMNS)
+
+    def _build_table(self, rows: List[Tuple]) -> pa.Table:
+        """把一批 (用户ID, 数据库记录各列...) 转换为带类型的 Arrow 表"""
+        columns: Dict[str, list] = {field.name: [] for field in ARROW_SCHEMA}
+        for user_id, title, author, publish_date, douban_url, rating, review_content, \
+                review_date, created_at, updated_at, genre in rows:
+            columns['user_id'].append(user_id)
+            columns['subject_id'].append(subject_id_from_url(douban_url, title, author, publish_date))
+            columns['title'].append(title)
+            columns['author'].append(author)
+            columns['publish_date'].append(publish_date)
+            columns['douban_url'].append(douban_url)
+            columns['rating'].append(rating)
+            columns['rating_value'].append(normalized_rating(rating))
+            columns['review_content'].append(review_content)
+            columns['has_review'].append(bool(review_content and review_content.strip()))
+            columns['review_date'].append(parse_review_date(review_date))
+            columns['genre'].append(genre)
+            columns['created_at'].append(parse_timestamp(created_at))
+            columns['updated_at'].append(parse_timestamp(updated_at))
+        return pa.Table.from_pydict(columns, schema=ARROW_SCHEMA)
+
+    def _export_stream(self, output_file: str, sources: Iterable[Tuple[str, Iterable[Tuple]]]) -> int:
+        """把若干 (用户ID, 记录游标) 依次按行组写入同一个文件，返回写入的行数
+
+        行组可以跨用户，书籍很少的用户不会产生大量小行组。
+        """
+        temp_file = f"{output_file}.part"
+        try:
+            count = 0
+            with self._open_writer(temp_file, output_file) as writer:
+                batch = []
+                for user_id, rows in sources:
+                    for row in rows:
+                        batch.append((user_id,) + row)
+                        if len(batch) >= self.row_group_size:
+                            writer.write_table(self._build_table(batch))
+                            count += len(batch)
+                            batch = []
+                if batch:
+                    writer.write_table(self._build_table(batch))
+                    count += len(batch)
+            if count:
+                os.replace(temp_file, output_file)
+            return count
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def export_user_books(self, db: DoubanBookDB, user_id: str, output_file: str,
+                          start_date: str = None, end_date: str = None) -> bool:
+        """导出用户书籍数据为 Parquet/Arrow 文件，支持日期范围过滤"""
+        try:
+            rows = db.iter_books(user_id, start_date, end_date, batch_size=1000)
+            if not self._export_stream(output_file, [(user_id, rows)]):
+                logger.error(f"用户 {user_id} 在指定时间范围内没有书籍数据")
+                return False
+
+            logger.info(f"列式数据文件已导出到: {output_file}")
+            return True
+
+        except Exception as e:
+            logger.error(f"列式数据导出失败: {e}")
+            return False
+
+    def export_all_users(self, db: DoubanBookDB, output_file: str,
+                         user_ids: Optional[List[str]] = None) -> int:
+        """把多个用户（默认全部用户）的书籍导出到同一个文件，返回导出的书籍数"""
+        try:
+            user_ids = user_ids if user_ids is not None else db.get_user_ids()
+            sources = ((user_id, db.iter_books(user_id, batch_size=1000)) for user_id in user_ids)
+            count = self._export_stream(output_file, sources)
+            if not count:
+                logger.error("没有可导出的书籍数据")
+                return 0
+
+            logger.info(f"{len(user_ids)} 个用户的 {count} 本书籍已导出到: {output_file}")
+            return count
+
+        except Exception as e:
+            logger.error(f"批量列式数据导出失败: {e}")
+            return 0
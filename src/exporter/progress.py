@@ -0,0 +1,120 @@
+import time
+from typing import Callable, Dict, Iterable, Iterator, Mapping, Optional, Sequence, Union
+
+# 导出阶段及显示名称
+PHASES = {
+    'query': '查询',
+    'aggregate': '统计',
+    'render': '渲染',
+    'write': '写入',
+}
+
+
+class ExportProgress:
+    """导出进度：按阶段统计已处理的行数，节流后交给回调
+
+    phases 为导出器依次经过的阶段；传入 {阶段: 权重} 时按权重分配各阶段在总进度中的比例，否则各阶段相同。
+    回调参数为字典：phase（阶段）、done/total（本阶段已处理/总行数）、fraction（总进度 0~1）、
+    elapsed（已用秒数）、eta（预计剩余秒数，尚无法估计时为 None）。
+    阶段开始和结束时一定回调，其余更新最多每 min_interval 秒一次；未指定回调时不做任何统计。
+    """
+
+    def __init__(self, callback: Optional[Callable[[Dict], None]],
+                 phases: Union[Sequence[str], Mapping[str, float]], min_interval: float = 0.2):
+        unknown = [phase for phase in phases if phase not in PHASES]
+        if unknown:
+            raise ValueError(f"未知的导出阶段: {', '.join(unknown)}，可选: {', '.join(PHASES)}")
+        self.callback = callback
+        weights = dict(phases) if isinstance(phases, Mapping) else dict.fromkeys(phases, 1.0)
+        total_weight = sum(weights.values()) or 1.0
+        # 每个阶段开始时的总进度，以及该阶段所占的比例
+        self._offsets: Dict[str, float] = {}
+        self._weights: Dict[str, float] = {}
+        offset = 0.0
+        for phase, weight in weights.items():
+            self._offsets[phase] = offset
+            self._weights[phase] = weight / total_weight
+            offset += self._weights[phase]
+        self.min_interval = min_interval
+        self.phase = None
+        self.done = 0
+        self.total = 0
+        self._started = time.perf_counter()
+        self._last_report = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.callback is not None
+
+    def start(self, phase: str, total: int) -> None:
+        """进入新阶段，total 为本阶段要处理的行数"""
+        if not self.enabled:
+            return
+        self.phase, self.done, self.total = phase, 0, total
+        self._report()
+
+    def advance(self, count: int = 1) -> None:
+        """本阶段又处理了 count 行"""
+        if not self.enabled:
+            return
+        self.done += count
+        if time.perf_counter() - self._last_report >= self.min_interval:
+            self._report()
+
+    def finish(self) -> None:
+        """本阶段完成"""
+        if not self.enabled:
+            return
+        self.done = max(self.done, self.total)
+        self._report()
+
+    def query_total(self, count: Callable[[], int]) -> int:
+        """查询阶段：启用进度时调用 count() 取得要处理的总行数，未启用时不查询并返回 0"""
+        if not self.enabled:
+            return 0
+        self.start('query', 1)
+        total = count()
+        self.finish()
+        return total
+
+    def track(self, rows: Iterable, phase: Optional[str] = None, total: Optional[int] = None) -> Iterator:
+        """原样产出记录并逐行计数；指定 phase 时先进入该阶段，产出完毕后结束该阶段"""
+        if not self.enabled:
+            yield from rows
+            return
+        if phase is not None:
+            self.start(phase, total if total is not None else self.total)
+        for row in rows:
+            yield row
+            self.advance()
+        if phase is not None:
+            self.finish()
+
+    def snapshot(self) -> Dict:
+        """当前进度"""
+        phase_fraction = min(1.0, self.done / self.total) if self.total else 0.0
+        fraction = self._offsets.get(self.phase, 0.0) + self._weights.get(self.phase, 0.0) * phase_fraction
+        fraction = min(1.0, fraction)
+        elapsed = time.perf_counter() - self._started
+        # 刚开始时速度还不稳定，不给出预计剩余时间
+        eta = elapsed * (1 - fraction) / fraction if fraction >= 0.02 and elapsed >= 0.5 else None
+        return {
+            'phase': self.phase,
+            'done': self.done,
+            'total': self.total,
+            'fraction': fraction,
+            'elapsed': elapsed,
+            'eta': eta,
+        }
+
+    def _report(self) -> None:
+        self._last_report = time.perf_counter()
+        self.callback(self.snapshot())
+
+
+def format_progress(info: Dict) -> str:
+    """进度的文字描述，如 "渲染 3200/10000 (66%)，剩余约 4 秒" """
+    text = f"{PHASES.get(info['phase'], info['phase'])} {info['done']}/{info['total']} ({info['fraction']:.0%})"
+    if info['eta'] is not None:
+        text += f"，剩余约 {info['eta']:.0f} 秒"
+    return text
@@ -0,0 +1,152 @@
+import heapq
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.utils.genre_classifier import get_default_classifier
+
+_YEAR_PATTERN = re.compile(r'\d{4}')
+_YEAR_MONTH_PATTERN = re.compile(r'(\d{4})\D(\d{1,2})')
+
+
+def rating_value(rating: str) -> float:
+    """将评分字符串（如"5星"、"9.5分"）转换为可比较的数值"""
+    try:
+        if '星' in rating:
+            return float(rating.replace('星', ''))
+        if '分' in rating:
+            return float(rating.replace('分', ''))
+        return float(rating)
+    except ValueError:
+        return 0
+
+
+def extract_year(review_date: Optional[str]) -> Optional[int]:
+    """从评分日期中提取年份，支持 2024-01-01、2024年1月1日、2024/01/01 等格式"""
+    if not review_date or review_date == '未知日期':
+        return None
+    if '-' in review_date:
+        year = review_date.split('-')[0]
+    elif '年' in review_date:
+        year = review_date.split('年')[0]
+    elif '/' in review_date:
+        year = review_date.split('/')[0]
+    else:
+        match = _YEAR_PATTERN.search(review_date)
+        if not match:
+            return None
+        year = match.group()
+    return int(year) if year.isdigit() else None
+
+
+def extract_year_month(review_date: Optional[str]) -> Optional[Tuple[int, int]]:
+    """从评分日期中提取 (年, 月)，格式同 extract_year，没有月份时返回 None"""
+    if not review_date or review_date == '未知日期':
+        return None
+    match = _YEAR_MONTH_PATTERN.match(review_date)
+    if not match:
+        return None
+    month = int(match.group(2))
+    return (int(match.group(1)), month) if 1 <= month <= 12 else None
+
+
+# 按组拆分导出时支持的分组方式
+GROUP_BY_CHOICES = ('year', 'rating')
+
+
+def book_group(row: Tuple, group_by: str) -> str:
+    """计算一条数据库记录所属的分组：评分（如"5星"、"未评分"）或年份（如"2024年"、"未知年份"）"""
+    if group_by == 'rating':
+        return row[4] or '未评分'
+    year = extract_year(row[6])
+    return f"{year}年" if year else '未知年份'
+
+
+def order_groups(names: Iterable[str]) -> List[str]:
+    """分组的显示顺序：评分或年份从高到低，未评分和未知年份放在最后"""
+    names = list(names)
+    return (sorted((name for name in names if not name.startswith('未')), reverse=True)
+            + [name for name in names if name.startswith('未')])
+
+
+def classify_genre(title: Optional[str], review: Optional[str] = None) -> Optional[str]:
+    """使用默认类型体系根据书名和书评判断书籍类型，书名为空时返回 None"""
+    return get_default_classifier().classify(title, review)
+
+
+class ReportStats:
+    """单遍统计聚合器：逐本消费书籍，同时计算HTML报告各区块需要的统计数据
+
+    内存占用只与作者、年份等不同取值的数量及 top_n 有关，可以直接消费数据库游标。
+    用法：
+        stats = ReportStats().consume(book_row_to_dict(row) for row in db.iter_books(user_id))
+    """
+
+    def __init__(self, top_n: int = 10):
+        self.top_n = top_n
+        self.total_books = 0
+        self.books_with_reviews = 0
+        self.rating_counts: Dict[str, int] = {}
+        self.yearly_counts: Dict[int, int] = {}
+        self.monthly_counts: Dict[Tuple[int, int], int] = {}
+        self.author_counts: Dict[str, int] = {}
+        self.genre_counts: Dict[str, int] = {}
+        # 最小堆保存评分最高的 top_n 本书：(评分值, -序号, 书籍)，序号保证同分时先出现的排前面
+        self._top_heap: List[Tuple[float, int, Dict]] = []
+
+    def add(self, book: Dict) -> None:
+        """统计一本书（字段与 book_row_to_dict 一致）"""
+        self.total_books += 1
+
+        review_content = book.get('review_content')
+        if review_content and review_content.strip():
+            self.books_with_reviews += 1
+
+        rating = book.get('rating')
+        if rating is not None:
+            self.rating_counts[rating] = self.rating_counts.get(rating, 0) + 1
+
+        review_date = book.get('review_date')
+        year = extract_year(review_date)
+        if year is not None:
+            self.yearly_counts[year] = self.yearly_counts.get(year, 0) + 1
+            month = extract_year_month(review_date)
+            if month is not None:
+                self.monthly_counts[month] = self.monthly_counts.get(month, 0) + 1
+
+        author = book.get('author')
+        if author and author != '未知作者':
+            self.author_counts[author] = self.author_counts.get(author, 0) + 1
+
+        # 优先使用写入数据库时已计算的类型
+        genre = book.get('genre') or classify_genre(book.get('title'), review_content)
+        if genre:
+            self.genre_counts[genre] = self.genre_counts.get(genre, 0) + 1
+
+        if rating and rating != '未评分':
+            entry = (rating_value(rating), -self.total_books, {
+                'title': book.get('title'),
+                'author': book.get('author'),
+                'rating': rating,
+                'douban_url': book.get('douban_url'),
+            })
+            if len(self._top_heap) < self.top_n:
+                heapq.heappush(self._top_heap, entry)
+            elif entry[:2] > self._top_heap[0][:2]:
+                heapq.heapreplace(self._top_heap, entry)
+
+    def consume(self, books: Iterable[Dict]) -> 'ReportStats':
+        """统计一批书籍，返回自身便于链式调用"""
+        for book in books:
+            self.add(book)
+        return self
+
+    def top_books(self) -> List[Dict]:
+        """评分最高的书籍，按评分降序，同分时保持原顺序"""
+        return [book for _, _, book in sorted(self._top_heap, key=lambda entry: entry[:2], reverse=True)]
+
+    def favorite_authors(self, limit: int = 3) -> List[Tuple[str, int]]:
+        """收藏数量最多的作者"""
+        return heapq.nlargest(limit, self.author_counts.items(), key=lambda item: item[1])
+
+    def favorite_genres(self, limit: int = 3) -> List[Tuple[str, int]]:
+        """收藏数量最多的书籍类型"""
+        return heapq.nlargest(limit, self.genre_counts.items(), key=lambda item: item[1])
@@ -0,0 +1,60 @@
+import json
+import re
+from typing import Dict, List, Optional
+
+# 与页面脚本中的 /[\p{L}\p{N}_]+/gu 对应：连续的文字、数字和下划线构成一个词段
+_RUN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text: Optional[str]) -> set:
+    """把文本切分为二元组（CJK n-gram），长度为1的词段保留单字
+
+    中文没有空格分词，二元组可以覆盖任意长度不小于2的子串查询；
+    英文同样按二元组切分，以保持与页面上"包含"搜索相同的子串匹配语义。
+    """
+    tokens = set()
+    if not text:
+        return tokens
+    for run in _RUN_PATTERN.findall(text.lower()):
+        if len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class SearchIndexBuilder:
+    """倒排索引构建器：书籍按导出顺序编号，索引书名、作者、出版日期、评分时间和书评
+
+    倒排表按编号递增追加，序列化时做差值编码以减小体积。
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, List[int]] = {}
+        self.size = 0
+
+    def add(self, doc_id: int, *texts: Optional[str]) -> None:
+        """索引一本书的若干文本字段，doc_id 必须递增"""
+        tokens = set()
+        for text in texts:
+            tokens |= tokenize(text)
+        postings = self.postings
+        for token in tokens:
+            doc_ids = postings.get(token)
+            if doc_ids is None:
+                postings[token] = [doc_id]
+            else:
+                doc_ids.append(doc_id)
+        self.size = doc_id + 1
+
+    def to_json(self) -> str:
+        """序列化为紧凑JSON：{"size": 书籍数, "tokens": {词: [差值编码的编号]}}"""
+        tokens = {}
+        for token, doc_ids in self.postings.items():
+            previous = 0
+            deltas = []
+            for doc_id in doc_ids:
+                deltas.append(doc_id - previous)
+                previous = doc_id
+            tokens[token] = deltas
+        return json.dumps({'size': self.size, 'tokens': tokens}, ensure_ascii=False, separators=(',', ':'))
@@ -0,0 +1,381 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from src.database.database import (
+    DoubanBookDB, EXPORT_COLUMNS, book_row_to_dict, build_stats_where, connect_readonly
+)
+from src.exporter.html_exporter import HTMLExporter, RENDER_VERSION
+from src.exporter.report_stats import ReportStats, extract_year
+from src.exporter.static_output import (
+    minify_css, minify_html, minify_js, precompress_tree, remove_with_compressed
+)
+from src.utils.logger import logger
+
+# 页面渲染方式变化时递增，使旧清单中的所有页面失效
+SITE_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+# 规划页面时逐本读取的列：页面显示的书籍字段，末尾追加 id 作为收录时间相同时的次序
+PLAN_BOOKS_SQL = f'SELECT {EXPORT_COLUMNS}, id FROM books WHERE {{where}} ORDER BY created_at DESC, id DESC'
+
+# 工作进程只读取 (created_at, id) 位于页面首尾两本书之间的记录：created_at 范围走 (user_id, created_at) 索引，
+# 不再用 OFFSET 跳过前面的页面；收录时间相同的记录再按 id 截取
+PAGE_RANGE_FILTER = (' AND created_at BETWEEN ? AND ?'
+                     ' AND NOT (created_at = ? AND id > ?) AND NOT (created_at = ? AND id < ?)')
+
+# 分页导航样式，追加在共享样式表之后
+SITE_CSS = """
+.site-nav {
+    display: flex;
+    justify-content: space-between;
+    margin: 20px 0;
+}
+
+.site-nav a, .site-pages a {
+    color: #2E7D32;
+    text-decoration: none;
+}
+
+.site-nav a:hover, .site-pages a:hover {
+    text-decoration: underline;
+}
+
+.site-pages ul {
+    display: flex;
+    flex-wrap: wrap;
+    gap: 10px;
+    list-style-type: none;
+    padding: 0;
+}
+
+.site-pages li {
+    padding: 8px 16px;
+    background-color: #e8f5e8;
+    border-radius: 20px;
+}
+"""
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <link rel="stylesheet" href="assets/style.css">
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>📚 {heading}</h1>
+            {nav_html}
+            {header_html}
+        </div>
+        {content_html}
+        {nav_html}
+        <div class="footer">
+            <p>📊 数据来源：豆瓣读书 | 生成时间：{export_date} | 工具：豆瓣书评爬虫</p>
+        </div>
+    </div>
+    <script src="assets/app.js"></script>
+</body>
+</html>
+"""
+
+
+class SiteExporter:
+    """多页面静态网站导出：共享样式和脚本，首页显示统计，每年（或每 page_size 本）一个书籍页面
+
+    书籍页面由工作进程各自只读打开数据库并行生成；目录中的 manifest.json 记录每个页面的内容哈希，
+    重新导出时只重写书籍有变化的页面。
+    """
+
+    def __init__(self, page_size: int = 0, workers: Optional[int] = None, minify: bool = False,
+                 precompress: bool = False):
+        """minify=True 时压缩页面、样式表和脚本；precompress=True 时为它们生成 .gz/.br 供静态托管"""
+        self.page_size = page_size
+        self.workers = workers
+        self.minify = minify
+        self.precompress = precompress
+        self.html_exporter = HTMLExporter(minify=minify)
+
+    def _get_assets(self) -> Dict[str, str]:
+        """从单文件HTML模板中提取共享样式和脚本"""
+        template = self.html_exporter.template
+        css = template[template.index('<style>') + len('<style>'):template.index('</style>')]
+        js = template[template.index('<script>') + len('<script>'):template.index('</script>')]
+        unescape = lambda text: text.replace('{{', '{').replace('}}', '}')
+        css, js = unescape(css) + SITE_CSS, unescape(js)
+        if self.minify:
+            css, js = minify_css(css), minify_js(js)
+        return {
+            'style.css': css,
+            'app.js': js,
+        }
+
+    def _plan_pages(self, db_path: Optional[str], where: str, params: tuple) -> Tuple[ReportStats, List[Dict]]:
+        """单遍读取书籍：统计首页数据，按年份和 page_size 划分页面，记录每页首尾两本书的翻页键和内容哈希"""
+        stats = ReportStats()
+        year_counts: Dict[Optional[int], int] = {}
+        hashers: Dict[Tuple[Optional[int], int], any] = {}
+        bounds: Dict[Tuple[Optional[int], int], List] = {}
+        if db_path is None:
+            return stats, []
+        conn = connect_readonly(db_path)
+        try:
+            cursor = conn.execute(PLAN_BOOKS_SQL.format(where=where), params)
+            while True:
+                rows = cursor.fetchmany(500)
+                if not rows:
+                    break
+                for row in rows:
+                    stats.add(book_row_to_dict(row))
+                    year = extract_year(row[6])
+                    position = year_counts.get(year, 0)
+                    year_counts[year] = position + 1
+                    chunk = position // self.page_size if self.page_size > 0 else 0
+                    key = (row[7], row[-1])
+                    hasher = hashers.get((year, chunk))
+                    if hasher is None:
+                        hasher = hashers[(year, chunk)] = hashlib.sha1()
+                        bounds[(year, chunk)] = [key, key]
+                    bounds[(year, chunk)][1] = key
+                    # 只对页面上显示的字段取哈希，重复爬取只刷新 updated_at 时页面不算变化
+                    hasher.update(json.dumps(row[:7], ensure_ascii=False).encode('utf-8'))
+        finally:
+            conn.close()
+
+        # 年份降序，无法识别年份的书籍放在最后
+        keys = sorted(hashers, key=lambda key: (key[0] is None, -(key[0] or 0), key[1]))
+        pages = []
+        for year, chunk in keys:
+            name = 'unknown' if year is None else str(year)
+            label = '未知年份' if year is None else f'{year}年'
+            count = year_counts[year]
+            if self.page_size > 0:
+                count = min(self.page_size, count - chunk * self.page_size)
+            pages.append({
+                'year': year,
+                'first': bounds[(year, chunk)][0],
+                'last': bounds[(year, chunk)][1],
+                'file': f'year_{name}.html' if chunk == 0 else f'year_{name}_{chunk + 1}.html',
+                'label': label if chunk == 0 else f'{label}（第{chunk + 1}页）',
+                'count': count,
+                'books_hash': hashers[(year, chunk)].hexdigest(),
+            })
+        return stats, pages
+
+    def _page_nav_html(self, pages: List[Dict], index: int) -> str:
+        """上一页、首页、下一页链接"""
+        prev_link = next_link = '<span></span>'
+        if index > 0:
+            prev_link = f'<a href="{pages[index - 1]["file"]}">‹ {pages[index - 1]["label"]}</a>'
+        if index + 1 < len(pages):
+            next_link = f'<a href="{pages[index + 1]["file"]}">{pages[index + 1]["label"]} ›</a>'
+        return f'<div class="site-nav">{prev_link}<a href="index.html">首页</a>{next_link}</div>'
+
+    def _page_header_html(self, stats: ReportStats) -> str:
+        """书籍页面的搜索框和评分筛选按钮，由共享脚本处理"""
+        buttons = ''.join(f'<span class="rating-btn" onclick="filterByRating(\'{rating}\')">{rating}</span>'
+                          for rating in sorted(stats.rating_counts, reverse=True))
+        return f'''
+            <div class="search-box">
+                <input type="text" class="search-input" placeholder="搜索书名、作者或书评内容..."
+                       onkeyup="searchBooks(this.value)">
+            </div>
+            <div class="rating-filter">
+                <span class="rating-btn active" onclick="filterByRating('all')">全部</span>
+                <span class="rating-btn" onclick="filterByRating('has-review')">有书评</span>
+                {buttons}
+            </div>
+        '''
+
+    def _index_html(self, user_id: str, stats: ReportStats, pages: List[Dict], export_date: str) -> str:
+        """首页：总体统计、各年份页面链接、阅读偏好和TOP10"""
+        exporter = self.html_exporter
+        page_links = ''.join(f'<li><a href="{page["file"]}">{page["label"]}</a> ({page["count"]}本)</li>'
+                             for page in pages)
+        header_html = f'''
+            <div class="stats">
+                <div class="stat-item">
+                    <span class="stat-number">{stats.total_books}</span>
+                    <span class="stat-label">总书籍数</span>
+                </div>
+                <div class="stat-item">
+                    <span class="stat-number">{stats.books_with_reviews}</span>
+                    <span class="stat-label">有书评</span>
+                </div>
+                <div class="stat-item">
+                    <span class="stat-number">{export_date}</span>
+                    <span class="stat-label">导出时间</span>
+                </div>
+            </div>
+            {exporter._generate_rating_stats_html(stats.rating_counts)}
+            <div class="site-pages">
+                <h3>📅 按年份浏览</h3>
+                <ul>{page_links}</ul>
+            </div>
+            {exporter._generate_reading_preferences_html(stats)}
+        '''
+        return PAGE_TEMPLATE.format(
+            title=f"{user_id} 的豆瓣书评收藏",
+            heading=f"{user_id} 的豆瓣书评收藏",
+            nav_html='',
+            header_html=header_html,
+            content_html=exporter._generate_top10_books_html(stats),
+            export_date=export_date,
+        )
+
+    def export_user_books(self, db: DoubanBookDB, user_id: str, output_dir: str,
+                          start_date: str = None, end_date: str = None) -> bool:
+        """导出用户书籍为静态网站目录，支持日期范围过滤"""
+        try:
+            where, params = build_stats_where(user_id, start_date, end_date)
+            db_path = db.get_book_db_path(user_id)
+            stats, pages = self._plan_pages(db_path, where, params)
+            if not stats.total_books:
+                logger.error(f"用户 {user_id} 在指定日期范围内没有书籍数据")
+                return False
+
+            os.makedirs(os.path.join(output_dir, 'assets'), exist_ok=True)
+            # 本次写入的文件，预压缩时总是重新压缩
+            rewritten = []
+            for name, content in self._get_assets().items():
+                asset_path = os.path.join(output_dir, 'assets', name)
+                if _write_if_changed(asset_path, content):
+                    rewritten.append(asset_path)
+
+            manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+            old_manifest = _load_manifest(manifest_path)
+            old_pages = old_manifest.get('pages', {}) if old_manifest.get('version') == SITE_VERSION else {}
+
+            export_date = datetime.now().strftime("%Y-%m-%d %H:%M")
+            header_html = self._page_header_html(stats)
+
+            manifest_pages = {}
+            tasks = []
+            for i, page in enumerate(pages):
+                nav_html = self._page_nav_html(pages, i)
+                # 页面哈希包含书籍内容、导航和筛选按钮以及书籍HTML的渲染版本，任何一项变化都需要重写；
+                # app.js 每次导出都会更新，旧版本的书籍标记不能保留
+                page_hash = hashlib.sha1('\n'.join([
+                    page['books_hash'], user_id, nav_html, header_html, str(self.minify), str(RENDER_VERSION)
+                ]).encode('utf-8')).hexdigest()
+                manifest_pages[page['file']] = page_hash
+                path = os.path.join(output_dir, page['file'])
+                if old_pages.get(page['file']) == page_hash and os.path.exists(path):
+                    continue
+                tasks.append({
+                    'db_path': db_path,
+                    'where': where,
+                    'params': params,
+                    'year': page['year'],
+                    'first': page['first'],
+                    'last': page['last'],
+                    'path': path,
+                    'title': f"{user_id} 的豆瓣书评收藏 - {page['label']}",
+                    'heading': f"{user_id} 的豆瓣书评收藏 · {page['label']}",
+                    'nav_html': nav_html,
+                    'header_html': header_html,
+                    'export_date': export_date,
+                    'minify': self.minify,
+                })
+
+            self._render_pages(tasks)
+            rewritten.extend(task['path'] for task in tasks)
+
+            # 删除不再存在的旧页面
+            for stale in set(old_pages) - set(manifest_pages):
+                remove_with_compressed(os.path.join(output_dir, stale))
+
+            index_html = self._index_html(user_id, stats, pages, export_date)
+            index_path = os.path.join(output_dir, 'index.html')
+            if _write_if_changed(index_path, minify_html(index_html) if self.minify else index_html):
+                rewritten.append(index_path)
+            _write_if_changed(manifest_path, json.dumps(
+                {'version': SITE_VERSION, 'user_id': user_id, 'pages': manifest_pages},
+                ensure_ascii=False, indent=2))
+            if self.precompress:
+                # 本次重写的文件强制重新压缩，其余文件的压缩文件比原文件新时不再压缩
+                precompress_tree(output_dir, rewritten)
+
+            logger.info(f"静态网站已导出到: {output_dir}（共 {len(pages)} 个书籍页面，重写 {len(tasks)} 个）")
+            return True
+
+        except Exception as e:
+            logger.error(f"静态网站导出失败: {e}")
+            return False
+
+    def _render_pages(self, tasks: List[Dict]) -> None:
+        """生成书籍页面：多个页面时在进程池中并行生成"""
+        workers = self.workers or os.cpu_count() or 1
+        workers = min(workers, len(tasks))
+        if workers <= 1:
+            for task in tasks:
+                _render_page(task)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # list() 使工作进程中的异常在这里抛出
+            list(executor.map(_render_page, tasks))
+
+
+def _render_page(task: Dict) -> int:
+    """在工作进程中只读打开数据库，按年份和页面首尾的翻页键逐本读取书籍并写入页面文件，返回书籍数"""
+    exporter = HTMLExporter(minify=task['minify'])
+    head, tail = PAGE_TEMPLATE.split('{content_html}')
+    finish = minify_html if task['minify'] else (lambda html: html)
+    conn = connect_readonly(task['db_path'])
+    conn.create_function('review_year', 1, extract_year, deterministic=True)
+    count = 0
+    temp_path = f"{task['path']}.part"
+    try:
+        (first_created, first_id), (last_created, last_id) = task['first'], task['last']
+        cursor = conn.execute(f'''
+            SELECT {EXPORT_COLUMNS}
+            FROM books WHERE {task['where']}{PAGE_RANGE_FILTER} AND review_year(review_date) IS ?
+            ORDER BY created_at DESC, id DESC
+        ''', task['params'] + (last_created, first_created, first_created, first_id, last_created, last_id,
+                               task['year']))
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(finish(head.format(title=task['title'], heading=task['heading'],
+                                       nav_html=task['nav_html'], header_html=task['header_html'])))
+            f.write('<div class="book-list" id="bookList">')
+            while True:
+                rows = cursor.fetchmany(500)
+                if not rows:
+                    break
+                for row in rows:
+                    f.write(finish(exporter._generate_book_html(book_row_to_dict(row))))
+                count += len(rows)
+            f.write('</div>')
+            f.write(finish(tail.format(nav_html=task['nav_html'], export_date=task['export_date'])))
+        os.replace(temp_path, task['path'])
+    finally:
+        conn.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return count
+
+
+def _load_manifest(path: str) -> Dict:
+    """读取上次导出的清单，不存在或损坏时返回空清单"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_if_changed(path: str, content: str) -> bool:
+    """内容与现有文件相同时不重写，返回是否写入"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
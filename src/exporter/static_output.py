@@ -0,0 +1,131 @@
+import os
+import re
+import gzip
+from typing import Iterable, List
+from src.utils.logger import logger
+
+try:
+    import brotli
+except ImportError:  # 未安装 brotli 时只生成 .gz
+    brotli = None
+
+# 静态托管时需要预压缩的文件类型
+COMPRESSIBLE_SUFFIXES = ('.html', '.css', '.js')
+
+# 预压缩文件的后缀，删除页面时一并删除
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_CSS_COLON = re.compile(r':\s+')
+# <style> 和 <script> 块单独处理，其余标记只压缩空白
+_BLOCK_PATTERN = re.compile(r'(<(style|script)\b[^>]*>)(.*?)(</\2>)', re.S | re.I)
+_WHITESPACE_WITH_NEWLINE = re.compile(r'[ \t\r]*\n\s*')
+_JS_COMMENT_LINE = re.compile(r'^\s*//.*\n?', re.M)
+_LEADING_WHITESPACE = re.compile(r'^[ \t]+', re.M)
+_BLANK_LINES = re.compile(r'\n{2,}')
+
+_warned_brotli = False
+
+
+def minify_css(css: str) -> str:
+    """去掉样式表中的注释和多余空白"""
+    css = _CSS_COMMENT.sub('', css)
+    css = _CSS_PUNCTUATION.sub(r'\1', css)
+    css = _CSS_COLON.sub(':', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js: str) -> str:
+    """去掉脚本的缩进、空行和整行注释；保留换行，不依赖分号也能正确执行"""
+    js = _JS_COMMENT_LINE.sub('', js)
+    js = _LEADING_WHITESPACE.sub('', js)
+    return _BLANK_LINES.sub('\n', js).strip()
+
+
+def _minify_markup(html: str) -> str:
+    """含换行的连续空白压缩为一个换行：浏览器同样把它显示为一个空格，页面效果不变"""
+    return _WHITESPACE_WITH_NEWLINE.sub('\n', html)
+
+
+def minify_html(html: str) -> str:
+    """压缩HTML：标记之间的缩进和空行、内联样式表和脚本
+
+    JSON 数据块（type="application/json"）原样保留。
+    """
+    parts = []
+    position = 0
+    for match in _BLOCK_PATTERN.finditer(html):
+        parts.append(_minify_markup(html[position:match.start()]))
+        open_tag, tag, body, close_tag = match.group(1), match.group(2).lower(), match.group(3), match.group(4)
+        if tag == 'style':
+            body = minify_css(body)
+        elif 'application/json' not in open_tag:
+            body = minify_js(body)
+        parts.append(open_tag + body + close_tag)
+        position = match.end()
+    parts.append(_minify_markup(html[position:]))
+    return ''.join(parts)
+
+
+def _write_compressed(path: str, data: bytes) -> None:
+    """先写临时文件再替换，压缩中途失败不会留下残缺的文件"""
+    temp_file = f"{path}.part"
+    try:
+        with open(temp_file, 'wb') as f:
+            f.write(data)
+        os.replace(temp_file, path)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def precompress(path: str, force: bool = False) -> List[str]:
+    """在文件旁生成 .gz（以及安装了 brotli 时的 .br）压缩文件，供静态服务器直接返回
+
+    压缩文件比原文件新时视为最新，不重复压缩。调用方刚重写过的文件应传入 force=True：
+    文件系统的修改时间精度可能只有1~2秒，短时间内重新导出时仅凭修改时间会留下过期的压缩文件。
+    返回本次写入的压缩文件路径。
+    """
+    global _warned_brotli
+    source_mtime = os.path.getmtime(path)
+    targets = [(f"{path}.gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        targets.append((f"{path}.br", lambda data: brotli.compress(data, quality=11)))
+    elif not _warned_brotli:
+        logger.warning("未安装 brotli，只生成 .gz 压缩文件（pip install brotli）")
+        _warned_brotli = True
+
+    data = None
+    written = []
+    for target, compress in targets:
+        if not force and os.path.exists(target) and os.path.getmtime(target) >= source_mtime:
+            continue
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        _write_compressed(target, compress(data))
+        written.append(target)
+    return written
+
+
+def precompress_tree(root: str, rewritten: Iterable[str] = ()) -> int:
+    """为目录中全部 HTML、CSS、JS 文件生成压缩文件，返回写入的压缩文件数
+
+    rewritten 为本次刚写入的文件，总是重新压缩；其余文件按修改时间判断是否需要压缩。
+    """
+    rewritten = {os.path.abspath(path) for path in rewritten}
+    count = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.endswith(COMPRESSIBLE_SUFFIXES):
+                path = os.path.join(directory, name)
+                count += len(precompress(path, force=os.path.abspath(path) in rewritten))
+    return count
+
+
+def remove_with_compressed(path: str) -> None:
+    """删除文件及其预压缩文件"""
+    for target in [path] + [path + suffix for suffix in COMPRESSED_SUFFIXES]:
+        if os.path.exists(target):
+            os.remove(target)
@@ -0,0 +1,379 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from src.database.database import DoubanBookDB
+from src.utils.logger import logger
+
+# 评分筛选中表示不过滤的选项
+ALL_RATINGS = '全部'
+
+# 列表列：(列名, 标题, 宽度)
+BROWSER_COLUMNS = [
+    ('title', '书名', 240),
+    ('author', '作者', 160),
+    ('publish_date', '出版日期', 90),
+    ('rating', '评分', 50),
+    ('review_date', '评价日期', 90),
+    ('has_review', '书评', 40),
+]
+
+
+def rating_options(rating_stats: Dict[str, int]) -> List[str]:
+    """评分筛选的选项：用户书籍中实际存在的评分（如"4星"、"8分"、"未评分"），顺序同 get_user_stats"""
+    return [ALL_RATINGS] + list(rating_stats)
+
+
+def row_key(row: Tuple) -> Tuple[str, int]:
+    """browse_books 结果行的翻页键 (created_at, id)"""
+    return row[7], row[0]
+
+
+class BookPager:
+    """书籍列表的分页窗口：只在内存中保留连续的一段记录，按需向更早或更新的方向扩展
+
+    记录按收录时间倒序排列。每次扩展读取 page_size 条，超过 max_rows 条时从另一端丢弃，
+    因此无论用户有多少书籍，内存占用和界面中的行数都有上限。
+    各方法返回需要应用到界面的变化，只应在同一个线程中依次调用。
+    """
+
+    def __init__(self, db: DoubanBookDB, user_id: str, page_size: int = 200, max_rows: int = 2000,
+                 rating: Optional[str] = None, start_date: str = None, end_date: str = None,
+                 text: Optional[str] = None):
+        self.db = db
+        self.user_id = user_id
+        self.page_size = page_size
+        self.max_rows = max(max_rows, page_size * 2)
+        self.filters = {'rating': rating, 'start_date': start_date, 'end_date': end_date, 'text': text}
+        self.rows: List[Tuple] = []
+        self.has_older = False
+        self.has_newer = False
+        self.version = None
+
+    def _fetch(self, **keyset) -> Tuple[List[Tuple], bool]:
+        """多取一条判断该方向是否还有记录"""
+        rows = self.db.browse_books(self.user_id, limit=self.page_size + 1, **keyset, **self.filters)
+        more = len(rows) > self.page_size
+        if more:
+            rows = rows[1:] if 'before' in keyset else rows[:-1]
+        return rows, more
+
+    def reset(self) -> List[Tuple]:
+        """回到最新一页，返回窗口中的全部记录"""
+        self.version = self.db.write_version(self.user_id)
+        self.rows, self.has_older = self._fetch()
+        self.has_newer = False
+        return self.rows
+
+    def load_older(self) -> Tuple[List[Tuple], int]:
+        """在末尾追加更早的一页，返回 (追加的记录, 从开头丢弃的条数)"""
+        if not self.rows or not self.has_older:
+            return [], 0
+        rows, self.has_older = self._fetch(after=row_key(self.rows[-1]))
+        self.rows.extend(rows)
+        trimmed = max(0, len(self.rows) - self.max_rows)
+        if trimmed:
+            del self.rows[:trimmed]
+            self.has_newer = True
+        return rows, trimmed
+
+    def load_newer(self) -> Tuple[List[Tuple], int]:
+        """在开头插入更新的一页，返回 (插入的记录, 从末尾丢弃的条数)"""
+        if not self.rows or not self.has_newer:
+            return [], 0
+        rows, self.has_newer = self._fetch(before=row_key(self.rows[0]))
+        self.rows[:0] = rows
+        trimmed = max(0, len(self.rows) - self.max_rows)
+        if trimmed:
+            del self.rows[-trimmed:]
+            self.has_older = True
+        return rows, trimmed
+
+    def poll(self) -> Optional[Tuple[List[Tuple], int]]:
+        """爬取时检查是否有新写入：数据未变化时不查询并返回 None
+
+        窗口位于最新一端时读取新收录的记录，返回值同 load_newer；否则只标记上方还有记录，
+        等用户滚动到顶部时再加载。
+        """
+        version = self.db.write_version(self.user_id)
+        if version == self.version:
+            return None
+        self.version = version
+        if not self.rows:
+            return self.reset(), 0
+        # 窗口不在最新一端时不读取，留给滚动到顶部时的 load_newer
+        if self.has_newer:
+            return [], 0
+        self.has_newer = True
+        return self.load_newer()
+
+
+class BookBrowser:
+    """书籍浏览窗口：按评分、日期和关键字筛选，滚动时分页加载
+
+    查询在单独的后台线程中执行，结果回到主线程后增量更新列表；列表中只保留 BookPager 窗口内的行，
+    十万本书籍也不会拖慢界面。爬取进行中时定时检查新写入的书籍并显示在顶部。
+    """
+
+    # 距离列表两端不足该比例时加载下一页
+    PREFETCH_MARGIN = 0.1
+    # 关键字输入停止该毫秒数后才查询：关键字匹配需要逐条比对书名、作者和书评，不能每次按键都查询
+    TEXT_QUERY_DELAY = 500
+
+    def __init__(self, parent: tk.Misc, db: DoubanBookDB, user_id: str,
+                 is_live=lambda: False, page_size: int = 200, max_rows: int = 2000,
+                 poll_interval: int = 1000):
+        self.db = db
+        self.user_id = user_id
+        self.is_live = is_live
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.poll_interval = poll_interval
+        self.pager: Optional[BookPager] = None
+        self._loading = False
+        self._generation = 0
+        self._poll_id = None
+        self._text_query_id = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='book-browser')
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(f"书籍浏览 - {user_id}")
+        self.window.geometry("760x520")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self._setup_ui()
+        self.query()
+        self._schedule_poll()
+
+    def _setup_ui(self) -> None:
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(1, weight=1)
+
+        filter_frame = ttk.Frame(self.window, padding="5")
+        filter_frame.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        filter_frame.columnconfigure(7, weight=1)
+
+        ttk.Label(filter_frame, text="评分:").grid(row=0, column=0, sticky=tk.W)
+        self.rating_var = tk.StringVar(value=ALL_RATINGS)
+        self.rating_box = ttk.Combobox(filter_frame, textvariable=self.rating_var, values=[ALL_RATINGS],
+                                       width=8, state='readonly')
+        self.rating_box.grid(row=0, column=1, padx=(0, 10))
+
+        ttk.Label(filter_frame, text="评价日期:").grid(row=0, column=2, sticky=tk.W)
+        self.start_date_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.start_date_var, width=11).grid(row=0, column=3)
+        ttk.Label(filter_frame, text="至").grid(row=0, column=4, padx=2)
+        self.end_date_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.end_date_var, width=11).grid(row=0, column=5, padx=(0, 10))
+
+        ttk.Label(filter_frame, text="关键字:").grid(row=0, column=6, sticky=tk.W)
+        self.text_var = tk.StringVar()
+        text_entry = ttk.Entry(filter_frame, textvariable=self.text_var)
+        text_entry.grid(row=0, column=7, sticky=(tk.W, tk.E))
+        text_entry.bind('<Return>', lambda event: self.query())
+        text_entry.bind('<KeyRelease>', self._on_text_key)
+        ttk.Button(filter_frame, text="查询", command=self.query).grid(row=0, column=8, padx=(5, 0))
+
+        table_frame = ttk.Frame(self.window)
+        table_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        table_frame.columnconfigure(0, weight=1)
+        table_frame.rowconfigure(0, weight=1)
+
+        self.tree = ttk.Treeview(table_frame, columns=[name for name, _, _ in BROWSER_COLUMNS],
+                                 show='headings', selectmode='browse')
+        for name, heading, width in BROWSER_COLUMNS:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width, stretch=name in ('title', 'author'))
+        self.scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+        self.status_var = tk.StringVar(value="正在加载...")
+        ttk.Label(self.window, textvariable=self.status_var, padding="5").grid(row=2, column=0, sticky=tk.W)
+
+    def _read_filters(self) -> Optional[Dict]:
+        """读取筛选条件，日期格式错误时返回 None"""
+        start_date, end_date = self.start_date_var.get().strip(), self.end_date_var.get().strip()
+        for value in (start_date, end_date):
+            if value:
+                try:
+                    datetime.strptime(value, "%Y-%m-%d")
+                except ValueError:
+                    messagebox.showerror("错误", f"日期格式应为 YYYY-MM-DD: {value}", parent=self.window)
+                    return None
+        if bool(start_date) != bool(end_date):
+            messagebox.showerror("错误", "请同时填写开始和结束日期", parent=self.window)
+            return None
+        rating = self.rating_var.get()
+        return {
+            'rating': None if rating == ALL_RATINGS else rating,
+            'start_date': start_date or None,
+            'end_date': end_date or None,
+            'text': self.text_var.get().strip() or None,
+        }
+
+    def _on_text_key(self, event) -> None:
+        """关键字变化后延迟查询，连续输入时只在停顿后查询一次"""
+        if event.keysym == 'Return':
+            return
+        if self._text_query_id is not None:
+            self.window.after_cancel(self._text_query_id)
+        self._text_query_id = self.window.after(self.TEXT_QUERY_DELAY, self.query)
+
+    def query(self) -> None:
+        """按当前筛选条件从最新一页重新加载"""
+        if self._text_query_id is not None:
+            self.window.after_cancel(self._text_query_id)
+            self._text_query_id = None
+        filters = self._read_filters()
+        if filters is None:
+            return
+        # 新查询开始后，旧查询尚未显示的结果全部作废
+        self._generation += 1
+        self.pager = BookPager(self.db, self.user_id, self.page_size, self.max_rows, **filters)
+        self._loading = True
+        self.status_var.set("正在加载...")
+        self._submit(self.pager.reset, self._show_reset)
+        self._load_ratings()
+
+    def _load_ratings(self) -> None:
+        """在后台线程读取用户已有的评分，更新评分筛选的选项"""
+        def worker():
+            try:
+                options = rating_options(self.db.get_user_stats(self.user_id)['rating_stats'])
+            except Exception as e:
+                logger.error(f"读取评分选项失败: {e}")
+                return
+            try:
+                self.window.after(0, lambda: self.rating_box.configure(values=options))
+            except (RuntimeError, tk.TclError):
+                pass  # 窗口已关闭
+
+        self._executor.submit(worker)
+
+    def _submit(self, task, apply) -> None:
+        """在后台线程执行 task，结果交给主线程的 apply"""
+        generation, pager = self._generation, self.pager
+
+        def worker():
+            try:
+                result = task()
+            except Exception as e:
+                logger.error(f"加载书籍列表失败: {e}")
+                result, failed = None, True
+            else:
+                failed = False
+            try:
+                self.window.after(0, lambda: self._apply(generation, pager, apply, result, failed))
+            except (RuntimeError, tk.TclError):
+                pass  # 窗口已关闭
+
+        self._executor.submit(worker)
+
+    def _apply(self, generation, pager, apply, result, failed) -> None:
+        if generation != self._generation or pager is not self.pager:
+            return
+        self._loading = False
+        if failed:
+            self.status_var.set("加载失败，请查看日志")
+            return
+        if isinstance(result, tuple):
+            apply(*result)
+        elif result is not None:
+            apply(result)
+        self._update_status()
+
+    def _values(self, row: Tuple) -> Tuple:
+        _, title, author, publish_date, rating, review_date, has_review, _ = row
+        return (title, author or '', publish_date or '', rating or '', review_date or '', '有' if has_review else '')
+
+    def _insert(self, rows: List[Tuple], index) -> None:
+        for offset, row in enumerate(rows):
+            if self.tree.exists(str(row[0])):
+                continue
+            position = index + offset if isinstance(index, int) else index
+            self.tree.insert('', position, iid=str(row[0]), values=self._values(row))
+
+    def _first_visible(self) -> int:
+        children = len(self.tree.get_children())
+        return round(self.tree.yview()[0] * children) if children else 0
+
+    def _show_reset(self, rows: List[Tuple]) -> None:
+        self.tree.delete(*self.tree.get_children())
+        self._insert(rows, tk.END)
+        self.tree.yview_moveto(0)
+
+    def _show_older(self, rows: List[Tuple], trimmed: int) -> None:
+        first = self._first_visible()
+        self._insert(rows, tk.END)
+        if trimmed:
+            self.tree.delete(*self.tree.get_children()[:trimmed])
+            # 删除上方的行后保持可见位置不变
+            self._move_to(first - trimmed)
+
+    def _show_newer(self, rows: List[Tuple], trimmed: int) -> None:
+        first = self._first_visible()
+        at_top = self.tree.yview()[0] <= 0
+        if trimmed:
+            self.tree.delete(*self.tree.get_children()[-trimmed:])
+        self._insert(rows, 0)
+        # 停在顶部时直接显示新书籍，否则保持正在查看的行不动
+        if not at_top or not self.is_live():
+            self._move_to(first + len(rows))
+
+    def _move_to(self, index: int) -> None:
+        children = len(self.tree.get_children())
+        if children:
+            self.tree.yview_moveto(max(0, index) / children)
+
+    def _update_status(self) -> None:
+        pager = self.pager
+        text = f"已加载 {len(pager.rows)} 本"
+        if pager.has_older:
+            text += "，向下滚动加载更多"
+        if pager.has_newer:
+            text += "，上方还有更新的书籍"
+        self.status_var.set(text)
+
+    def _on_scroll(self, first: str, last: str) -> None:
+        """列表滚动时更新滚动条，接近两端时加载下一页"""
+        self.scrollbar.set(first, last)
+        if self._loading or self.pager is None:
+            return
+        first, last = float(first), float(last)
+        if last >= 1 - self.PREFETCH_MARGIN and self.pager.has_older:
+            self._loading = True
+            self._submit(self.pager.load_older, self._show_older)
+        elif first <= self.PREFETCH_MARGIN and self.pager.has_newer:
+            self._loading = True
+            self._submit(self.pager.load_newer, self._show_newer)
+
+    def _schedule_poll(self) -> None:
+        self._poll_id = self.window.after(self.poll_interval, self._poll)
+
+    def _poll(self) -> None:
+        """爬取进行中时检查新写入的书籍；未爬取或正在加载时跳过"""
+        if self.is_live() and not self._loading and self.pager is not None:
+            self._loading = True
+            self._submit(self.pager.poll, self._show_newer)
+        self._schedule_poll()
+
+    def shutdown(self) -> None:
+        """停止定时检查、延迟查询和后台线程，主窗口已销毁时也可调用"""
+        for after_id in (self._poll_id, self._text_query_id):
+            if after_id is not None:
+                try:
+                    self.window.after_cancel(after_id)
+                except tk.TclError:
+                    pass
+        self._poll_id = self._text_query_id = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        """关闭窗口并停止后台线程"""
+        self.shutdown()
+        try:
+            self.window.destroy()
+        except tk.TclError:
+            pass
@@ -8,6 +8,10 @@ from datetime import datetime
 from src.database.database import DoubanBookDB
 from src.exporter.html_exporter import HTMLExporter
 from src.exporter.csv_exporter import CSVExporter
+from src.exporter.progress import format_progress
+from src.gui.book_browser import BookBrowser
+from src.gui.log_sink import LOG_LEVELS, TkLogSink
+from src.gui.stats_loader import StatsLoader
 from src.utils.logger import logger
 
 class DoubanBookGUI:
@@ -20,15 +24,14 @@ class DoubanBookGUI:
         self.db = DoubanBookDB()
         self.html_exporter = HTMLExporter()
         self.csv_exporter = CSVExporter()
+        # 用户统计在后台线程中加载并缓存，爬取写入后失效
+        self.stats_loader = StatsLoader(self.db)
         
         # 爬虫状态
         self.is_crawling = False
         self.crawl_thread = None
-        self._progress_thread = None
         self.export_running = False
-        
-        # 配置参数
-        self._progress_update_interval = 0.05  # 进度条更新间隔（秒）
+        self.book_browser = None
         
         self.setup_ui()
         
@@ -149,6 +152,39 @@ class DoubanBookGUI:
         self.save_debug_pages_check.grid(row=0, column=0, sticky=tk.W, padx=5)
         ttk.Label(debug_frame, text="(开启后会保存每页HTML内容到debug_page_*.html文件)").grid(row=0, column=1, sticky=tk.W, padx=5)
         
+        self.compact_html_var = tk.BooleanVar(value=False)
+        self.compact_html_check = ttk.Checkbutton(
+            debug_frame, 
+            text="紧凑HTML", 
+            variable=self.compact_html_var,
+            onvalue=True, 
+            offvalue=False
+        )
+        self.compact_html_check.grid(row=1, column=0, sticky=tk.W, padx=5)
+        ttk.Label(debug_frame, text="(书籍数据以JSON嵌入并虚拟滚动显示，适合书籍很多的用户)").grid(row=1, column=1, sticky=tk.W, padx=5)
+        
+        self.search_index_var = tk.BooleanVar(value=False)
+        self.search_index_check = ttk.Checkbutton(
+            debug_frame, 
+            text="搜索索引", 
+            variable=self.search_index_var,
+            onvalue=True, 
+            offvalue=False
+        )
+        self.search_index_check.grid(row=2, column=0, sticky=tk.W, padx=5)
+        ttk.Label(debug_frame, text="(HTML附带预先构建的搜索索引，书籍很多时搜索更快)").grid(row=2, column=1, sticky=tk.W, padx=5)
+        
+        self.charts_var = tk.BooleanVar(value=False)
+        self.charts_check = ttk.Checkbutton(
+            debug_frame, 
+            text="统计图表", 
+            variable=self.charts_var,
+            onvalue=True, 
+            offvalue=False
+        )
+        self.charts_check.grid(row=3, column=0, sticky=tk.W, padx=5)
+        ttk.Label(debug_frame, text="(HTML嵌入评分分布、年度数量和阅读节奏图表)").grid(row=3, column=1, sticky=tk.W, padx=5)
+        
         # 按钮区域
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=8, column=0, columnspan=4, pady=20, sticky=(tk.W, tk.E))
@@ -169,6 +205,15 @@ class DoubanBookGUI:
         self.export_csv_btn = ttk.Button(button_frame, text="导出CSV", command=self.export_csv)
         self.export_csv_btn.grid(row=0, column=3, padx=5, sticky=(tk.W, tk.E))
         
+        self.maintain_btn = ttk.Button(button_frame, text="数据库维护", command=self.maintain_database)
+        self.maintain_btn.grid(row=1, column=0, padx=5, pady=(10, 0), sticky=(tk.W, tk.E))
+        
+        self.browse_btn = ttk.Button(button_frame, text="浏览书籍", command=self.open_book_browser)
+        self.browse_btn.grid(row=1, column=1, padx=5, pady=(10, 0), sticky=(tk.W, tk.E))
+        
+        self.export_excel_btn = ttk.Button(button_frame, text="导出Excel", command=self.export_excel)
+        self.export_excel_btn.grid(row=1, column=3, padx=5, pady=(10, 0), sticky=(tk.W, tk.E))
+        
         # 进度显示区域
         progress_frame = ttk.LabelFrame(main_frame, text="进度信息", padding="10")
         progress_frame.grid(row=9, column=0, columnspan=4, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
@@ -199,6 +244,21 @@ class DoubanBookGUI:
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
         
+        # 日志先进入缓冲区，定时批量写入文本框，只保留最近的行
+        self.log_sink = TkLogSink(self.root, self.log_text)
+        self.log_sink.start()
+        
+        # 日志显示级别
+        level_frame = ttk.Frame(log_frame)
+        level_frame.grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        ttk.Label(level_frame, text="显示级别:").grid(row=0, column=0, sticky=tk.W)
+        self.log_level_var = tk.StringVar(value=self.log_sink.buffer.level)
+        self.log_level_combo = ttk.Combobox(level_frame, textvariable=self.log_level_var,
+                                            values=list(LOG_LEVELS), width=10, state="readonly")
+        self.log_level_combo.grid(row=0, column=1, sticky=tk.W, padx=(5, 0))
+        self.log_level_combo.bind("<<ComboboxSelected>>",
+                                  lambda event: self.log_sink.buffer.set_level(self.log_level_var.get()))
+        
         # 设置网格权重
         main_frame.rowconfigure(10, weight=1)
         
@@ -233,7 +293,7 @@ class DoubanBookGUI:
         
         filename = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV文件", "*.csv"), ("所有文件", "*.*")],
+            filetypes=[("CSV文件", "*.csv"), ("gzip压缩的CSV文件", "*.csv.gz"), ("所有文件", "*.*")],
             initialfile=f"{user_id}_豆瓣书评.csv"
         )
         
@@ -242,19 +302,46 @@ class DoubanBookGUI:
     
 
     
+    def export_excel(self):
+        """导出Excel文件（每年一个工作表），带动态进度条"""
+        user_id = self.user_id_var.get().strip()
+        if not self._validate_export_data(user_id):
+            return
+        
+        start_date, end_date = self._get_date_range()
+        if start_date == "" and end_date == "" and (
+            self.start_year_var.get().strip() or 
+            self.start_month_var.get().strip() or 
+            self.start_day_var.get().strip() or
+            self.end_year_var.get().strip() or 
+            self.end_month_var.get().strip() or 
+            self.end_day_var.get().strip()
+        ):
+            return  # 日期验证失败，已显示错误信息
+        
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel文件", "*.xlsx"), ("所有文件", "*.*")],
+            initialfile=f"{user_id}_豆瓣书评.xlsx"
+        )
+        
+        if filename:
+            from src.exporter.excel_exporter import ExcelExporter
+            self._export_with_progress("Excel", filename, user_id, start_date, end_date, ExcelExporter())
+    
     def _export_with_progress(self, export_type, filename, user_id, start_date, end_date, exporter):
         """通用导出方法，带进度条"""
         try:
             self.update_status(f"正在导出{export_type}...")
+            self.update_progress(0)
+            self.export_running = True
             
-            # 启动动态进度条线程
-            self._start_progress_thread()
-            
-            # 在独立线程中执行导出
+            # 在独立线程中执行导出，导出器按实际处理的行数报告进度
             def export_worker():
                 try:
                     success = exporter.export_user_books(
-                        self.db, user_id, filename, start_date, end_date
+                        self.db, user_id, filename, start_date, end_date,
+                        progress_callback=lambda info: self._report_export_progress(export_type, info)
                     )
                     
                     # 在主线程中更新UI
@@ -272,6 +359,11 @@ class DoubanBookGUI:
             self.log(f"{export_type}导出失败: {e}")
             messagebox.showerror("错误", f"{export_type}导出失败: {e}")
     
+    def _report_export_progress(self, export_type, info):
+        """在导出线程中调用：把导出进度和预计剩余时间显示到进度条和状态栏"""
+        self.update_progress(info['fraction'] * 100)
+        self.update_status(f"正在导出{export_type}：{format_progress(info)}")
+    
     def _handle_export_result(self, success, filename, export_type):
         """处理导出结果"""
         # 导出完成，停止进度条
@@ -295,6 +387,41 @@ class DoubanBookGUI:
         self.log(f"{export_type}导出失败: {error}")
         messagebox.showerror("错误", f"{export_type}导出失败: {error}")
     
+    def maintain_database(self):
+        """执行数据库维护（ANALYZE、增量空间回收、索引审计），可在爬取时运行"""
+        self.maintain_btn.config(state=tk.DISABLED)
+        self.update_status("正在维护数据库...")
+        
+        def maintain_worker():
+            try:
+                from src.database.maintenance import DatabaseMaintenance
+                maintenance = DatabaseMaintenance(self.db)
+                for line in maintenance.format_report(maintenance.run()):
+                    self.log(line)
+                self.update_status("数据库维护完成")
+            except Exception as e:
+                self.log(f"数据库维护失败: {e}")
+                self.update_status("数据库维护失败")
+            finally:
+                self.root.after(0, lambda: self.maintain_btn.config(state=tk.NORMAL))
+        
+        threading.Thread(target=maintain_worker, daemon=True).start()
+    
+    def open_book_browser(self):
+        """打开书籍浏览窗口，爬取进行中时新书籍会实时出现在列表顶部"""
+        user_id = self.user_id_var.get().strip()
+        if not user_id:
+            messagebox.showerror("错误", "请先输入用户名！")
+            return
+        
+        # 同一用户的窗口已打开时直接切换过去
+        if self.book_browser is not None and self.book_browser.window.winfo_exists():
+            if self.book_browser.user_id == user_id:
+                self.book_browser.window.lift()
+                return
+            self.book_browser.close()
+        self.book_browser = BookBrowser(self.root, self.db, user_id, is_live=lambda: self.is_crawling)
+    
     def show_cookie_help(self):
         """显示Cookie获取帮助"""
         help_text = """如何获取豆瓣Cookie：
@@ -355,37 +482,19 @@ class DoubanBookGUI:
             messagebox.showerror("错误", "请先输入用户名！")
             return False
         
-        stats = self.db.get_user_stats(user_id)
-        if stats['total_books'] == 0:
+        # 只需判断是否有数据，单个计数查询即可
+        if self.db.count_books(user_id) == 0:
             messagebox.showwarning("警告", "没有找到该用户的书籍数据，请先爬取！")
             return False
         return True
     
-    def _start_progress_thread(self):
-        """启动进度条线程"""
-        # 确保之前的进度线程已清理
-        if self._progress_thread and self._progress_thread.is_alive():
-            self.export_running = False
-            self._progress_thread.join(timeout=1.0)
-        
-        self.export_progress = 0
-        self.export_running = True
-        
-        def update_progress_bar():
-            while self.export_running:
-                self.export_progress = min(100, self.export_progress + 1)
-                self.update_progress(self.export_progress)
-                import time
-                time.sleep(self._progress_update_interval)
-        
-        self._progress_thread = threading.Thread(target=update_progress_bar, daemon=True)
-        self._progress_thread.start()
-    
     def _handle_option_change(self, *args):
         """处理选项变化，移除互斥关系，日期范围只在导出时使用"""
         # 不再禁用任何输入，让用户可以同时设置最大页数和日期范围
-        # 最大页数用于爬取，日期范围只用于导出
-        pass
+        # 最大页数用于爬取，日期范围只用于导出；统计信息随日期范围刷新（在后台加载，命中缓存时不查询）
+        user_id = self.user_id_var.get().strip()
+        if user_id and not self.is_crawling:
+            self.update_stats(user_id)
     
     def _get_config_path(self):
         """获取配置文件路径"""
@@ -430,21 +539,12 @@ class DoubanBookGUI:
         except Exception as e:
             self.log(f"保存配置失败: {e}")
     
-    def log(self, message):
-        """添加日志消息"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
-        
-        # 同时输出到日志文件
-        logger.info(message)
-        
-        # 在主线程中更新UI
-        self.root.after(0, self._update_log, log_message)
-    
-    def _update_log(self, message):
-        """在主线程中更新日志"""
-        self.log_text.insert(tk.END, message)
-        self.log_text.see(tk.END)
+    def log(self, message, level='INFO'):
+        """添加日志消息，可在任意线程调用
+
+        日志写入日志文件，同时进入日志窗口的缓冲区，由主线程定时批量显示。
+        """
+        logger.log(level, message)
     
     def update_status(self, status):
         """更新状态"""
@@ -455,7 +555,10 @@ class DoubanBookGUI:
         self.root.after(0, lambda: self.progress_var.set(value))
     
     def update_stats(self, user_id):
-        """更新用户统计信息，支持日期范围过滤"""
+        """更新用户统计信息，支持日期范围过滤
+
+        在主线程中读取日期范围后交给后台线程查询（按用户和日期范围缓存），只有最后的标签更新回到主线程。
+        """
         try:
             # 获取当前选择的日期范围（年-月-日格式）
             start_year = self.start_year_var.get().strip()
@@ -469,20 +572,31 @@ class DoubanBookGUI:
             start_date = f"{start_year}-{start_month}-{start_day}" if (start_year and start_month and start_day) else ""
             end_date = f"{end_year}-{end_month}-{end_day}" if (end_year and end_month and end_day) else ""
             
-            stats = self.db.get_user_stats(user_id, start_date, end_date)
-            stats_text = f"总书籍: {stats['total_books']} | 有书评: {stats['books_with_reviews']} | "
-            
-            if stats['rating_stats']:
-                rating_info = " | ".join([f"{rating}: {count}本" for rating, count in stats['rating_stats'].items()])
-                stats_text += rating_info
-            
-            if stats['last_crawl']:
-                stats_text += f" | 最后更新: {stats['last_crawl'][:16]}"
-            
-            self.root.after(0, lambda: self.stats_var.set(stats_text))
+            self.stats_loader.load(user_id, start_date, end_date, self._show_stats,
+                                   lambda e: self.log(f"更新统计信息失败: {e}"))
         except Exception as e:
             self.log(f"更新统计信息失败: {e}")
     
+    def _show_stats(self, stats):
+        """在后台线程中格式化统计信息，再交给主线程更新标签"""
+        stats_text = f"总书籍: {stats['total_books']} | 有书评: {stats['books_with_reviews']} | "
+        
+        if stats['rating_stats']:
+            rating_info = " | ".join([f"{rating}: {count}本" for rating, count in stats['rating_stats'].items()])
+            stats_text += rating_info
+        
+        if stats['last_crawl']:
+            stats_text += f" | 最后更新: {stats['last_crawl'][:16]}"
+        
+        self.root.after(0, lambda: self.stats_var.set(stats_text))
+    
+    def close(self):
+        """窗口关闭后停止日志刷新、统计加载和书籍浏览的后台线程"""
+        if self.book_browser is not None:
+            self.book_browser.shutdown()
+        self.log_sink.close()
+        self.stats_loader.close()
+    
     def start_crawl(self):
         """开始爬取"""
         user_id = self.user_id_var.get().strip()
@@ -514,9 +628,10 @@ class DoubanBookGUI:
         self.stop_btn.config(state=tk.NORMAL)
         self.export_html_btn.config(state=tk.DISABLED)
         self.export_csv_btn.config(state=tk.DISABLED)
+        self.export_excel_btn.config(state=tk.DISABLED)
         
         # 清空日志
-        self.log_text.delete(1.0, tk.END)
+        self.log_sink.clear()
         
         # 爬取时不使用日期范围过滤，只在导出时使用
         # 启动爬取线程
@@ -557,6 +672,7 @@ class DoubanBookGUI:
         self.stop_btn.config(state=tk.DISABLED)
         self.export_html_btn.config(state=tk.NORMAL)
         self.export_csv_btn.config(state=tk.NORMAL)
+        self.export_excel_btn.config(state=tk.NORMAL)
         
         if self.user_id_var.get().strip():
             self.update_stats(self.user_id_var.get().strip())
@@ -585,7 +701,11 @@ class DoubanBookGUI:
         )
         
         if filename:
-            self._export_with_progress("HTML", filename, user_id, start_date, end_date, self.html_exporter)
+            compact, search_index = self.compact_html_var.get(), self.search_index_var.get()
+            charts = 'embed' if self.charts_var.get() else None
+            exporter = (HTMLExporter(compact, search_index, charts=charts)
+                        if compact or search_index or charts else self.html_exporter)
+            self._export_with_progress("HTML", filename, user_id, start_date, end_date, exporter)
     
     def _reset_export_ui(self):
         """导出完成后重置UI"""
@@ -616,6 +736,7 @@ def main():
     root = tk.Tk()
     app = DoubanBookGUI(root)
     root.mainloop()
+    app.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
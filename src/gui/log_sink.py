@@ -0,0 +1,128 @@
+import threading
+import tkinter as tk
+from collections import deque
+from typing import List, Tuple
+from src.utils.logger import logger
+
+# GUI 中可选的日志显示级别，数值与 loguru 的级别序号一致
+LOG_LEVELS = {
+    'DEBUG': 10,
+    'INFO': 20,
+    'WARNING': 30,
+    'ERROR': 40,
+}
+
+# 日志窗口中每行的格式
+GUI_LOG_FORMAT = "[{time:HH:mm:ss}] {message}"
+
+
+class LogBuffer:
+    """线程安全的环形日志缓冲区：爬虫等后台线程只在这里追加，不直接操作界面
+
+    低于显示级别的日志直接丢弃；两次刷新之间超过 capacity 条时丢弃最旧的行，并记下丢弃的条数。
+    """
+
+    def __init__(self, capacity: int = 2000, level: str = 'INFO'):
+        self._lines = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.set_level(level)
+
+    def set_level(self, level: str) -> None:
+        """修改显示级别，只影响之后追加的日志"""
+        if level not in LOG_LEVELS:
+            raise ValueError(f"不支持的日志级别: {level}，可选: {', '.join(LOG_LEVELS)}")
+        self.level = level
+        self._level_no = LOG_LEVELS[level]
+
+    def append(self, line: str, level_no: int = LOG_LEVELS['INFO']) -> bool:
+        """追加一行日志，返回是否被保留"""
+        if level_no < self._level_no:
+            return False
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self.dropped += 1
+            self._lines.append(line)
+        return True
+
+    def write(self, message) -> None:
+        """loguru 的输出目标：message 为格式化后的文本，附带日志记录"""
+        self.append(str(message), message.record['level'].no)
+
+    def drain(self) -> Tuple[List[str], int]:
+        """取出全部待显示的行和期间丢弃的条数，并清空缓冲区"""
+        with self._lock:
+            lines, dropped = list(self._lines), self.dropped
+            self._lines.clear()
+            self.dropped = 0
+        return lines, dropped
+
+
+class TkLogSink:
+    """Tk 日志窗口的输出目标：日志先进入环形缓冲区，由主线程定时批量写入文本框
+
+    每个刷新周期最多执行一次插入，文本框只保留最近 max_lines 行，大量日志时界面不会卡顿，
+    内存占用也不会随爬取时间增长。作为 loguru 的输出目标添加，程序中任何模块的日志都会显示。
+    用法：
+        sink = TkLogSink(root, text_widget)
+        sink.start()
+        ...
+        sink.close()
+    """
+
+    def __init__(self, root: tk.Misc, text: tk.Text, max_lines: int = 5000, interval: int = 100,
+                 capacity: int = 2000, level: str = 'INFO'):
+        self.root = root
+        self.text = text
+        self.max_lines = max_lines
+        self.interval = interval
+        self.buffer = LogBuffer(capacity, level)
+        self._sink_id = None
+        self._after_id = None
+
+    def start(self) -> None:
+        """注册为 loguru 的输出目标并开始定时刷新"""
+        if self._sink_id is None:
+            # 级别过滤在缓冲区中进行，界面上切换显示级别时无需重新注册
+            self._sink_id = logger.add(self.buffer.write, level='DEBUG', format=GUI_LOG_FORMAT)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        self._after_id = self.root.after(self.interval, self._tick)
+
+    def _tick(self) -> None:
+        self.flush()
+        self._schedule()
+
+    def flush(self) -> None:
+        """在主线程中把缓冲区的日志一次性写入文本框，并删除超出保留行数的旧行"""
+        lines, dropped = self.buffer.drain()
+        if not lines:
+            return
+        if dropped:
+            lines.insert(0, f"……日志过多，省略了 {dropped} 条……\n")
+        # 用户向上翻看日志时不自动滚动到底部
+        follow = self.text.yview()[1] >= 0.999
+        self.text.insert(tk.END, ''.join(lines))
+        line_count = int(self.text.index('end-1c').split('.')[0])
+        if line_count > self.max_lines:
+            self.text.delete('1.0', f'{line_count - self.max_lines + 1}.0')
+        if follow:
+            self.text.see(tk.END)
+
+    def clear(self) -> None:
+        """清空文本框和尚未显示的日志"""
+        self.buffer.drain()
+        self.text.delete('1.0', tk.END)
+
+    def close(self) -> None:
+        """停止刷新并从 loguru 中移除"""
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+        if self._sink_id is not None:
+            logger.remove(self._sink_id)
+            self._sink_id = None
@@ -0,0 +1,75 @@
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+from src.database.database import DoubanBookDB
+from src.utils.logger import logger
+
+
+class StatsLoader:
+    """在后台线程中加载用户统计，结果按 (用户, 开始日期, 结束日期) 缓存
+
+    缓存记录加载时用户数据的写入版本（见 DoubanBookDB.write_version），爬取写入新书籍后自动失效。
+    多次请求排队时只把最新一次请求的结果交给回调，旧请求的结果不会覆盖界面。
+    回调在后台线程中执行，界面更新需要由回调自己转交主线程。
+    """
+
+    def __init__(self, db: DoubanBookDB, max_entries: int = 32):
+        self.db = db
+        self.max_entries = max_entries
+        self._cache: 'OrderedDict[Tuple[str, str, str], Tuple[int, Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._tickets = itertools.count(1)
+        self._latest = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stats-loader')
+
+    def get_cached(self, user_id: str, start_date: str = '', end_date: str = '') -> Optional[Dict]:
+        """返回仍然有效的缓存统计，没有时返回 None"""
+        key = (user_id, start_date or '', end_date or '')
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] != self.db.write_version(user_id):
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def load(self, user_id: str, start_date: str, end_date: str,
+             callback: Callable[[Dict], None],
+             error_callback: Optional[Callable[[Exception], None]] = None) -> Future:
+        """请求统计数据：缓存有效时直接使用，否则在后台线程中查询数据库"""
+        ticket = next(self._tickets)
+        self._latest = ticket
+        return self._executor.submit(self._load, ticket, user_id, start_date, end_date, callback, error_callback)
+
+    def _load(self, ticket: int, user_id: str, start_date: str, end_date: str,
+              callback: Callable[[Dict], None], error_callback: Optional[Callable[[Exception], None]]) -> None:
+        if ticket != self._latest:
+            return  # 已有更新的请求
+        try:
+            stats = self.get_cached(user_id, start_date, end_date)
+            if stats is None:
+                # 先取版本再查询：查询期间有新的写入时，这份结果下次就会被视为过期
+                version = self.db.write_version(user_id)
+                stats = self.db.get_user_stats(user_id, start_date, end_date)
+                with self._lock:
+                    self._cache[(user_id, start_date or '', end_date or '')] = (version, stats)
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+        except Exception as e:
+            logger.error(f"加载统计信息失败: {e}")
+            if error_callback and ticket == self._latest:
+                error_callback(e)
+            return
+        if ticket == self._latest:
+            callback(stats)
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        """清除指定用户（默认全部用户）的缓存统计"""
+        with self._lock:
+            for key in [key for key in self._cache if user_id is None or key[0] == user_id]:
+                del self._cache[key]
+
+    def close(self) -> None:
+        """停止后台线程，未开始的请求不再执行"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
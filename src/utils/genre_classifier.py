@@ -0,0 +1,80 @@
+import re
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 默认书籍类型体系：按顺序排列，书名同时命中多个类型时取靠前的类型
+DEFAULT_TAXONOMY: List[Tuple[str, List[str]]] = [
+    ('小说', ['小说', '故事', '文学', '长篇', '短篇']),
+    ('历史', ['历史', '传记', '自传', '回忆录']),
+    ('哲学', ['哲学', '思想', '智慧', '人生']),
+    ('科学', ['科学', '科普', '自然', '宇宙']),
+    ('技术', ['技术', '编程', '计算机', '软件']),
+    ('艺术', ['艺术', '设计', '音乐', '绘画']),
+]
+OTHER_GENRE = '其他'
+
+
+def load_taxonomy(path: str) -> List[Tuple[str, List[str]]]:
+    """从JSON文件读取类型体系：{"类型": ["关键词", ...], ...}，类型的先后顺序即优先级"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not all(isinstance(keywords, list) for keywords in data.values()):
+        raise ValueError(f"类型体系文件格式错误，应为 {{类型: [关键词, ...]}}: {path}")
+    return [(genre, [str(keyword) for keyword in keywords]) for genre, keywords in data.items()]
+
+
+class GenreClassifier:
+    """书籍类型分类器：把整个类型体系的关键词编译为一个正则，每段文本只扫描一遍
+
+    书名命中关键词时取优先级最高的类型；书名没有命中时按书评中命中次数最多的类型归类
+    （次数相同取优先级高的）；都没有命中时归为"其他"。
+    """
+
+    def __init__(self, taxonomy: Optional[Sequence[Tuple[str, Sequence[str]]]] = None):
+        self.taxonomy = list(taxonomy if taxonomy is not None else DEFAULT_TAXONOMY)
+        self.genres = [genre for genre, _ in self.taxonomy]
+        # 关键词 -> 所属类型的优先级序号；同一关键词出现在多个类型中时以靠前的为准
+        self._keyword_rank: Dict[str, int] = {}
+        for rank, (_, keywords) in enumerate(self.taxonomy):
+            for keyword in keywords:
+                if keyword:
+                    self._keyword_rank.setdefault(keyword.lower(), rank)
+        if self._keyword_rank:
+            # 长关键词在前，零宽前瞻使每个位置都尝试匹配，相互重叠的关键词也不会漏掉
+            alternatives = sorted(self._keyword_rank, key=len, reverse=True)
+            self._pattern = re.compile('(?=(' + '|'.join(map(re.escape, alternatives)) + '))')
+        else:
+            self._pattern = None
+
+    def _ranks(self, text: Optional[str]) -> List[int]:
+        """返回文本中命中的全部关键词对应的类型序号"""
+        if not text or self._pattern is None:
+            return []
+        keyword_rank = self._keyword_rank
+        return [keyword_rank[match.group(1)] for match in self._pattern.finditer(text.lower())]
+
+    def classify(self, title: Optional[str], review: Optional[str] = None) -> Optional[str]:
+        """根据书名和书评判断书籍类型，书名为空时返回 None"""
+        if not title:
+            return None
+        ranks = self._ranks(title)
+        if ranks:
+            return self.genres[min(ranks)]
+        ranks = self._ranks(review)
+        if ranks:
+            counts: Dict[int, int] = {}
+            for rank in ranks:
+                counts[rank] = counts.get(rank, 0) + 1
+            return self.genres[min(counts, key=lambda rank: (-counts[rank], rank))]
+        return OTHER_GENRE
+
+
+_default_classifier: Optional[GenreClassifier] = None
+
+
+def get_default_classifier() -> GenreClassifier:
+    """使用默认类型体系的共享分类器"""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = GenreClassifier()
+    return _default_classifier
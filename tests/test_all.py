@@ -5,6 +5,8 @@
 
 import os
 import sys
+import asyncio
+import tempfile
 from src.database.database import DoubanBookDB
 from src.exporter.html_exporter import HTMLExporter
 from src.exporter.csv_exporter import CSVExporter
@@ -155,9 +157,1318 @@ def test_crawler_import():
         print(f"   [FAIL] 爬虫模块测试失败: {e}")
         return False
 
+def test_async_database():
+    """测试异步数据库功能"""
+    print("6. 测试异步数据库功能...")
+    
+    try:
+        from src.database.async_database import AsyncDoubanBookDB
+        from src.utils.genre_classifier import GenreClassifier
+        
+        class FailingClassifier(GenreClassifier):
+            def classify(self, title, review=None):
+                raise ValueError("分类失败")
+        
+        class UnboundRating(str):
+            """写入书目之后、写入收藏时才出错的评分"""
+            def __conform__(self, protocol):
+                raise RuntimeError("评分无法写入")
+        
+        async def run():
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                db_path = os.path.join(tmp_dir, "async_test.db")
+                classifier = GenreClassifier([('异步', ['异步'])])
+                async with AsyncDoubanBookDB(db_path, genre_classifier=classifier) as db:
+                    written = await db.add_books([
+                        ("异步书籍1", "作者A", "2024-01", "https://book.douban.com/subject/1/",
+                         "5星", "很好", "2024-03-01", "async_user"),
+                        ("异步书籍2", "作者B", "2024-02", "https://book.douban.com/subject/2/",
+                         "3星", "", "2024-05-01", "async_user"),
+                    ])
+                    books = await db.get_books_by_user("async_user", has_review=True)
+                    genres = await db._fetchall('SELECT genre FROM user_books WHERE user_id = ?', ("async_user",))
+                    ranged = await db.get_books_by_date_range("async_user", "2024-01-01", "2024-12-31")
+                    stats = await db.get_user_stats("async_user", "2024-01-01", "2024-12-31")
+                    await db.log_crawl_session("async_user", None, None, 1, 2, 1)
+                # 写入出错时返回 0，不留下未提交的事务
+                async with AsyncDoubanBookDB(db_path, genre_classifier=FailingClassifier()) as db:
+                    failed = await db.add_books([
+                        ("失败书籍", "作者", "2024", "https://book.douban.com/subject/3/",
+                         "4星", "", "2024-06-01", "async_user"),
+                    ])
+                async with AsyncDoubanBookDB(db_path) as db:
+                    failed += await db.add_books([
+                        ("中途失败书籍", "作者", "2024", "https://book.douban.com/subject/4/",
+                         UnboundRating("4星"), "", "2024-06-01", "async_user"),
+                    ])
+                    # 下一次写入的提交不能带上失败写入已写入的书目
+                    await db.clear_user_books("other_user")
+                    after_failure = len(await db._fetchall('SELECT subject_id FROM book_catalog'))
+                return written, books, genres, ranged, stats, failed, after_failure
+        
+        written, books, genres, ranged, stats, failed, after_failure = asyncio.run(run())
+        sync_ranged = None
+        if written == 2 and len(books) == 1 and stats['total_books'] == 2 and stats['rating_stats'] == {'5星': 1, '3星': 1} \
+                and ('异步',) in genres and len(ranged) == 2 and failed == 0 and after_failure == 2:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                sync_db = DoubanBookDB(os.path.join(tmp_dir, "sync_test.db"))
+                sync_db.add_books([("同步书籍", "作者", "2024", "https://book.douban.com/subject/1/",
+                                    "5星", "", "2024-03-01", "sync_user")])
+                sync_ranged = sync_db.get_books_by_date_range("sync_user", "2024-01-01", "2024-12-31")
+        # 公开查询的列数与同步版本一致，类型只在 iter_books 中返回
+        if sync_ranged and len(sync_ranged[0]) == len(ranged[0]) == len(books[0]) == 9:
+            print("   [OK] 异步批量写入和查询成功，类型分类器可配置，写入失败时回滚")
+            return True
+        else:
+            print(f"   [FAIL] 异步数据库结果不符: {written}, {books}, {stats}, 失败写入 {failed}")
+            return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 异步数据库测试失败: {e}")
+        return False
+
+def test_db_maintenance():
+    """测试数据库维护功能"""
+    print("7. 测试数据库维护功能...")
+    
+    try:
+        from src.database.maintenance import DatabaseMaintenance
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "maintain_test.db"))
+            db.add_books([
+                (f"维护书籍{i}", "作者", "2024", f"https://book.douban.com/subject/{i}/",
+                 "4星", "书评" * 100, "2024-01-01", "maintain_user")
+                for i in range(500)
+            ])
+            db.clear_user_books("maintain_user")
+            
+            report = DatabaseMaintenance(db).run()
+            file_report = report['files'][0]
+            vacuum = file_report['vacuum']
+            audit = report['index_audit']
+            
+            if vacuum['freelist_before'] > 0 and vacuum['freelist_after'] == 0:
+                print(f"   [OK] 增量空间回收成功: {file_report['size_before']} -> {file_report['size_after']} 字节")
+            else:
+                print(f"   [FAIL] 空间回收结果不符: {vacuum}")
+                return False
+            
+            # 审计的语句来自 database.py 的查询常量，全部应能分析且不出现全表扫描或临时排序
+            if 'idx_user_books_user_id_created_at' in audit['used'] and not audit['unused'] \
+                    and not audit['warnings']:
+                print(f"   [OK] 索引审计完成，使用的索引: {', '.join(audit['used'])}")
+                return True
+            else:
+                print(f"   [FAIL] 索引审计结果不符: {audit}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 数据库维护测试失败: {e}")
+        return False
+
+def test_sharded_database():
+    """测试分片存储模式"""
+    print("8. 测试分片存储模式...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "catalog.db"), shard_dir=os.path.join(tmp_dir, "shards"))
+            for user in ["shard_a", "shard_b"]:
+                db.add_books([
+                    (f"{user}书籍{i}", "作者", "2024", f"https://book.douban.com/subject/{i}/",
+                     "5星", "书评" if i % 2 else "", "2024-01-01", user)
+                    for i in range(10)
+                ])
+            
+            shard_files = sorted(os.listdir(os.path.join(tmp_dir, "shards")))
+            global_stats = db.get_global_stats()
+            if len(shard_files) == 2 and global_stats['total_books'] == 20 and global_stats['total_users'] == 2:
+                print(f"   [OK] 每个用户独立分片，跨分片统计正确: {shard_files}")
+            else:
+                print(f"   [FAIL] 分片结果不符: {shard_files}, {global_stats}")
+                return False
+            
+            archived = db.archive_user("shard_a", os.path.join(tmp_dir, "archive"))
+            stats = db.get_user_stats("shard_a")
+            if archived and os.path.exists(archived) and stats['total_books'] == 0 \
+                    and db.get_global_stats()['total_books'] == 10:
+                print("   [OK] 用户分片归档成功")
+                return True
+            else:
+                print(f"   [FAIL] 用户分片归档失败: {archived}, {stats}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 分片存储测试失败: {e}")
+        return False
+
+def test_dataset_generator():
+    """测试合成数据生成器"""
+    print("9. 测试合成数据生成器...")
+    
+    try:
+        from benchmarks.generate_dataset import generate_rows, populate
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "bench_test.db"))
+            total = populate(db, generate_rows(users=3, books_per_user=200, seed=1), batch_size=150)
+            stats = db.get_user_stats("bench_user_00001")
+            
+            if total == 600 and stats['total_books'] == 200 and 0 < stats['books_with_reviews'] < 200:
+                print(f"   [OK] 生成 {total} 条记录，评分分布: {stats['rating_stats']}")
+                return True
+            else:
+                print(f"   [FAIL] 生成结果不符: {total}, {stats}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 合成数据生成测试失败: {e}")
+        return False
+
+def test_schema_migration():
+    """测试旧版books表迁移及跨用户收藏同一本书"""
+    print("10. 测试书目与用户收藏拆分...")
+    
+    try:
+        import sqlite3
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "legacy.db")
+            conn = sqlite3.connect(db_path)
+            conn.execute('''
+                CREATE TABLE books (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    author TEXT,
+                    publish_date TEXT,
+                    douban_url TEXT UNIQUE,
+                    rating TEXT,
+                    review_content TEXT,
+                    review_date TEXT,
+                    user_id TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.execute('''
+                INSERT INTO books (title, author, publish_date, douban_url, rating, review_content, review_date, user_id)
+                VALUES ('旧书', '旧作者', '2001', 'https://book.douban.com/subject/1/', '4星', '旧书评', '2020-01-01', 'old_user')
+            ''')
+            # 没有用户ID的旧记录迁移到占位用户名下，不会丢失
+            conn.execute('''
+                INSERT INTO books (title, author, publish_date, douban_url, rating, review_content, review_date, user_id)
+                VALUES ('无主旧书', '作者', '1999', 'https://book.douban.com/subject/2/', '3星', '', '2019-01-01', NULL)
+            ''')
+            # 没有链接的旧记录各自保留一条书目，书名和作者不会互相覆盖
+            conn.execute('''
+                INSERT INTO books (title, author, publish_date, douban_url, rating, review_content, review_date, user_id)
+                VALUES ('无链接旧书甲', '作者甲', '2002', NULL, '5星', '', '2020-02-01', 'old_user'),
+                       ('无链接旧书乙', '作者乙', '2003', '', '4星', '', '2020-03-01', 'old_user')
+            ''')
+            conn.commit()
+            conn.close()
+            
+            from src.database.database import LEGACY_USER_ID
+            db = DoubanBookDB(db_path)
+            migrated = {book[0]: book for book in db.get_books_by_user("old_user")}
+            orphans = db.get_books_by_user(LEGACY_USER_ID)
+            if len(migrated) == 3 and migrated['旧书'][5] == '旧书评' \
+                    and migrated['无链接旧书甲'][1] == '作者甲' and migrated['无链接旧书乙'][1] == '作者乙' \
+                    and [book[0] for book in orphans] == ['无主旧书']:
+                print("   [OK] 旧版books表已迁移，兼容视图可正常查询")
+            else:
+                print(f"   [FAIL] 旧数据迁移结果不符: {migrated}")
+                return False
+            
+            db.add_book("旧书", "旧作者", "2001", "https://book.douban.com/subject/1/",
+                        "2星", "", "2021-01-01", "new_user")
+            old_books = {book[0]: book for book in db.get_books_by_user("old_user")}
+            new_books = db.get_books_by_user("new_user")
+            if old_books['旧书'][4] == '4星' and new_books[0][4] == '2星' \
+                    and db.get_global_stats()['total_books'] == 5:
+                print("   [OK] 不同用户收藏同一本书互不覆盖")
+                return True
+            else:
+                print(f"   [FAIL] 跨用户收藏结果不符: {old_books}, {new_books}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 书目拆分测试失败: {e}")
+        return False
+
+def test_streaming_html_export():
+    """测试HTML流式导出"""
+    print("11. 测试HTML流式导出...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "stream_test.db"))
+            db.add_books([
+                (f"流式书籍{i}", f"作者{i % 7}", "2024", f"https://book.douban.com/subject/{i}/",
+                 f"{i % 5 + 1}星", f"书评<{i}>" if i % 3 else "", f"20{10 + i % 10}-01-01", "stream_user")
+                for i in range(1200)
+            ])
+            
+            streamed = list(db.iter_books("stream_user", batch_size=100))
+            if [row[:9] for row in streamed] != db.get_books_by_user("stream_user"):
+                print("   [FAIL] 游标分批读取结果与一次性读取不一致")
+                return False
+            
+            output_file = os.path.join(tmp_dir, "stream.html")
+            success = HTMLExporter().export_user_books(db, "stream_user", output_file)
+            with open(output_file, encoding='utf-8') as f:
+                html = f.read()
+            
+            if success and html.count('class="book-item"') == 1200 and '书评&lt;1&gt;' in html \
+                    and html.rstrip().endswith('</html>') and not os.path.exists(output_file + '.part'):
+                print(f"   [OK] 流式导出 1200 本书，文件大小: {len(html.encode('utf-8'))} 字节")
+                return True
+            else:
+                print("   [FAIL] 流式导出内容不完整")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] HTML流式导出测试失败: {e}")
+        return False
+
+def test_report_stats():
+    """测试单遍统计聚合器"""
+    print("12. 测试单遍统计聚合器...")
+    
+    try:
+        from src.exporter.report_stats import ReportStats, rating_value
+        
+        books = [
+            {'title': f"历史故事{i}" if i % 4 else f"编程{i}", 'author': f"作者{i % 5}",
+             'rating': ['5星', '4星', '9.1分', '未评分', None][i % 5], 'review_content': '书评' if i % 2 else '',
+             'review_date': ['2023-05-01', '2024年1月2日', '2022/03/04', '未知日期'][i % 4],
+             'douban_url': f"https://book.douban.com/subject/{i}/"}
+            for i in range(200)
+        ]
+        stats = ReportStats().consume(iter(books))
+        
+        rated = [b for b in books if b['rating'] and b['rating'] != '未评分']
+        expected_top = [b['title'] for b in sorted(rated, key=lambda b: rating_value(b['rating']), reverse=True)[:10]]
+        if [b['title'] for b in stats.top_books()] != expected_top:
+            print(f"   [FAIL] TOP10 与完整排序结果不一致: {stats.top_books()}")
+            return False
+        
+        if stats.total_books == 200 and stats.books_with_reviews == 100 \
+                and stats.yearly_counts == {2023: 50, 2024: 50, 2022: 50} \
+                and stats.genre_counts == {'技术': 50, '小说': 150} \
+                and stats.rating_counts == {'5星': 40, '4星': 40, '9.1分': 40, '未评分': 40}:
+            print(f"   [OK] 单遍统计完成，最喜欢的作者: {stats.favorite_authors()}")
+            return True
+        else:
+            print(f"   [FAIL] 统计结果不符: {vars(stats)}")
+            return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 统计聚合器测试失败: {e}")
+        return False
+
+def test_compact_html_export():
+    """测试紧凑HTML导出"""
+    print("13. 测试紧凑HTML导出...")
+    
+    try:
+        import re
+        import json
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "compact_test.db"))
+            db.add_books([
+                (f"紧凑书籍{i}", f"作者{i % 7}", "2024", f"https://book.douban.com/subject/{i}/",
+                 f"{i % 5 + 1}星", f"书评</script>{i}" if i % 3 else "", "2024-01-01", "compact_user")
+                for i in range(2000)
+            ])
+            
+            standard_file = os.path.join(tmp_dir, "standard.html")
+            compact_file = os.path.join(tmp_dir, "compact.html")
+            HTMLExporter().export_user_books(db, "compact_user", standard_file)
+            success = HTMLExporter(compact=True).export_user_books(db, "compact_user", compact_file)
+            
+            with open(compact_file, encoding='utf-8') as f:
+                html = f.read()
+            data = json.loads(re.search(r'id="bookData">(.*?)</script>', html, re.S).group(1))
+            ratio = os.path.getsize(standard_file) / os.path.getsize(compact_file)
+            
+            if success and len(data['rows']) == 2000 and '书评</script>' not in html \
+                    and 'class="book-item" data-rating' not in html and ratio > 5:
+                print(f"   [OK] 紧凑导出 {len(data['rows'])} 本书，文件大小为标准模式的 1/{ratio:.1f}")
+                return True
+            else:
+                print(f"   [FAIL] 紧凑导出结果不符: rows={len(data['rows'])}, ratio={ratio:.1f}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 紧凑HTML导出测试失败: {e}")
+        return False
+
+def test_search_index():
+    """测试HTML搜索索引"""
+    print("14. 测试HTML搜索索引...")
+    
+    try:
+        import re
+        import json
+        import itertools
+        from src.exporter.search_index import SearchIndexBuilder, tokenize
+        
+        if tokenize("百年孤独 Go") != {'百年', '年孤', '孤独', 'go'}:
+            print(f"   [FAIL] 分词结果不符: {tokenize('百年孤独 Go')}")
+            return False
+        
+        builder = SearchIndexBuilder()
+        builder.add(0, "百年孤独", "马尔克斯", "")
+        builder.add(3, "孤独六讲", "蒋勋", "关于孤独")
+        index = json.loads(builder.to_json())
+        if index['tokens']['孤独'] != [0, 3] or index['size'] != 4:
+            print(f"   [FAIL] 倒排表不符: {index}")
+            return False
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "index_test.db"))
+            db.add_books([
+                (f"索引书籍{i}", "作者", "2024", f"https://book.douban.com/subject/{i}/",
+                 "4星", "书评</script>", "2024-01-01", "index_user")
+                for i in range(50)
+            ])
+            output_file = os.path.join(tmp_dir, "index.html")
+            success = HTMLExporter(compact=True, search_index=True).export_user_books(db, "index_user", output_file)
+            with open(output_file, encoding='utf-8') as f:
+                html = f.read()
+            data = json.loads(re.search(r'id="searchIndex">(.*?)</script>', html, re.S).group(1))
+            
+            # 标准页面：只出现在出版日期中的关键字也要能通过索引找到，与逐本比对的字段一致
+            db.add_books([
+                ("元数据书籍", "作者", "1987", "https://book.douban.com/subject/900/",
+                 "5星", "", "2023-06-01", "meta_user"),
+                ("另一本书", "作者", "2001", "https://book.douban.com/subject/901/",
+                 "4星", "", "2023-06-02", "meta_user"),
+            ])
+            standard_file = os.path.join(tmp_dir, "standard.html")
+            HTMLExporter(search_index=True).export_user_books(db, "meta_user", standard_file)
+            with open(standard_file, encoding='utf-8') as f:
+                standard_html = f.read()
+            standard_index = json.loads(re.search(r'id="searchIndex">(.*?)</script>', standard_html, re.S).group(1))
+            postings = [set(itertools.accumulate(standard_index['tokens'].get(token, [])))
+                        for token in tokenize("1987")]
+            candidates = set.intersection(*postings)
+            # 页面脚本只比对 meta-value 等字段内容，"出版"之类的标签文字不参与搜索
+            fields = re.findall(r'class="(?:meta-value|review-text)">([^<]*)<', standard_html)
+            metadata_ok = len(candidates) == 1 and '1987' in fields and not any('出版' in field for field in fields) \
+                and '出' not in standard_index['tokens']
+            
+            if success and data['size'] == 50 and len(data['tokens']['索引']) == 50 \
+                    and 'function searchCandidates' in html and metadata_ok:
+                print(f"   [OK] 搜索索引已嵌入，共 {len(data['tokens'])} 个词条，出版和评分日期可搜索")
+                return True
+            else:
+                print(f"   [FAIL] 搜索索引导出结果不符: 出版日期候选 {candidates}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 搜索索引测试失败: {e}")
+        return False
+
+def test_site_export():
+    """测试多页面静态网站导出"""
+    print("15. 测试多页面静态网站导出...")
+    
+    try:
+        import re
+        import src.exporter.site_exporter as site_exporter
+        from src.exporter.site_exporter import SiteExporter
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "site_test.db"))
+            db.add_books([
+                (f"网站书籍{i}", "作者", "2024", f"https://book.douban.com/subject/{i}/",
+                 "4星", "书评", f"{2020 + i % 3}-01-01", "site_user")
+                for i in range(90)
+            ])
+            site_dir = os.path.join(tmp_dir, "site")
+            exporter = SiteExporter(workers=2)
+            exporter.export_user_books(db, "site_user", site_dir)
+            pages = sorted(name for name in os.listdir(site_dir) if name.startswith('year_'))
+            if pages != ['year_2020.html', 'year_2021.html', 'year_2022.html'] \
+                    or not os.path.exists(os.path.join(site_dir, 'assets', 'style.css')):
+                print(f"   [FAIL] 网站页面不符: {pages}")
+                return False
+            
+            mtimes = {name: os.stat(os.path.join(site_dir, name)).st_mtime_ns for name in pages}
+            db.add_book("新书", "作者", "2024", "https://book.douban.com/subject/999/",
+                        "4星", "", "2021-06-01", "site_user")
+            exporter.export_user_books(db, "site_user", site_dir)
+            changed = [name for name in pages if os.stat(os.path.join(site_dir, name)).st_mtime_ns != mtimes[name]]
+            with open(os.path.join(site_dir, 'year_2021.html'), encoding='utf-8') as f:
+                html = f.read()
+
+            # 书籍HTML的渲染版本变化后，书籍未变的页面也要重写，与新的 app.js 保持一致
+            mtimes = {name: os.stat(os.path.join(site_dir, name)).st_mtime_ns for name in pages}
+            site_exporter.RENDER_VERSION += 1
+            try:
+                exporter.export_user_books(db, "site_user", site_dir)
+            finally:
+                site_exporter.RENDER_VERSION -= 1
+            rerendered = [name for name in pages
+                          if os.stat(os.path.join(site_dir, name)).st_mtime_ns != mtimes[name]]
+
+            # 按 page_size 分页：同一批写入的书籍收录时间相同，各页之间不能重复或遗漏
+            paged_dir = os.path.join(tmp_dir, "paged")
+            SiteExporter(page_size=7, workers=2).export_user_books(db, "site_user", paged_dir)
+            titles = []
+            for name in os.listdir(paged_dir):
+                if name.startswith('year_'):
+                    with open(os.path.join(paged_dir, name), encoding='utf-8') as f:
+                        titles += re.findall(r'target="_blank">([^<]*)</a>', f.read())
+            paging_ok = len(titles) == 91 and len(set(titles)) == 91
+
+            if changed == ['year_2021.html'] and html.count('class="book-item"') == 31 \
+                    and rerendered == pages and paging_ok:
+                print("   [OK] 按年份生成页面，重新导出只重写有变化的页面")
+                return True
+            else:
+                print(f"   [FAIL] 增量重写结果不符: {changed}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 静态网站导出测试失败: {e}")
+        return False
+
+def test_incremental_export():
+    """测试导出片段缓存与增量导出"""
+    print("16. 测试增量导出...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "cache_test.db"))
+            db.add_books([
+                (f"缓存书籍{i}", "作者", "2024", f"https://book.douban.com/subject/{i}/",
+                 "4星", "书评", "2024-01-01", "cache_user")
+                for i in range(50)
+            ])
+            cache_dir = os.path.join(tmp_dir, "cache")
+            output_file = os.path.join(tmp_dir, "cache.html")
+            
+            if not HTMLExporter(cache_dir=cache_dir).export_user_books(db, "cache_user", output_file):
+                print("   [FAIL] 首次导出失败")
+                return False
+            mtime = os.stat(output_file).st_mtime_ns
+            
+            # 数据没有变化：跳过导出，文件不被重写
+            exporter = HTMLExporter(cache_dir=cache_dir)
+            if not exporter.export_user_books(db, "cache_user", output_file) \
+                    or os.stat(output_file).st_mtime_ns != mtime:
+                print("   [FAIL] 数据未变化时没有跳过导出")
+                return False
+            
+            # 修改一本书：只有这本书重新渲染
+            db.add_book("缓存书籍0", "作者", "2024", "https://book.douban.com/subject/0/",
+                        "5星", "新书评", "2024-01-01", "cache_user")
+            exporter = HTMLExporter(cache_dir=cache_dir)
+            exporter.export_user_books(db, "cache_user", output_file)
+            with open(output_file, encoding='utf-8') as f:
+                html = f.read()
+            if (exporter.cache.hits, exporter.cache.misses) != (49, 1) \
+                    or html.count('class="book-item"') != 50 or '新书评' not in html:
+                print(f"   [FAIL] 片段复用结果不符: 命中{exporter.cache.hits} 未命中{exporter.cache.misses}")
+                return False
+            
+            # CSV 导出：数据没有变化时同样跳过，修改后复用缓存行，结果与不使用缓存一致
+            csv_file = os.path.join(tmp_dir, "cache.csv")
+            plain_csv = os.path.join(tmp_dir, "plain.csv")
+            CSVExporter(cache_dir=cache_dir).export_user_books(db, "cache_user", csv_file)
+            csv_mtime = os.stat(csv_file).st_mtime_ns
+            skipped_csv = CSVExporter(cache_dir=cache_dir)
+            skipped_csv.export_user_books(db, "cache_user", csv_file)
+            csv_skipped = os.stat(csv_file).st_mtime_ns == csv_mtime and skipped_csv.cache.misses == 0
+            db.add_book("缓存书籍1", "作者", "2024", "https://book.douban.com/subject/1/",
+                        "3星", "再次修改", "2024-01-01", "cache_user")
+            csv_exporter = CSVExporter(cache_dir=cache_dir)
+            csv_exporter.export_user_books(db, "cache_user", csv_file)
+            CSVExporter().export_user_books(db, "cache_user", plain_csv)
+            with open(csv_file, 'rb') as f1, open(plain_csv, 'rb') as f2:
+                same_csv = f1.read() == f2.read()
+            
+            if csv_skipped and same_csv and csv_exporter.cache.misses == 1:
+                print("   [OK] 数据未变化时跳过导出，修改后只重新渲染变化的书籍")
+                return True
+            else:
+                print(f"   [FAIL] CSV缓存导出结果不符: 跳过 {csv_skipped}，一致 {same_csv}，未命中 {csv_exporter.cache.misses}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 增量导出测试失败: {e}")
+        return False
+
+def test_streaming_csv_export():
+    """测试流式CSV导出：gzip压缩、列选择和多用户导出"""
+    print("17. 测试流式CSV导出...")
+    
+    try:
+        import csv
+        import gzip
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "csv_test.db"))
+            for user_id in ("csv_user_a", "csv_user_b"):
+                db.add_books([
+                    (f"CSV书籍{i}", "作者", "2024", f"https://book.douban.com/subject/{i}/",
+                     f"{i % 5 + 1}星", "书评, 含逗号" if i % 2 else "", "2024-01-01", user_id)
+                    for i in range(25)
+                ])
+            
+            # 分块写入与一次性读取的结果一致
+            exporter = CSVExporter(chunk_size=7)
+            plain_file = os.path.join(tmp_dir, "plain.csv")
+            exporter.export_user_books(db, "csv_user_a", plain_file)
+            with open(plain_file, encoding='utf-8-sig', newline='') as f:
+                rows = list(csv.reader(f))
+            expected = [[value or '' for value in book[:9]] for book in db.get_books_by_user("csv_user_a")]
+            if rows[0] != exporter.headers or rows[1:] != expected:
+                print("   [FAIL] 分块写入的CSV内容不符")
+                return False
+            
+            # 按评分导出
+            rating_file = os.path.join(tmp_dir, "rating.csv")
+            if not exporter.export_books_by_rating(db, "csv_user_a", "5星", rating_file):
+                print("   [FAIL] 按评分导出失败")
+                return False
+            
+            # 多用户导出到gzip文件，只包含选择的列
+            dump_file = os.path.join(tmp_dir, "dump.csv.gz")
+            count = CSVExporter(columns=['user_id', 'title', 'rating']).export_all_users(db, dump_file)
+            with gzip.open(dump_file, 'rt', encoding='utf-8-sig', newline='') as f:
+                dump_rows = list(csv.reader(f))
+            users = {row[0] for row in dump_rows[1:]}
+            
+            if count == 50 and dump_rows[0] == ['用户ID', '书名', '评分'] \
+                    and users == {"csv_user_a", "csv_user_b"} and len(dump_rows) == 51:
+                print("   [OK] 分块写入、gzip压缩、列选择和多用户导出正常")
+                return True
+            else:
+                print(f"   [FAIL] 多用户导出结果不符: {count} 行")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 流式CSV导出测试失败: {e}")
+        return False
+
+def test_parquet_export():
+    """测试Parquet/Arrow列式导出"""
+    print("18. 测试Parquet列式导出...")
+    
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        import pyarrow.feather as feather
+        from src.exporter.parquet_exporter import ParquetExporter
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "parquet_test.db"))
+            for user_id in ("pq_user_a", "pq_user_b"):
+                db.add_books([
+                    (f"列式书籍{i}", "作者", "2024", f"https://book.douban.com/subject/{i}/",
+                     "未评分" if i == 0 else f"{i % 5 + 1}星", "书评" if i % 2 else "",
+                     "未知日期" if i == 0 else f"2023年{i % 12 + 1}月1日", user_id)
+                    for i in range(30)
+                ])
+            
+            parquet_file = os.path.join(tmp_dir, "books.parquet")
+            count = ParquetExporter(row_group_size=20).export_all_users(db, parquet_file)
+            parquet = pq.ParquetFile(parquet_file)
+            table = parquet.read()
+            if count != 60 or parquet.metadata.num_row_groups != 3:
+                print(f"   [FAIL] 行数或行组数不符: {count}, {parquet.metadata.num_row_groups}")
+                return False
+            
+            books = {(row['user_id'], row['subject_id']): row for row in table.to_pylist()}
+            first, third = books[("pq_user_a", "0")], books[("pq_user_a", "3")]
+            if first['rating_value'] is not None or first['review_date'] is not None \
+                    or third['rating_value'] != 4.0 or str(third['review_date']) != '2023-04-01' \
+                    or not third['has_review'] or not pa.types.is_timestamp(table.schema.field('created_at').type):
+                print(f"   [FAIL] 类型转换结果不符: {third}")
+                return False
+            
+            feather_file = os.path.join(tmp_dir, "books.feather")
+            ParquetExporter().export_user_books(db, "pq_user_b", feather_file)
+            if feather.read_table(feather_file).num_rows == 30:
+                print("   [OK] Parquet按行组写入带类型列，Arrow IPC导出正常")
+                return True
+            else:
+                print("   [FAIL] Arrow IPC导出结果不符")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] Parquet导出测试失败: {e}")
+        return False
+
+def test_ndjson_transfer():
+    """测试NDJSON导出与批量导入"""
+    print("19. 测试NDJSON导出与导入...")
+    
+    try:
+        from src.exporter.ndjson_exporter import NDJSONExporter, NDJSONImporter
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = DoubanBookDB(os.path.join(tmp_dir, "ndjson_source.db"))
+            for user_id in ("nd_user_a", "nd_user_b"):
+                source.add_books([
+                    (f"交换书籍{i}", "作者", "2024", f"https://book.douban.com/subject/{i}/",
+                     f"{i % 5 + 1}星", "书评\n多行" if i % 2 else "", "2024-01-01", user_id)
+                    for i in range(40)
+                ])
+            
+            dump_file = os.path.join(tmp_dir, "books.ndjson.gz")
+            if NDJSONExporter(chunk_size=15).export_all_users(source, dump_file) != 80:
+                print("   [FAIL] NDJSON导出行数不符")
+                return False
+            
+            # 追加无效数据，导入时应跳过：非JSON行、缺少书名的行，以及能解析但写不进数据库的行
+            # （最后一行与有效记录同批写入，整批失败后逐行重试，其余记录不受影响）
+            import gzip
+            with gzip.open(dump_file, 'at', encoding='utf-8') as f:
+                f.write('not json\n')
+                f.write('{"title": null, "douban_url": "https://book.douban.com/subject/900/", "user_id": "nd_user_a"}\n')
+                f.write('{"title": ["无法写入"], "douban_url": "https://book.douban.com/subject/901/", "user_id": "nd_user_a"}\n')
+            
+            target = DoubanBookDB(os.path.join(tmp_dir, "ndjson_target.db"))
+            result = NDJSONImporter(batch_size=25).import_file(target, dump_file)
+            # 重复导入不产生重复记录
+            NDJSONImporter().import_file(target, dump_file)
+            
+            same = all(
+                sorted(book[:7] for book in source.get_books_by_user(user_id))
+                == sorted(book[:7] for book in target.get_books_by_user(user_id))
+                for user_id in ("nd_user_a", "nd_user_b")
+            )
+            if result['imported'] == 80 and result['skipped'] == 3 and same \
+                    and target.get_global_stats()['total_books'] == 80:
+                print(f"   [OK] NDJSON导出导入一致，吞吐量 {result['rows_per_second']:.0f} 本/秒")
+                return True
+            else:
+                print(f"   [FAIL] 导入结果不符: {result}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] NDJSON导出导入测试失败: {e}")
+        return False
+
+def test_excel_export():
+    """测试只写模式的Excel导出"""
+    print("20. 测试Excel导出...")
+    
+    try:
+        from openpyxl import load_workbook
+        from src.exporter.excel_exporter import ExcelExporter
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "excel_test.db"))
+            db.add_books([
+                (f"表格书籍{i}", "作者", "2024", f"https://book.douban.com/subject/{i}/",
+                 f"{i % 5 + 1}星", "书评\x01含控制字符" if i == 0 else "书评",
+                 "未知日期" if i == 1 else f"{2021 + i % 3}-03-01", "excel_user")
+                for i in range(45)
+            ])
+            
+            year_file = os.path.join(tmp_dir, "by_year.xlsx")
+            rating_file = os.path.join(tmp_dir, "by_rating.xlsx")
+            if not ExcelExporter().export_user_books(db, "excel_user", year_file) \
+                    or not ExcelExporter('rating').export_user_books(db, "excel_user", rating_file):
+                print("   [FAIL] Excel导出失败")
+                return False
+            
+            wb = load_workbook(year_file, read_only=True)
+            year_sheets = wb.sheetnames
+            rows = sum(sum(1 for _ in wb[name].iter_rows(min_row=2)) for name in year_sheets[1:])
+            stats = dict(row[:2] for row in wb['统计'].iter_rows(max_row=3, values_only=True))
+            rating_sheets = load_workbook(rating_file, read_only=True).sheetnames
+            
+            if year_sheets == ['统计', '2023年', '2022年', '2021年', '未知年份'] and rows == 45 \
+                    and stats['总书籍数'] == 45 and rating_sheets == ['统计', '5星', '4星', '3星', '2星', '1星']:
+                print("   [OK] 按年份和评分分表导出，统计表正确")
+                return True
+            else:
+                print(f"   [FAIL] 工作表不符: {year_sheets}, {rating_sheets}, {rows}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] Excel导出测试失败: {e}")
+        return False
+
+def test_batch_export():
+    """测试多用户并行批量导出与只读数据库连接"""
+    print("21. 测试多用户批量导出...")
+    
+    try:
+        import json
+        from src.exporter.batch_exporter import BatchExporter, SUMMARY_FILE
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "batch_catalog.db"),
+                              shard_dir=os.path.join(tmp_dir, "shards"))
+            for user_id in ("batch_a", "batch_b", "batch_c"):
+                db.add_books([
+                    (f"批量书籍{i}", "作者", "2024", f"https://book.douban.com/subject/{i}/",
+                     "4星", "书评", "2024-01-01", user_id)
+                    for i in range(20)
+                ])
+            
+            # 只读实例可以查询，但不能写入
+            readonly_db = DoubanBookDB(db.db_path, shard_dir=db.shard_dir, readonly=True)
+            if len(readonly_db.get_books_by_user("batch_a")) != 20 \
+                    or readonly_db.add_book("新书", "作者", "2024", "https://book.douban.com/subject/99/",
+                                            "5星", "", "2024-01-01", "batch_a"):
+                print("   [FAIL] 只读数据库行为不符")
+                return False
+            
+            progress = []
+            output_dir = os.path.join(tmp_dir, "out")
+            summary = BatchExporter(['html', 'csv'], workers=2).export_users(
+                db, output_dir, progress_callback=lambda done, total, result: progress.append((done, total)))
+            with open(os.path.join(output_dir, SUMMARY_FILE), encoding='utf-8') as f:
+                saved = json.load(f)
+            files = sorted(name for name in os.listdir(output_dir) if name != SUMMARY_FILE)
+            
+            if summary['succeeded'] == 6 and len(files) == 6 and progress[-1] == (6, 6) \
+                    and saved['by_format']['html']['tasks'] == 3 and saved['wall_seconds'] > 0:
+                print("   [OK] 3个用户×2种格式并行导出完成，耗时汇总已写入")
+                return True
+            else:
+                print(f"   [FAIL] 批量导出结果不符: {summary['succeeded']}, {files}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 批量导出测试失败: {e}")
+        return False
+
+def test_genre_classifier():
+    """测试编译后的类型分类器及类型写入数据库"""
+    print("22. 测试书籍类型分类...")
+    
+    try:
+        import json
+        import sqlite3
+        from src.utils.genre_classifier import GenreClassifier, load_taxonomy
+        
+        classifier = GenreClassifier()
+        cases = [
+            (("历史故事", None), '小说'),        # 书名命中多个类型时取靠前的类型
+            (("人类简史", "讲宇宙和自然的科普书，也谈历史"), '科学'),  # 书名未命中时按书评命中次数
+            (("无题", "没有关键词"), '其他'),
+            (("", "小说"), None),
+        ]
+        for (title, review), expected in cases:
+            if classifier.classify(title, review) != expected:
+                print(f"   [FAIL] 分类结果不符: {title} -> {classifier.classify(title, review)}")
+                return False
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # 旧结构的 user_books 没有类型列，打开时自动补列并计算已有书籍的类型
+            db_path = os.path.join(tmp_dir, "genre_test.db")
+            conn = sqlite3.connect(db_path)
+            conn.executescript('''
+                CREATE TABLE book_catalog (subject_id TEXT PRIMARY KEY, douban_url TEXT, title TEXT NOT NULL,
+                    author TEXT, publish_date TEXT, metadata TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+                CREATE TABLE user_books (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL,
+                    subject_id TEXT NOT NULL, rating TEXT, review_content TEXT, review_date TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (user_id, subject_id));
+                CREATE VIEW books AS SELECT ub.id, c.title, c.author, c.publish_date, c.douban_url, ub.rating,
+                    ub.review_content, ub.review_date, ub.user_id, ub.created_at, ub.updated_at, ub.subject_id
+                    FROM user_books ub LEFT JOIN book_catalog c ON c.subject_id = ub.subject_id;
+                INSERT INTO book_catalog (subject_id, douban_url, title) VALUES ('1', 'https://book.douban.com/subject/1/', 'Python编程');
+                INSERT INTO user_books (user_id, subject_id, rating) VALUES ('genre_user', '1', '5星');
+            ''')
+            conn.commit()
+            conn.close()
+            
+            db = DoubanBookDB(db_path)
+            db.add_book("百年孤独", "马尔克斯", "2011", "https://book.douban.com/subject/2/",
+                        "5星", "", "2024-01-01", "genre_user")
+            genres = {book[0]: book[9] for book in db.iter_books("genre_user")}
+            if genres != {'Python编程': '技术', '百年孤独': '其他'}:
+                print(f"   [FAIL] 数据库中的类型不符: {genres}")
+                return False
+            
+            # 自定义类型体系并重新分类
+            taxonomy_file = os.path.join(tmp_dir, "genres.json")
+            with open(taxonomy_file, 'w', encoding='utf-8') as f:
+                json.dump({'魔幻现实主义': ['孤独'], '编程': ['python']}, f, ensure_ascii=False)
+            db = DoubanBookDB(db_path, genre_classifier=GenreClassifier(load_taxonomy(taxonomy_file)))
+            updated = db.reclassify_genres()
+            genres = {book[0]: book[9] for book in db.iter_books("genre_user")}
+            
+            if updated == 2 and genres == {'Python编程': '编程', '百年孤独': '魔幻现实主义'}:
+                print("   [OK] 书名优先、书评补充分类，类型写入数据库并可按自定义体系重新分类")
+                return True
+            else:
+                print(f"   [FAIL] 重新分类结果不符: {updated}, {genres}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 书籍类型分类测试失败: {e}")
+        return False
+
+def test_report_charts():
+    """测试报告统计图表：后台渲染、按统计数据缓存、嵌入和链接两种方式"""
+    print("23. 测试报告统计图表...")
+    
+    try:
+        from src.exporter.chart_renderer import ChartRenderer, chart_data
+        from src.exporter.report_stats import ReportStats
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "chart_test.db"))
+            db.add_books([
+                (f"图表书籍{i}", "作者", "2020", f"https://book.douban.com/subject/{i}/",
+                 f"{i % 5 + 1}星", "书评", f"{2021 + i % 3}-{i % 12 + 1:02d}-01", "chart_user")
+                for i in range(60)
+            ])
+            cache_dir = os.path.join(tmp_dir, "cache")
+            
+            # 链接方式：图片写入页面旁的目录
+            link_file = os.path.join(tmp_dir, "link.html")
+            if not HTMLExporter(charts='link', cache_dir=cache_dir).export_user_books(db, "chart_user", link_file):
+                print("   [FAIL] 链接图表导出失败")
+                return False
+            charts_dir = os.path.join(tmp_dir, "link_charts")
+            with open(link_file, encoding='utf-8') as f:
+                html = f.read()
+            images = sorted(os.listdir(charts_dir))
+            if len(images) != 3 or any(f'link_charts/{name}' not in html for name in images):
+                print(f"   [FAIL] 链接图表不符: {images}")
+                return False
+            
+            # 统计数据没有变化：全部复用缓存，不再渲染
+            stats = ReportStats().consume(
+                dict(zip(['title', 'author', 'publish_date', 'douban_url', 'rating', 'review_content',
+                          'review_date'], row)) for row in db.iter_books("chart_user"))
+            renderer = ChartRenderer(os.path.join(cache_dir, 'charts'))
+            renderer.submit(stats).wait()
+            if (renderer.rendered, renderer.reused) != (0, 3) or len(chart_data(stats)['pace']['labels']) != 36:
+                print(f"   [FAIL] 图表缓存不符: 渲染{renderer.rendered} 复用{renderer.reused}")
+                return False
+            
+            # 嵌入方式；新增一本书后只有变化的图表重新渲染
+            db.add_book("新书", "作者", "2020", "https://book.douban.com/subject/new/",
+                        "5星", "", "2021-01-15", "chart_user")
+            embed_file = os.path.join(tmp_dir, "embed.html")
+            HTMLExporter(charts='embed', cache_dir=cache_dir).export_user_books(db, "chart_user", embed_file)
+            with open(embed_file, encoding='utf-8') as f:
+                html = f.read()
+            cached = os.listdir(os.path.join(cache_dir, 'charts'))
+            
+            if html.count('src="data:image/png;base64,') == 3 and len(cached) == 6:
+                print("   [OK] 图表在后台渲染并按统计数据缓存，支持嵌入和链接")
+                return True
+            else:
+                print(f"   [FAIL] 嵌入图表不符: 缓存{len(cached)}张")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 报告统计图表测试失败: {e}")
+        return False
+
+def test_export_benchmark():
+    """测试导出基准：子进程计时、峰值内存、输出大小和结果对比"""
+    print("24. 测试导出基准...")
+    
+    try:
+        from benchmarks.bench_export import compare_reports, run_benchmarks
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report = run_benchmarks([200], ['html', 'csv'], tmp_dir)
+            results = {result['exporter']: result for result in report['results']}
+            if set(results) != {'html', 'csv'} or any('error' in result or result['output_bytes'] <= 0
+                                                      for result in results.values()):
+                print(f"   [FAIL] 基准结果不符: {report['results']}")
+                return False
+            
+            # 第二次运行复用已生成的数据库，结果可与第一次对比
+            ratios = compare_reports(report, run_benchmarks([200], ['csv'], tmp_dir))
+            
+            if len(ratios) == 1 and ratios[0]['output_bytes'] == 1 and 'min' in ratios[0]:
+                print(f"   [OK] HTML导出200本耗时 {results['html']['min']:.3f} 秒，"
+                      f"输出 {results['html']['output_bytes']} 字节")
+                return True
+            else:
+                print(f"   [FAIL] 基准对比结果不符: {ratios}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 导出基准测试失败: {e}")
+        return False
+
+def test_split_export():
+    """测试一遍读取的拆分导出：每个评分或年份一个文件，与单独按评分导出的结果一致"""
+    print("25. 测试拆分导出...")
+    
+    try:
+        import re
+        import json
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "split_test.db"))
+            db.add_books([
+                (f"拆分书籍{i}", "作者", "2020", f"https://book.douban.com/subject/{i}/",
+                 f"{i % 3 + 3}星" if i % 10 else None, f"书评{i}" if i % 2 else "",
+                 f"{2022 + i % 2}-03-01", "split_user")
+                for i in range(40)
+            ])
+            
+            # HTML：每个评分一个页面，带完整统计，与按评分导出的页面相同（导出时间除外）
+            html_files = HTMLExporter().export_split(db, "split_user", os.path.join(tmp_dir, "html"))
+            rating_file = os.path.join(tmp_dir, "rating.html")
+            if list(html_files) != ['5星', '4星', '3星', '未评分'] \
+                    or not HTMLExporter().export_books_by_rating(db, "split_user", "4星", rating_file):
+                print(f"   [FAIL] HTML拆分结果不符: {list(html_files)}")
+                return False
+            strip_time = lambda path: re.sub(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}', '', open(path, encoding='utf-8').read())
+            if strip_time(html_files['4星']) != strip_time(rating_file) or '📅 年度阅读统计' not in strip_time(rating_file):
+                print("   [FAIL] 拆分导出的页面与按评分导出不一致")
+                return False
+            
+            # 紧凑模式：各组共用的评分表在正文写完后输出
+            compact_files = HTMLExporter(compact=True).export_split(db, "split_user", os.path.join(tmp_dir, "compact"))
+            with open(compact_files['3星'], encoding='utf-8') as f:
+                data = json.loads(re.search(r'id="bookData">(.*?)</script>', f.read(), re.S).group(1))
+
+            # 带搜索索引的拆分页面：出版日期也能通过索引找到，与页面逐本比对的字段一致
+            from src.exporter.search_index import tokenize
+            db.add_books([
+                ("拆分索引书籍", "作者", "1987", "https://book.douban.com/subject/950/",
+                 "5星", "", "2023-06-01", "split_index_user"),
+                ("另一本拆分书籍", "作者", "2001", "https://book.douban.com/subject/951/",
+                 "5星", "", "2023-06-02", "split_index_user"),
+            ])
+            index_files = HTMLExporter(search_index=True).export_split(db, "split_index_user",
+                                                                      os.path.join(tmp_dir, "index"))
+            with open(index_files['5星'], encoding='utf-8') as f:
+                split_index = json.loads(re.search(r'id="searchIndex">(.*?)</script>', f.read(), re.S).group(1))
+            if not all(token in split_index['tokens'] for token in tokenize("1987")):
+                print("   [FAIL] 拆分页面的搜索索引未包含出版日期")
+                return False
+
+            # CSV 按年份拆分
+            csv_files = CSVExporter().export_split(db, "split_user", os.path.join(tmp_dir, "csv"), group_by='year')
+            with open(csv_files['2023年'], encoding='utf-8-sig') as f:
+                csv_lines = f.read().splitlines()
+            
+            if {data['ratings'][row[4]] for row in data['rows']} == {'3星'} and len(data['rows']) == 12 \
+                    and list(csv_files) == ['2023年', '2022年'] and len(csv_lines) == 21:
+                print("   [OK] 一遍读取生成每个评分或年份的文件，结果与单独导出一致")
+                return True
+            else:
+                print(f"   [FAIL] 紧凑或CSV拆分结果不符: {len(data['rows'])}, {list(csv_files)}, {len(csv_lines)}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 拆分导出测试失败: {e}")
+        return False
+
+def test_precompressed_output():
+    """测试压缩导出：样式改为CSS类，压缩后的页面更小，预压缩文件解压后与页面一致"""
+    print("26. 测试压缩和预压缩导出...")
+    
+    try:
+        import gzip
+        import importlib.util
+        from src.exporter.site_exporter import SiteExporter
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "static_test.db"))
+            db.add_books([
+                (f"压缩书籍{i}", f"作者{i % 4}", "2020", f"https://book.douban.com/subject/{i}/",
+                 f"{i % 5 + 1}星", f"书评{i}" if i % 2 else "", f"{2020 + i % 3}-05-01", "static_user")
+                for i in range(30)
+            ])
+            
+            plain_file = os.path.join(tmp_dir, "plain.html")
+            minified_file = os.path.join(tmp_dir, "minified.html")
+            HTMLExporter().export_user_books(db, "static_user", plain_file)
+            if not HTMLExporter(minify=True, precompress=True).export_user_books(db, "static_user", minified_file):
+                print("   [FAIL] 压缩导出失败")
+                return False
+            with open(plain_file, encoding='utf-8') as f:
+                plain = f.read()
+            with open(minified_file, encoding='utf-8') as f:
+                minified = f.read()
+            if 'style="' in plain or len(minified) >= len(plain) * 0.8 or '压缩书籍29' not in minified:
+                print(f"   [FAIL] 页面仍有内联样式或压缩无效: {len(plain)} -> {len(minified)}")
+                return False
+            
+            with gzip.open(f"{minified_file}.gz", 'rt', encoding='utf-8') as f:
+                if f.read() != minified:
+                    print("   [FAIL] .gz 解压后与页面不一致")
+                    return False
+            # .br 只在安装了 brotli 时生成
+            has_brotli = importlib.util.find_spec('brotli') is not None
+            if os.path.exists(f"{minified_file}.br") != has_brotli:
+                print("   [FAIL] .br 文件与 brotli 安装情况不符")
+                return False
+            
+            # 静态网站：页面、样式表和脚本都有压缩文件
+            site_dir = os.path.join(tmp_dir, "site")
+            SiteExporter(minify=True, precompress=True).export_user_books(db, "static_user", site_dir)
+            expected = ['index.html', 'year_2021.html', os.path.join('assets', 'style.css'),
+                        os.path.join('assets', 'app.js')]
+            missing = [name for name in expected if not os.path.exists(os.path.join(site_dir, f"{name}.gz"))]
+            
+            # 修改时间精度较粗时，重新导出的页面可能不比旧压缩文件新：刚重写的文件仍要重新压缩
+            page_file = os.path.join(site_dir, 'year_2021.html')
+            for path in (f"{minified_file}.gz", f"{page_file}.gz"):
+                future = os.path.getmtime(path) + 60
+                os.utime(path, (future, future))
+            db.add_book("压缩书籍1", "作者1", "2020", "https://book.douban.com/subject/1/",
+                        "5星", "重新导出的书评", "2021-05-01", "static_user")
+            HTMLExporter(minify=True, precompress=True).export_user_books(db, "static_user", minified_file)
+            SiteExporter(minify=True, precompress=True).export_user_books(db, "static_user", site_dir)
+            stale = []
+            for path in (minified_file, page_file):
+                with open(path, encoding='utf-8') as f, gzip.open(f"{path}.gz", 'rt', encoding='utf-8') as gz:
+                    if gz.read() != f.read():
+                        stale.append(os.path.basename(path))
+            
+            if not missing and not stale:
+                print("   [OK] 导出页面已压缩，.gz/.br 预压缩文件与页面一致")
+                return True
+            else:
+                print(f"   [FAIL] 缺少预压缩文件: {missing}，压缩文件过期: {stale}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 压缩导出测试失败: {e}")
+        return False
+
+def test_gui_log_sink():
+    """测试GUI日志缓冲：多线程追加、级别过滤、容量上限，以及批量写入文本框后只保留最近的行"""
+    print("27. 测试GUI日志缓冲...")
+    
+    try:
+        import threading
+        import tkinter as tk
+        from src.gui.log_sink import GUI_LOG_FORMAT, LogBuffer, TkLogSink
+        from src.utils.logger import logger
+    except ImportError as e:
+        print(f"   [WARN] 缺少tkinter，跳过GUI日志缓冲测试: {e}")
+        return True
+    
+    try:
+        # 多个线程同时写入，缓冲区只保留最新的 capacity 行，并记录丢弃的条数
+        buffer = LogBuffer(capacity=500)
+        threads = [threading.Thread(target=lambda n=n: [buffer.append(f"{n}-{i}\n") for i in range(400)])
+                   for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        lines, dropped = buffer.drain()
+        if len(lines) != 500 or dropped != 1100 or buffer.drain() != ([], 0):
+            print(f"   [FAIL] 环形缓冲区结果不符: {len(lines)} 行, 丢弃 {dropped}")
+            return False
+        
+        # 作为 loguru 的输出目标，低于显示级别的日志不进入缓冲区
+        sink_id = logger.add(buffer.write, level='DEBUG', format=GUI_LOG_FORMAT)
+        try:
+            logger.debug("调试细节")
+            logger.info("新增书籍")
+            buffer.set_level('DEBUG')
+            logger.debug("第二条调试细节")
+        finally:
+            logger.remove(sink_id)
+        lines, _ = buffer.drain()
+        if len(lines) != 2 or '新增书籍' not in lines[0] or not lines[0].startswith('['):
+            print(f"   [FAIL] 日志级别过滤结果不符: {lines}")
+            return False
+        
+        try:
+            root = tk.Tk()
+        except tk.TclError:
+            print("   [OK] 日志缓冲区线程安全，级别过滤和容量上限正常")
+            print("   [WARN] 没有图形界面环境，跳过文本框刷新测试")
+            return True
+        try:
+            text = tk.Text(root)
+            sink = TkLogSink(root, text, max_lines=100)
+            for i in range(300):
+                sink.buffer.append(f"第{i}行\n")
+            sink.flush()
+            content = text.get('1.0', 'end-1c').splitlines()
+        finally:
+            root.destroy()
+        if len(content) <= 100 and content[-1] == '第299行':
+            print("   [OK] 日志批量写入文本框，只保留最近的行")
+            return True
+        else:
+            print(f"   [FAIL] 文本框保留 {len(content)} 行，最后一行: {content[-1]}")
+            return False
+        
+    except Exception as e:
+        print(f"   [FAIL] GUI日志缓冲测试失败: {e}")
+        return False
+
+def test_export_progress():
+    """测试导出进度：按阶段报告真实的行数，进度单调递增并在结束时达到100%，更新按时间节流"""
+    print("28. 测试导出进度回调...")
+    
+    try:
+        from src.exporter.progress import ExportProgress, format_progress
+        
+        # 节流：一次更新都来不及发出时，只报告阶段开始和结束
+        updates = []
+        progress = ExportProgress(updates.append, ['render'], min_interval=60)
+        consumed = sum(1 for _ in progress.track(range(10000), 'render', 10000))
+        if consumed != 10000 or [(info['done'], info['fraction']) for info in updates] != [(0, 0.0), (10000, 1.0)]:
+            print(f"   [FAIL] 进度节流结果不符: {updates}")
+            return False
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "progress_test.db"))
+            db.add_books([
+                (f"进度书籍{i}", "作者", "2020", f"https://book.douban.com/subject/{i}/",
+                 "4星", "", f"2021-0{i % 9 + 1}-01", "progress_user")
+                for i in range(120)
+            ])
+            
+            for exporter, name in [(HTMLExporter(), "progress.html"), (CSVExporter(), "progress.csv")]:
+                updates = []
+                if not exporter.export_user_books(db, "progress_user", os.path.join(tmp_dir, name),
+                                                  progress_callback=updates.append):
+                    print(f"   [FAIL] {name} 导出失败")
+                    return False
+                phases = [info['phase'] for info in updates]
+                fractions = [info['fraction'] for info in updates]
+                book_phases = [info for info in updates if info['phase'] in ('aggregate', 'render', 'write')
+                               and info['total'] == 120]
+                if phases[0] != 'query' or fractions != sorted(fractions) or fractions[-1] != 1.0 \
+                        or not book_phases or book_phases[-1]['done'] != 120:
+                    print(f"   [FAIL] {name} 进度不符: {[format_progress(info) for info in updates]}")
+                    return False
+        
+        print("   [OK] 导出器按阶段报告实际处理的行数，进度单调递增至100%")
+        return True
+        
+    except Exception as e:
+        print(f"   [FAIL] 导出进度测试失败: {e}")
+        return False
+
+def test_stats_loader():
+    """测试GUI统计的后台加载：结果按用户和日期范围缓存，写入新书籍后缓存失效"""
+    print("29. 测试后台统计加载与缓存...")
+    
+    try:
+        import threading
+        from src.gui.stats_loader import StatsLoader
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "stats_test.db"))
+            db.add_books([
+                (f"统计书籍{i}", "作者", "2020", f"https://book.douban.com/subject/{i}/",
+                 "5星", "书评" if i % 2 else "", f"2022-0{i % 9 + 1}-01", "stats_user")
+                for i in range(10)
+            ])
+            loader = StatsLoader(db)
+            try:
+                results = []
+                callback = lambda stats: results.append((threading.current_thread().name, stats['total_books']))
+                loader.load("stats_user", "", "", callback).result(timeout=10)
+                loader.load("stats_user", "2022-01-01", "2022-03-01", callback).result(timeout=10)
+                cached = loader.get_cached("stats_user", "", "")
+                
+                # 爬取写入新书籍后缓存失效，重新加载得到最新结果
+                db.add_book("新书", "作者", "2021", "https://book.douban.com/subject/999/",
+                            "4星", "", "2022-05-01", "stats_user")
+                stale = loader.get_cached("stats_user", "", "")
+                loader.load("stats_user", "", "", callback).result(timeout=10)
+            finally:
+                loader.close()
+            
+            if [total for _, total in results] == [10, 4, 11] and cached and cached['total_books'] == 10 \
+                    and stale is None and all(name.startswith('stats-loader') for name, _ in results):
+                print("   [OK] 统计在后台线程加载，按日期范围缓存，写入后自动失效")
+                return True
+            else:
+                print(f"   [FAIL] 统计加载结果不符: {results}, 缓存: {cached}, 写入后: {stale}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 后台统计加载测试失败: {e}")
+        return False
+
+def test_book_browser_paging():
+    """测试书籍浏览的键集分页：逐页读取不重不漏，筛选条件生效，爬取写入后新书籍出现在顶部"""
+    print("30. 测试书籍浏览分页...")
+    
+    try:
+        from src.gui.book_browser import BookPager, rating_options
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DoubanBookDB(os.path.join(tmp_dir, "browse_test.db"))
+            # 一次写入，全部书籍的收录时间相同，翻页只能依靠 id 区分
+            db.add_books([
+                (f"浏览书籍{i}", f"作者{i % 7}", "2020", f"https://book.douban.com/subject/{i}/",
+                 f"{i % 5 + 1}星", "书评" if i % 3 == 0 else "", f"2022-{i % 12 + 1:02d}-01", "browse_user")
+                for i in range(1000)
+            ])
+            
+            pager = BookPager(db, "browse_user", page_size=50, max_rows=200)
+            ids = [row[0] for row in pager.reset()]
+            while pager.has_older:
+                rows, _ = pager.load_older()
+                ids.extend(row[0] for row in rows)
+            window_bounded = len(pager.rows) == 200 and pager.has_newer
+            # 向上翻回最新一页
+            while pager.has_newer:
+                pager.load_newer()
+            back_to_head = pager.rows[0][0] == max(ids)
+            
+            filtered = BookPager(db, "browse_user", rating="5星", text="作者3",
+                                 start_date="2022-01-01", end_date="2022-06-01")
+            filtered_rows = filtered.reset()
+            filter_ok = filtered_rows and all(
+                row[4] == "5星" and "作者3" in row[2] and "2022-01-01" <= row[5] <= "2022-06-01"
+                for row in filtered_rows)
+            # 关键字中的 % 和 _ 按字面匹配
+            escaped_ok = db.browse_books("browse_user", text="书籍1_") == []
+            
+            # 评分选项来自用户实际存储的评分，包括"X分"和"未评分"
+            db.add_books([
+                ("十分制书籍", "作者", "2020", "https://book.douban.com/subject/3000/",
+                 "8分", "", "2022-01-01", "rating_user"),
+                ("未评分书籍", "作者", "2020", "https://book.douban.com/subject/3001/",
+                 "未评分", "", "2022-01-01", "rating_user"),
+            ])
+            options = rating_options(db.get_user_stats("rating_user")['rating_stats'])
+            options_ok = options[0] == '全部' and sorted(options[1:]) == sorted(['8分', '未评分']) \
+                and all(len(db.browse_books("rating_user", rating=rating)) == 1 for rating in options[1:])
+
+            unchanged = pager.poll()
+            db.add_book("新收录的书", "作者", "2021", "https://book.douban.com/subject/5000/",
+                        "4星", "", "2022-05-01", "browse_user")
+            added, _ = pager.poll()
+            
+            if ids == sorted(ids, reverse=True) and len(set(ids)) == 1000 and window_bounded and back_to_head \
+                    and filter_ok and escaped_ok and options_ok and unchanged is None \
+                    and [row[1] for row in added] == ["新收录的书"] and pager.rows[0][1] == "新收录的书":
+                print("   [OK] 分页读取 1000 本书籍无重复，窗口保留 200 行，筛选和实时更新正常")
+                return True
+            else:
+                print(f"   [FAIL] 分页结果不符: 共 {len(ids)} 本，去重后 {len(set(ids))} 本，"
+                      f"窗口 {len(pager.rows)} 行，筛选 {filter_ok}，转义 {escaped_ok}，评分选项 {options}，新书 {unchanged} -> {added}")
+                return False
+        
+    except Exception as e:
+        print(f"   [FAIL] 书籍浏览分页测试失败: {e}")
+        return False
+
 def cleanup_test_data():
     """清理测试数据"""
-    print("6. 清理测试数据...")
+    print("31. 清理测试数据...")
     
     try:
         db = DoubanBookDB()
@@ -179,6 +1490,31 @@ def main():
         test_csv_export,
         test_gui_import,
         test_crawler_import,
+        test_async_database,
+        test_db_maintenance,
+        test_sharded_database,
+        test_dataset_generator,
+        test_schema_migration,
+        test_streaming_html_export,
+        test_report_stats,
+        test_compact_html_export,
+        test_search_index,
+        test_site_export,
+        test_incremental_export,
+        test_streaming_csv_export,
+        test_parquet_export,
+        test_ndjson_transfer,
+        test_excel_export,
+        test_batch_export,
+        test_genre_classifier,
+        test_report_charts,
+        test_export_benchmark,
+        test_split_export,
+        test_precompressed_output,
+        test_gui_log_sink,
+        test_export_progress,
+        test_stats_loader,
+        test_book_browser_paging,
         cleanup_test_data
     ]
     
@@ -15,15 +15,34 @@ a = Analysis(
         'src',
         'src.gui',
         'src.gui.gui',
+        'src.gui.book_browser',
+        'src.gui.log_sink',
+        'src.gui.stats_loader',
         'src.crawler',
         'src.crawler.crawler',
         'src.database',
         'src.database.database',
+        'src.database.async_database',
+        'src.database.maintenance',
         'src.exporter',
         'src.exporter.html_exporter',
         'src.exporter.csv_exporter',
+        'src.exporter.report_stats',
+        'src.exporter.chart_renderer',
+        'matplotlib.backends.backend_agg',
+        'src.exporter.search_index',
+        'src.exporter.site_exporter',
+        'src.exporter.fragment_cache',
+        'src.exporter.fanout',
+        'src.exporter.static_output',
+        'src.exporter.progress',
+        'src.exporter.parquet_exporter',
+        'src.exporter.ndjson_exporter',
+        'src.exporter.excel_exporter',
+        'src.exporter.batch_exporter',
         'src.utils',
         'src.utils.logger',
+        'src.utils.genre_classifier',
     ],
     hookspath=[],
     hooksconfig={},